@@ -0,0 +1,126 @@
+import heapq
+import json
+import threading
+import time
+
+from state_journal import write_json_atomic
+
+
+class RetentionIndex:
+    """Archive files ordered by archive time, persisted next to the other JSON state.
+
+    The directory is scanned once, to seed the index when no index file exists.
+    After that, uploads add entries and /undo discards them. The sweeper pops
+    expired entries off a heap in O(expired log n) instead of statting every file.
+    """
+
+    def __init__(self, folder, index_file, delete_file=None, seed_entries=None):
+        self.folder = folder
+        self.index_file = index_file
+        # Hooks so the index can sit in front of a different storage layout.
+        self.delete_file = delete_file or (lambda filename: (self.folder / filename).unlink(missing_ok=True))
+        self.seed_entries = seed_entries
+        self._lock = threading.RLock()
+        self.entries = {}  # filename -> (archived_at, size_bytes)
+        self._heap = []  # (archived_at, filename), stale entries skipped lazily
+        self.total_bytes = 0
+        self.loaded = False
+
+    def load(self):
+        with self._lock:
+            if self.index_file.exists():
+                with open(self.index_file, "r") as f:
+                    data = json.load(f)
+                entries = {name: (at, size) for name, (at, size) in data.items()}
+            elif self.seed_entries:
+                entries = self.seed_entries()
+            else:
+                entries = {}
+                for file in self.folder.iterdir():
+                    if file.is_file():
+                        stat = file.stat()
+                        entries[file.name] = (stat.st_mtime, stat.st_size)
+            self.entries = entries
+            self._heap = [(at, name) for name, (at, _) in entries.items()]
+            heapq.heapify(self._heap)
+            self.total_bytes = sum(size for _, size in entries.values())
+            self.loaded = True
+            if not self.index_file.exists():
+                self.save()
+
+    def save(self):
+        with self._lock:
+            data = {name: [at, size] for name, (at, size) in self.entries.items()}
+            write_json_atomic(self.index_file, data, separators=(",", ":"))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, filename, size_bytes, archived_at=None):
+        with self._lock:
+            self._forget(filename)
+            archived_at = time.time() if archived_at is None else archived_at
+            self.entries[filename] = (archived_at, size_bytes)
+            self.total_bytes += size_bytes
+            heapq.heappush(self._heap, (archived_at, filename))
+
+    def discard(self, filename):
+        """Drop a file that left the archive by other means (restored by /undo, deleted by hand)."""
+        with self._lock:
+            return self._forget(filename)
+
+    def clear(self):
+        with self._lock:
+            self.entries = {}
+            self._heap = []
+            self.total_bytes = 0
+
+    def _forget(self, filename):
+        entry = self.entries.pop(filename, None)
+        if entry:
+            self.total_bytes -= entry[1]
+        return entry is not None
+
+    def _delete(self, filename):
+        self._forget(filename)
+        self.delete_file(filename)
+
+    def pop_expired(self, cutoff):
+        """Delete every archived file older than `cutoff` (POSIX time). Returns the names removed."""
+        removed = []
+        with self._lock:
+            while self._heap and self._heap[0][0] < cutoff:
+                archived_at, filename = heapq.heappop(self._heap)
+                entry = self.entries.get(filename)
+                if entry is None or entry[0] != archived_at:
+                    continue  # stale heap slot from a discard or re-add
+                self._delete(filename)
+                removed.append(filename)
+        return removed
+
+    def enforce_quota(self, max_bytes, policy="oldest", rating_of=None):
+        """Evict files until the archive fits in `max_bytes`.
+
+        policy "oldest" pops from the time heap; "lowest_rated" evicts the fewest
+        votes first (ties broken by age) using `rating_of(filename) -> votes`.
+        """
+        removed = []
+        with self._lock:
+            if self.total_bytes <= max_bytes:
+                return removed
+            if policy == "lowest_rated" and rating_of:
+                order = sorted(self.entries, key=lambda name: (rating_of(name), self.entries[name][0]))
+                for filename in order:
+                    if self.total_bytes <= max_bytes:
+                        break
+                    self._delete(filename)
+                    removed.append(filename)
+            else:
+                while self._heap and self.total_bytes > max_bytes:
+                    archived_at, filename = heapq.heappop(self._heap)
+                    entry = self.entries.get(filename)
+                    if entry is None or entry[0] != archived_at:
+                        continue
+                    self._delete(filename)
+                    removed.append(filename)
+        return removed
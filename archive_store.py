@@ -0,0 +1,219 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from state_journal import write_json_atomic
+
+try:
+    import zstandard
+except ImportError:  # optional: without it every blob is stored as-is
+    zstandard = None
+
+# Formats that still shrink noticeably under zstd. JPEG/PNG/WebP/MP4/WebM are
+# already compressed, so they are stored raw and restored with a hardlink.
+COMPRESSIBLE_EXTENSIONS = {'.gif', '.bmp', '.tif', '.tiff', '.avi'}
+CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def archive_id(name, tag):
+    """Manifest key for one archived copy of `name`; `tag` (e.g. the upload's txid) keeps copies apart."""
+    return f"{tag}/{name}"
+
+
+class ArchiveStore:
+    """Content-addressed archive: blobs/<aa>/<sha256>[.zst] plus a manifest keyed by archive id.
+
+    Identical uploads share one blob, and every archived copy has its own
+    manifest entry, so archiving a second file with the same name keeps the
+    first one. Blobs are reference counted by path, so a raw and a compressed
+    copy of the same bytes never free each other. Entries archived before ids
+    existed are keyed by plain filename, and loose files from before this
+    store existed are still found and restored under their filename.
+    """
+
+    def __init__(self, folder, manifest_file, compress=True):
+        self.folder = folder
+        self.blob_folder = folder / "blobs"
+        self.manifest_file = manifest_file
+        self.compress = compress and zstandard is not None
+        self._lock = threading.RLock()
+        self.manifest = None  # archive id -> {"name", "sha256", "size", "compressed", "archived_at"}
+        self.refcounts = {}  # blob key -> number of manifest entries using it
+
+    def _ensure_loaded(self):
+        if self.manifest is not None:
+            return
+        if self.manifest_file.exists():
+            with open(self.manifest_file, "r") as f:
+                self.manifest = json.load(f)
+        else:
+            self.manifest = {}
+        self.refcounts = {}
+        for key, entry in self.manifest.items():
+            entry.setdefault("name", key)  # entries from before archive ids were keyed by filename
+            blob_key = self._blob_key(entry)
+            self.refcounts[blob_key] = self.refcounts.get(blob_key, 0) + 1
+
+    def save(self):
+        with self._lock:
+            self._ensure_loaded()
+            write_json_atomic(self.manifest_file, self.manifest, separators=(",", ":"))
+
+    def _blob_key(self, entry):
+        return entry["sha256"] + (".zst" if entry["compressed"] else "")
+
+    def _blob_path(self, entry):
+        return self.blob_folder / entry["sha256"][:2] / self._blob_key(entry)
+
+    def _legacy_path(self, filename):
+        return self.folder / filename
+
+    def get(self, archive_id):
+        with self._lock:
+            self._ensure_loaded()
+            return self.manifest.get(archive_id)
+
+    def name_of(self, archive_id):
+        """Original filename of an archived copy (legacy ids are the filename)."""
+        entry = self.get(archive_id)
+        return entry["name"] if entry else archive_id
+
+    def contains(self, archive_id):
+        with self._lock:
+            self._ensure_loaded()
+            if archive_id in self.manifest:
+                return self._blob_path(self.manifest[archive_id]).exists()
+            return self._legacy_path(archive_id).is_file()
+
+    def put(self, src, archive_id):
+        """Move `src` into the store under `archive_id` and return its manifest entry.
+
+        The manifest entry is saved before any bytes move, and `src` is only
+        removed once its blob is in place, so an interrupted put can simply be
+        repeated. A missing `src` whose entry is already recorded means an
+        earlier attempt finished the move.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            recorded = self.manifest.get(archive_id)
+        if not src.exists():
+            if recorded is not None and self._blob_path(recorded).exists():
+                return recorded
+            raise FileNotFoundError(f"{src} is gone and {archive_id} was never archived")
+
+        sha = file_digest(src)
+        size = src.stat().st_size
+        compressed = self.compress and src.suffix.lower() in COMPRESSIBLE_EXTENSIONS
+        entry = {"name": src.name, "sha256": sha, "size": size, "compressed": compressed, "archived_at": time.time()}
+
+        with self._lock:
+            self._ensure_loaded()
+            previous = self.manifest.get(archive_id)
+            if previous is not None and self._blob_key(previous) == self._blob_key(entry):
+                entry = previous  # replaying a put that already recorded these bytes
+            else:
+                blob_key = self._blob_key(entry)
+                self.refcounts[blob_key] = self.refcounts.get(blob_key, 0) + 1
+                self.manifest[archive_id] = entry
+                self.save()
+                if previous is not None:
+                    self._unref(previous)
+
+            blob = self._blob_path(entry)
+            if not blob.exists():
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                tmp = blob.with_name(blob.name + ".tmp")
+                tmp.unlink(missing_ok=True)
+                if compressed:
+                    with open(src, "rb") as fin, open(tmp, "wb") as fout:
+                        zstandard.ZstdCompressor(level=10).copy_stream(fin, fout)
+                else:
+                    try:
+                        os.link(src, tmp)
+                    except OSError:
+                        shutil.copyfile(src, tmp)
+                os.replace(tmp, blob)
+            src.unlink()  # also the dedup case: identical bytes were already archived
+        return entry
+
+    def _release(self, archive_id):
+        """Drop a manifest entry and its blob once nothing references it."""
+        entry = self.manifest.pop(archive_id, None)
+        if entry is not None:
+            self._unref(entry)
+
+    def _unref(self, entry):
+        blob_key = self._blob_key(entry)
+        self.refcounts[blob_key] -= 1
+        if self.refcounts[blob_key] <= 0:
+            del self.refcounts[blob_key]
+            self._blob_path(entry).unlink(missing_ok=True)
+
+    def delete(self, archive_id):
+        with self._lock:
+            self._ensure_loaded()
+            if archive_id in self.manifest:
+                self._release(archive_id)
+            else:
+                self._legacy_path(archive_id).unlink(missing_ok=True)
+
+    def restore(self, archive_id, dest):
+        """Recreate the archived copy at `dest` and remove it from the archive."""
+        with self._lock:
+            self._ensure_loaded()
+            entry = self.manifest.get(archive_id)
+            if entry is None:
+                self._legacy_path(archive_id).rename(dest)
+                return
+            blob = self._blob_path(entry)
+
+        tmp = dest.with_name(dest.name + ".restoring")
+        if entry["compressed"]:
+            with open(blob, "rb") as fin, open(tmp, "wb") as fout:
+                zstandard.ZstdDecompressor().copy_stream(fin, fout)
+        else:
+            try:
+                os.link(blob, tmp)
+            except OSError:
+                shutil.copyfile(blob, tmp)
+        os.replace(tmp, dest)
+
+        with self._lock:
+            self._release(archive_id)
+
+    def restore_many(self, pairs, max_workers=4):
+        """Restore [(archive_id, dest), ...] in parallel. Returns {archive_id: exception or None}."""
+        def run(pair):
+            try:
+                self.restore(*pair)
+                return pair[0], None
+            except Exception as e:
+                return pair[0], e
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return dict(pool.map(run, pairs))
+
+    def entries(self):
+        """Return {archive_id: (archived_at, size)} for manifest entries and legacy loose files."""
+        with self._lock:
+            self._ensure_loaded()
+            found = {}
+            for file in self.folder.iterdir():
+                if file.is_file():
+                    stat = file.stat()
+                    found[file.name] = (stat.st_mtime, stat.st_size)
+            for key, entry in self.manifest.items():
+                found[key] = (entry["archived_at"], entry["size"])
+            return found
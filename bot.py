@@ -34,10 +34,21 @@ async def on_ready():
     except Exception as e:
         print(f"Failed to sync commands: {e}")
 
+    # Finish or roll back uploads/undos interrupted by a crash
+    await media_functions.recover_pending_operations(bot)
+
     # Start daily upload loop
     if not media_functions.daily_upload.is_running():
         media_functions.daily_upload.start()
         print("Started daily_upload loop.")
+    if not media_functions.state_flusher.is_running():
+        media_functions.state_flusher.start()
+    if not media_functions.archive_sweeper.is_running():
+        media_functions.archive_sweeper.start()
+    if not movie_functions.poll_ticker.is_running():
+        movie_functions.poll_ticker.start()
+    if not media_functions.config_watcher.is_running():
+        media_functions.config_watcher.start()
 
 def run_tui():
     """Run the TUI in a separate thread"""
@@ -0,0 +1,111 @@
+import asyncio
+import queue
+
+import media_functions
+from live_config import settings
+
+
+class ControlJob:
+    """A coroutine submitted to the bot loop, plus the progress lines it emits."""
+
+    def __init__(self, name):
+        self.name = name
+        self.messages = queue.Queue()
+        self.future = None
+
+    def progress(self, message):
+        # Called on the bot loop thread; queue.Queue hands it to the TUI thread.
+        self.messages.put(message)
+
+    def iter_progress(self, poll_interval=0.1):
+        """Yield progress lines until the job finishes (blocks the calling thread)."""
+        while True:
+            try:
+                yield self.messages.get(timeout=poll_interval)
+            except queue.Empty:
+                if self.future.done():
+                    break
+        while not self.messages.empty():
+            yield self.messages.get_nowait()
+
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+
+
+class BotControl:
+    """Thread-safe bridge that lets the TUI run work on the bot's event loop.
+
+    State changes are never written from the TUI thread; each action is
+    scheduled with ``asyncio.run_coroutine_threadsafe`` so it runs next to the
+    slash commands and reaction handlers under ``media_functions.state_lock``.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    @property
+    def connected(self):
+        return self.bot is not None and self.bot.is_ready()
+
+    def submit(self, name, coro_factory, *args, **kwargs):
+        """Schedule ``coro_factory(*args, progress=job.progress, **kwargs)`` on the bot loop."""
+        if not self.connected:
+            raise RuntimeError("Bot is not connected yet.")
+
+        job = ControlJob(name)
+        coro = coro_factory(*args, progress=job.progress, **kwargs)
+        job.future = asyncio.run_coroutine_threadsafe(coro, self.bot.loop)
+        return job
+
+    def manual_upload(self):
+        return self.submit("manual_upload", media_functions.run_manual_upload, self.bot)
+
+    def clear_history(self):
+        return self.submit("clear_history", _clear_history)
+
+    def reschedule(self, hour=None, minute=None, enabled=True):
+        return self.submit("reschedule", _reschedule, enabled, hour, minute)
+
+    def dry_run(self, count=1):
+        return self.submit("dry_run", _dry_run, count)
+
+    def update_config(self, **changes):
+        return self.submit("update_config", _update_config, changes)
+
+    def clear_archive(self):
+        return self.submit("clear_archive", media_functions.clear_archives)
+
+
+async def _clear_history(progress=None):
+    await media_functions.reset_history()
+    media_functions.report(progress, "Upload history cleared")
+    return True
+
+
+async def _reschedule(enabled, hour, minute, progress=None):
+    config = await media_functions.update_schedule(enabled=enabled, hour=hour, minute=minute)
+    if config["enabled"]:
+        media_functions.report(progress, f"Schedule updated to {config['hour']:02d}:{config['minute']:02d}")
+    else:
+        media_functions.report(progress, "Daily uploads disabled")
+    return config
+
+
+async def _dry_run(count, progress=None):
+    batches = media_functions.preview_batches(count)
+    for i, batch in enumerate(batches, 1):
+        size = sum(media_functions.get_file_size_mb(f) for f in batch)
+        progress(f"Batch {i}: {len(batch)} files ({size:.2f} MB)")
+    if not batches:
+        progress("No files to upload")
+    return batches
+
+
+async def _update_config(changes, progress=None):
+    # Applied on the bot loop so subscribers run next to the code that reads the settings
+    changed = settings.update(**changes)
+    for name, value in changed.items():
+        media_functions.report(progress, f"{name} is now {value}")
+    if not changed:
+        media_functions.report(progress, "No changes")
+    return changed
@@ -0,0 +1,110 @@
+import base64
+
+# On-disk format version for media_ratings.json and user_data.json.
+# Version 1 (no "version" key) stored voters and watch lists as plain JSON lists.
+STORE_VERSION = 2
+
+
+def encode_id_set(ids):
+    """Pack integer IDs as a sorted, delta + varint encoded base64 string."""
+    out = bytearray()
+    previous = 0
+    for value in sorted(ids):
+        delta = value - previous
+        previous = value
+        while True:
+            byte = delta & 0x7F
+            delta >>= 7
+            if delta:
+                out.append(byte | 0x80)
+            else:
+                out.append(byte)
+                break
+    return base64.b64encode(bytes(out)).decode("ascii")
+
+
+def decode_id_set(blob):
+    """Inverse of encode_id_set."""
+    ids = set()
+    value = 0
+    delta = 0
+    shift = 0
+    for byte in base64.b64decode(blob):
+        delta |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        value += delta
+        ids.add(value)
+        delta = 0
+        shift = 0
+    return ids
+
+
+def new_user_entry():
+    # watched/watchlist are insertion-ordered sets: dict keys with None values.
+    return {"watched": {}, "watchlist": {}}
+
+
+def ratings_from_disk(data):
+    """Return {filename: {"votes": int, "voters": set[int]}}."""
+    if data.get("version") != STORE_VERSION:
+        return {
+            filename: {"votes": entry.get("votes", 0), "voters": {int(v) for v in entry.get("voters", [])}}
+            for filename, entry in data.items()
+        }
+    return {
+        filename: {"votes": votes, "voters": decode_id_set(voters)}
+        for filename, (votes, voters) in data["ratings"].items()
+    }
+
+
+def ratings_to_disk(ratings):
+    return {
+        "version": STORE_VERSION,
+        "ratings": {
+            filename: [entry["votes"], encode_id_set(entry["voters"])]
+            for filename, entry in ratings.items()
+        },
+    }
+
+
+def user_data_from_disk(data):
+    """Return {user_id_str: {"watched": {filename: None}, "watchlist": {filename: None}}}."""
+    if data.get("version") != STORE_VERSION:
+        return {
+            user_id: {
+                "watched": dict.fromkeys(entry.get("watched", [])),
+                "watchlist": dict.fromkeys(entry.get("watchlist", [])),
+            }
+            for user_id, entry in data.items()
+        }
+    files = data["files"]
+    return {
+        user_id: {
+            "watched": dict.fromkeys(files[i] for i in entry["watched"]),
+            "watchlist": dict.fromkeys(files[i] for i in entry["watchlist"]),
+        }
+        for user_id, entry in data["users"].items()
+    }
+
+
+def user_data_to_disk(user_data):
+    """Intern filenames once in a shared table and store per-user lists of table indexes."""
+    files = []
+    file_ids = {}
+
+    def intern(filename):
+        if filename not in file_ids:
+            file_ids[filename] = len(files)
+            files.append(filename)
+        return file_ids[filename]
+
+    users = {
+        user_id: {
+            "watched": [intern(f) for f in entry["watched"]],
+            "watchlist": [intern(f) for f in entry["watchlist"]],
+        }
+        for user_id, entry in user_data.items()
+    }
+    return {"version": STORE_VERSION, "files": files, "users": users}
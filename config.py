@@ -29,6 +29,14 @@ if not DISCORD_TOKEN or DISCORD_TOKEN == "YOUR_REAL_DISCORD_TOKEN_WOULD_GO_HERE"
 if not TMDB_API_KEY or TMDB_API_KEY == "YOUR_REAL_TMDB_API_KEY_WOULD_GO_HERE":
     raise ValueError("TMDB_API_KEY not properly set in secrets.txt")
 
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", 4))
+GEMINI_TIMEOUT_SECONDS = int(os.getenv("GEMINI_TIMEOUT_SECONDS", 60))
+OUTBOUND_MAX_IN_FLIGHT = int(os.getenv("OUTBOUND_MAX_IN_FLIGHT", 4))
+OUTBOUND_INTERACTIVE_RESERVE = int(os.getenv("OUTBOUND_INTERACTIVE_RESERVE", 2))  # slots background work can't use
+# Hand batch sends to a separate `python upload_worker.py` process
+UPLOAD_WORKER = os.getenv("UPLOAD_WORKER", "false").lower() in ("1", "true", "yes")
+UPLOAD_WORKER_CLAIM_TIMEOUT_SECONDS = int(os.getenv("UPLOAD_WORKER_CLAIM_TIMEOUT_SECONDS", 30))  # then send in-process
+
 # Bot owner ID for dev commands
 BOT_OWNER_ID = int(os.getenv("BOT_OWNER_ID", 197677394042028032))  # Set this to your Discord user ID
 
@@ -38,6 +46,8 @@ MOVIES_CHANNEL_ID = int(os.getenv("MOVIES_CHANNEL_ID", 370237203462488064))
 IMAGES_PER_BATCH = int(os.getenv("IMAGES_PER_BATCH", 3))
 VIDEOS_PER_BATCH = int(os.getenv("VIDEOS_PER_BATCH", 7))
 ARCHIVE_RETENTION_DAYS = int(os.getenv("ARCHIVE_RETENTION_DAYS", 3))
+ARCHIVE_QUOTA_MB = int(os.getenv("ARCHIVE_QUOTA_MB", 0))  # 0 disables the disk quota
+ARCHIVE_EVICTION_POLICY = os.getenv("ARCHIVE_EVICTION_POLICY", "oldest")  # "oldest" or "lowest_rated"
 MAX_UPLOAD_SIZE_MB = int(os.getenv("MAX_UPLOAD_SIZE_MB", 25))
 SELECTION_ORDER = os.getenv("SELECTION_ORDER", "random")
 
@@ -47,9 +57,23 @@ VIDEO_EXTENSIONS = {'.mp4', '.mov', '.avi', '.mkv', '.webm'}
 MEDIA_FOLDER = Path(os.getenv("MEDIA_FOLDER", "media"))
 ARCHIVE_FOLDER = Path(os.getenv("ARCHIVE_FOLDER", "archive"))
 HISTORY_FILE = Path(os.getenv("HISTORY_FILE", "upload_history.json"))
+LIVE_CONFIG_FILE = Path(os.getenv("LIVE_CONFIG_FILE", "live_config.json"))  # runtime overrides, hot-reloaded
 SCHEDULE_CONFIG_FILE = Path(os.getenv("SCHEDULE_CONFIG_FILE", "schedule_config.json"))
 USER_DATA_FILE = Path(os.getenv("USER_DATA_FILE", "user_data.json"))
 MEDIA_RATINGS_FILE = Path(os.getenv("MEDIA_RATINGS_FILE", "media_ratings.json"))
+JOURNAL_FILE = Path(os.getenv("JOURNAL_FILE", "state_journal.json"))
+ARCHIVE_INDEX_FILE = Path(os.getenv("ARCHIVE_INDEX_FILE", "archive_index.json"))
+ARCHIVE_MANIFEST_FILE = Path(os.getenv("ARCHIVE_MANIFEST_FILE", "archive_manifest.json"))
+UPLOAD_QUEUE_FILE = Path(os.getenv("UPLOAD_QUEUE_FILE", "upload_queue.db"))
+POLLS_FILE = Path(os.getenv("POLLS_FILE", "polls.json"))
+SHOW_ALIAS_FILE = Path(os.getenv("SHOW_ALIAS_FILE", "show_aliases.json"))
+SHOW_ALIAS_REVALIDATE_DAYS = int(os.getenv("SHOW_ALIAS_REVALIDATE_DAYS", 7))
+TITLE_INDEX_FILE = Path(os.getenv("TITLE_INDEX_FILE", "title_index.json"))
+# Optional TMDB daily ID exports (movie_ids_*.json.gz / tv_series_ids_*.json.gz) for autocomplete
+TMDB_MOVIE_EXPORT_FILE = Path(os.getenv("TMDB_MOVIE_EXPORT_FILE")) if os.getenv("TMDB_MOVIE_EXPORT_FILE") else None
+TMDB_TV_EXPORT_FILE = Path(os.getenv("TMDB_TV_EXPORT_FILE")) if os.getenv("TMDB_TV_EXPORT_FILE") else None
+TMDB_EXPORT_MIN_POPULARITY = float(os.getenv("TMDB_EXPORT_MIN_POPULARITY", 1.0))
+ARCHIVE_COMPRESSION = os.getenv("ARCHIVE_COMPRESSION", "true").lower() in ("1", "true", "yes")  # needs zstandard
 
 MEDIA_FOLDER.mkdir(exist_ok=True)
 ARCHIVE_FOLDER.mkdir(exist_ok=True)
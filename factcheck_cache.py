@@ -0,0 +1,125 @@
+import re
+import time
+from datetime import datetime
+
+_NON_WORD = re.compile(r"[^\w\s]")
+_DIGIT = re.compile(r"\d")
+# Claims differing only in these words mean opposite things, so fuzzy hits must agree on them.
+NEGATIONS = {"not", "no", "never", "none", "nobody", "nothing", "t", "isn", "aren", "wasn", "weren",
+             "doesn", "don", "didn", "won", "cannot", "false", "untrue"}
+# Likewise for numbers and dates: "mars has 2 moons" and "mars has 3 moons" are different claims.
+# ("may" is left out; it is far more often a verb.)
+MONTHS = {"january", "february", "march", "april", "june", "july", "august", "september",
+          "october", "november", "december"}
+
+
+def exact_tokens(tokens):
+    """Tokens two claims must share for a fuzzy match: negations, numbers and months."""
+    return frozenset(t for t in tokens if t in NEGATIONS or t in MONTHS or _DIGIT.search(t))
+
+
+def normalize_claim(claim):
+    """Casefold, drop punctuation and collapse whitespace."""
+    return " ".join(_NON_WORD.sub(" ", claim.casefold()).split())
+
+
+class ClaimCache:
+    """TTL cache of fact-check results keyed by normalized claim.
+
+    Exact normalized matches are O(1). Otherwise claims with at least
+    ``min_fuzzy_tokens`` words are compared by token-set (Jaccard) similarity
+    against candidates found through a token -> claims inverted index.
+    """
+
+    def __init__(self, ttl_seconds, similarity=0.9, min_fuzzy_tokens=3):
+        self.ttl_seconds = ttl_seconds
+        self.similarity = similarity
+        self.min_fuzzy_tokens = min_fuzzy_tokens
+        self.entries = {}  # normalized claim -> result dict
+        self.tokens = {}  # normalized claim -> frozenset of tokens
+        self.token_index = {}  # token -> set of normalized claims
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _expired(self, entry, now):
+        return now - entry["checked_at"] > self.ttl_seconds
+
+    def _drop(self, key):
+        self.entries.pop(key, None)
+        for token in self.tokens.pop(key, ()):
+            keys = self.token_index.get(token)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self.token_index[token]
+
+    def get(self, claim, now=None):
+        """Return the cached result dict (with "checked_at") or None."""
+        now = time.time() if now is None else now
+        key = normalize_claim(claim)
+        entry = self.entries.get(key)
+        if entry is None:
+            key, entry = self._fuzzy_match(key)
+        if entry is not None and self._expired(entry, now):
+            self._drop(key)
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def _fuzzy_match(self, key):
+        tokens = frozenset(key.split())
+        if len(tokens) < self.min_fuzzy_tokens:
+            return None, None
+        overlap = {}
+        for token in tokens:
+            for candidate in self.token_index.get(token, ()):
+                overlap[candidate] = overlap.get(candidate, 0) + 1
+
+        required = exact_tokens(tokens)
+        best_key, best_score = None, self.similarity
+        for candidate, shared in overlap.items():
+            other = self.tokens[candidate]
+            if exact_tokens(other) != required:
+                continue
+            score = shared / (len(tokens) + len(other) - shared)
+            if score >= best_score:
+                best_key, best_score = candidate, score
+        if best_key is None:
+            return None, None
+        return best_key, self.entries[best_key]
+
+    def put(self, claim, verdict, text, sources, checked_at=None):
+        key = normalize_claim(claim)
+        if not key:
+            return
+        self._drop(key)
+        self.entries[key] = {
+            "claim": claim,
+            "verdict": verdict,
+            "text": text,
+            "sources": sources,
+            "checked_at": time.time() if checked_at is None else checked_at,
+        }
+        tokens = frozenset(key.split())
+        self.tokens[key] = tokens
+        for token in tokens:
+            self.token_index.setdefault(token, set()).add(key)
+
+    def seed(self, history, now=None):
+        """Load still-fresh records that kept their answer text from factcheck history."""
+        now = time.time() if now is None else now
+        for record in history:
+            if not record.get("text") or record.get("cached"):
+                continue  # older records only kept the verdict; cache hits would reset the age
+            try:
+                checked_at = datetime.fromisoformat(record["timestamp"]).timestamp()
+            except (KeyError, ValueError):
+                continue
+            if now - checked_at <= self.ttl_seconds:
+                self.put(record["claim"], record["verdict"], record["text"], record.get("sources", []), checked_at)
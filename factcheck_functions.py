@@ -1,63 +1,244 @@
+import asyncio
 import discord
 import json
+import time
 from datetime import datetime
 from pathlib import Path
 from config import GEMINI_API_KEY
 import gemini_functions
+import outbound
+import rate_limit
+from factcheck_cache import ClaimCache
+from jsonl_log import RotatingJsonlLog
 
-FACTCHECK_HISTORY = Path("factcheck_history.json")
+FACTCHECK_HISTORY = Path("factcheck_history.json")  # legacy single-array file, migrated once
+FACTCHECK_LOG = Path("factcheck_history.jsonl")
+STREAM_RESPONSES = True
+# Discord allows roughly 5 message edits per 5 seconds; stay comfortably under it.
+EDIT_INTERVAL_SECONDS = 1.5
+CACHE_TTL_SECONDS = 24 * 60 * 60
 
-def load_factcheck_history():
+factcheck_log = RotatingJsonlLog(FACTCHECK_LOG)
+claim_cache = ClaimCache(CACHE_TTL_SECONDS)
+_cache_seeded = False
+_legacy_migrated = False
+_stats = None
+
+def migrate_legacy_history():
+    """Move records from the old factcheck_history.json array into the JSONL log."""
+    global _legacy_migrated
+    if _legacy_migrated:
+        return
     if FACTCHECK_HISTORY.exists():
         with open(FACTCHECK_HISTORY, "r") as f:
-            return json.load(f)
-    return []
+            factcheck_log.extend(json.load(f))
+        FACTCHECK_HISTORY.rename(FACTCHECK_HISTORY.with_name(FACTCHECK_HISTORY.name + ".migrated"))
+    _legacy_migrated = True
 
-def save_factcheck_history(history):
-    with open(FACTCHECK_HISTORY, "w") as f:
-        json.dump(history, f, indent=2)
+def load_factcheck_history(since=None):
+    migrate_legacy_history()
+    return factcheck_log.read(since)
 
-async def factcheck(interaction: discord.Interaction, claim: str):
-    prompt = "Fact-check this claim using current web sources. Start with VERDICT: [True/False/Mixed/Unverified] then explain in 2-3 sentences with sources. Claim: %s" % claim
-    
-    result = await gemini_functions.generate_with_grounding(prompt)
-    
-    if not result["text"]:
-        await interaction.followup.send("Error checking claim: %s" % result.get("error", "Unknown"), ephemeral=True)
-        return
-    
-    text = result["text"]
-    sources = result["sources"]
-    
-    verdict = "Unknown"
+def get_claim_cache():
+    """Return the claim cache, seeding it from recent factcheck history on first use."""
+    global _cache_seeded
+    if not _cache_seeded:
+        claim_cache.seed(load_factcheck_history(since=time.time() - CACHE_TTL_SECONDS))
+        _cache_seeded = True
+    return claim_cache
+
+
+class FactcheckStats:
+    """Per-user and per-verdict counters, built from the log once and then kept current."""
+
+    def __init__(self):
+        self.total = 0
+        self.by_user = {}
+        self.by_verdict = {}
+
+    def add(self, record):
+        self.total += 1
+        user_id = str(record.get("user_id"))
+        verdict = record.get("verdict", "Unknown")
+        self.by_user[user_id] = self.by_user.get(user_id, 0) + 1
+        self.by_verdict[verdict] = self.by_verdict.get(verdict, 0) + 1
+
+def get_factcheck_stats():
+    global _stats
+    if _stats is None:
+        _stats = FactcheckStats()
+        for record in load_factcheck_history():
+            _stats.add(record)
+    return _stats
+
+def format_age(seconds):
+    if seconds < 60:
+        return "%ds" % seconds
+    if seconds < 3600:
+        return "%d min" % (seconds // 60)
+    return "%.1f h" % (seconds / 3600)
+
+def build_prompt(claim):
+    return "Fact-check this claim using current web sources. Start with VERDICT: [True/False/Mixed/Unverified] then explain in 2-3 sentences with sources. Claim: %s" % claim
+
+def parse_verdict(text):
     if "False" in text[:100]:
-        verdict = "False"
-        emoji, color = "❌", 0xE74C3C
+        return "False", "❌", 0xE74C3C
     elif "True" in text[:100]:
-        verdict = "True"
-        emoji, color = "✅", 0x27AE60
+        return "True", "✅", 0x27AE60
     elif "Mixed" in text[:100]:
-        verdict = "Mixed"
-        emoji, color = "🟡", 0xF1C40F
+        return "Mixed", "🟡", 0xF1C40F
+    return "Unverified", "❓", 0x95A5A6
+
+def build_embed(claim, text, sources, pending=False, cached_at=None):
+    if pending and "VERDICT:" not in text:
+        verdict, emoji, color = "Checking...", "⏳", 0x95A5A6
     else:
-        verdict = "Unverified"
-        emoji, color = "❓", 0x95A5A6
-    
+        verdict, emoji, color = parse_verdict(text)
+
     embed = discord.Embed(title="%s %s" % (emoji, verdict), color=color)
-    embed.description = text[:1000]
-    
+    embed.description = (text[:1000] + (" ▌" if pending else "")) if text else "Searching the web..."
+
     for i, source in enumerate(sources[:3]):
         embed.add_field(name=source.get("title", "Source %d" % (i+1)), value="[Link](%s)" % source["url"], inline=True)
-    
-    embed.set_footer(text="Powered by Gemini | Claim: %s" % claim[:80])
+
+    if cached_at is not None:
+        age = format_age(int(time.time() - cached_at))
+        embed.set_footer(text="⚡ Cached result from %s ago | Powered by Gemini | Claim: %s" % (age, claim[:80]))
+    else:
+        embed.set_footer(text="Powered by Gemini | Claim: %s" % claim[:80])
     embed.timestamp = discord.utils.utcnow()
-    
-    history = load_factcheck_history()
-    history.append({"timestamp": datetime.now().isoformat(), "claim": claim[:200], "user_id": interaction.user.id, "verdict": verdict})
-    save_factcheck_history(history)
-    
+    return embed, verdict
+
+def record_factcheck(interaction, claim, verdict, text, sources, cached=False):
+    if not cached:
+        get_claim_cache().put(claim, verdict, text, sources)
+    migrate_legacy_history()
+    record = {
+        "timestamp": datetime.now().isoformat(),
+        "claim": claim[:200],
+        "user_id": interaction.user.id,
+        "verdict": verdict,
+        "text": text[:1000],
+        "sources": sources[:3],
+        "cached": cached,
+    }
+    factcheck_log.append(record)
+    if _stats is not None:
+        _stats.add(record)
+
+
+class ThrottledEditor:
+    """Coalesces rapid edits to one message so at most one edit is sent per interval.
+
+    Edits go out one at a time, so the final edit from close() always lands
+    after any partial edit that was already in flight.
+    """
+
+    def __init__(self, message, min_interval=EDIT_INTERVAL_SECONDS):
+        self.message = message
+        self.min_interval = min_interval
+        self._last_edit = float("-inf")
+        self._pending = None
+        self._task = None
+        self._lock = asyncio.Lock()
+
+    def update(self, **kwargs):
+        self._pending = kwargs
+        if self._task is None:
+            delay = max(0.0, self._last_edit + self.min_interval - asyncio.get_running_loop().time())
+            self._task = asyncio.create_task(self._edit_later(delay))
+
+    async def _edit_later(self, delay):
+        await asyncio.sleep(delay)
+        self._task = None
+        await self._edit()
+
+    async def _edit(self):
+        async with self._lock:
+            if self._pending is None:
+                return
+            kwargs, self._pending = self._pending, None
+            self._last_edit = asyncio.get_running_loop().time()
+            try:
+                await outbound.scheduler.submit(outbound.Priority.INTERACTIVE, self.message.edit, **kwargs)
+            except discord.HTTPException as e:
+                print("Factcheck edit failed: %s" % e)
+
+    async def close(self, **kwargs):
+        """Cancel any scheduled edit and send the final state once an in-flight edit is done."""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if kwargs:
+            self._pending = kwargs
+        await self._edit()
+
+
+async def factcheck(interaction: discord.Interaction, claim: str):
+    cached = get_claim_cache().get(claim)
+    if cached:
+        embed, verdict = build_embed(claim, cached["text"], cached["sources"], cached_at=cached["checked_at"])
+        record_factcheck(interaction, claim, verdict, cached["text"], cached["sources"], cached=True)
+        await interaction.followup.send(embed=embed)
+        return
+
+    # Cache hits above cost no Gemini quota, so only fresh checks are rate limited
+    if not await rate_limit.allow(interaction, "factcheck"):
+        return
+
+    if STREAM_RESPONSES:
+        await factcheck_streaming(interaction, claim)
+        return
+
+    result = await gemini_functions.generate_with_grounding(build_prompt(claim))
+
+    if not result["text"]:
+        await interaction.followup.send("Error checking claim: %s" % result.get("error", "Unknown"), ephemeral=True)
+        return
+
+    embed, verdict = build_embed(claim, result["text"], result["sources"])
+    record_factcheck(interaction, claim, verdict, result["text"], result["sources"])
+
     await interaction.followup.send(embed=embed)
 
+async def factcheck_streaming(interaction: discord.Interaction, claim: str):
+    """Send a placeholder right away and grow it into the final embed as Gemini streams."""
+    text = ""
+    sources = []
+    message = None
+    editor = None
+
+    async for chunk in gemini_functions.stream_with_grounding(build_prompt(claim)):
+        if "error" in chunk:
+            if editor:
+                await editor.close(content="Error checking claim: %s" % chunk["error"], embed=None)
+            else:
+                await interaction.followup.send("Error checking claim: %s" % chunk["error"], ephemeral=True)
+            return
+
+        text += chunk["text"]
+        sources = chunk["sources"] or sources
+        embed, _ = build_embed(claim, text, sources, pending=True)
+        if message is None:
+            # First tokens: post immediately; later chunks become throttled edits
+            message = await interaction.followup.send(embed=embed, wait=True)
+            editor = ThrottledEditor(message)
+        else:
+            editor.update(embed=embed)
+
+    if not text:
+        error = "Unknown"
+        if editor:
+            await editor.close(content="Error checking claim: %s" % error, embed=None)
+        else:
+            await interaction.followup.send("Error checking claim: %s" % error, ephemeral=True)
+        return
+
+    embed, verdict = build_embed(claim, text, sources)
+    await editor.close(embed=embed)
+    record_factcheck(interaction, claim, verdict, text, sources)
+
 def setup(bot):
     tree = bot.tree
     @tree.command(name="factcheck", description="AI-powered fact-check with web sources.")
@@ -65,3 +246,13 @@ def setup(bot):
     async def factcheck_slash(interaction: discord.Interaction, claim: str):
         await interaction.response.defer()
         await factcheck(interaction, claim)
+
+    @tree.command(name="factcheck_stats", description="Fact-check usage and verdict breakdown.")
+    async def factcheck_stats_slash(interaction: discord.Interaction):
+        stats = get_factcheck_stats()
+        embed = discord.Embed(title="📈 Fact-check Stats", color=0x3498DB)
+        embed.add_field(name="Total Checks", value=str(stats.total), inline=True)
+        embed.add_field(name="Your Checks", value=str(stats.by_user.get(str(interaction.user.id), 0)), inline=True)
+        breakdown = "\n".join("%s: %d" % (verdict, count) for verdict, count in sorted(stats.by_verdict.items(), key=lambda x: -x[1]))
+        embed.add_field(name="Verdicts", value=breakdown or "None yet", inline=False)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
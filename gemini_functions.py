@@ -1,44 +1,176 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
 import google.generativeai as genai
-from config import GEMINI_API_KEY
+import rate_limit
+from config import GEMINI_API_KEY, GEMINI_MAX_CONCURRENCY, GEMINI_TIMEOUT_SECONDS
 
 genai.configure(api_key=GEMINI_API_KEY)
 
+# Gemini quota errors rarely carry a usable Retry-After, so back off for a fixed window
+QUOTA_BACKOFF_SECONDS = 30
+
+
+def note_quota_error(error):
+    """Pause the shared Gemini bucket when `error` is a 429 / quota exhaustion."""
+    if getattr(error, "code", None) == 429:
+        rate_limit.limiter.pause_upstream("gemini", QUOTA_BACKOFF_SECONDS)
+
+
+class GeminiClient:
+    """Async front-end for Gemini models.
+
+    - Model instances are built once per name and reused.
+    - Calls use the library's ``generate_content_async`` when the model has it,
+      otherwise the blocking ``generate_content`` runs on a bounded thread pool,
+      so the bot's event loop never stalls while Gemini thinks.
+    - At most ``max_concurrency`` requests are in flight, each with a timeout.
+    - Identical concurrent requests share one upstream call.
+
+    ``model_factory(name)`` can return any object with ``generate_content``,
+    which makes it easy to run against a local fake model.
+    """
+
+    def __init__(self, model_factory, max_concurrency=4, timeout=60):
+        self.model_factory = model_factory
+        self.timeout = timeout
+        self._models = {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="gemini")
+        self._inflight = {}
+        self.coalesced_calls = 0
+
+    def model(self, model_name):
+        if model_name not in self._models:
+            self._models[model_name] = self.model_factory(model_name)
+        return self._models[model_name]
+
+    async def generate(self, model_name, prompt, **kwargs):
+        key = (model_name, prompt, repr(sorted(kwargs.items())))
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._call(model_name, prompt, kwargs))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced_calls += 1
+        # shield: one caller being cancelled must not cancel the shared request
+        return await asyncio.shield(task)
+
+    async def _call(self, model_name, prompt, kwargs):
+        model = self.model(model_name)
+        async with self._semaphore:
+            if hasattr(model, "generate_content_async"):
+                call = model.generate_content_async(prompt, **kwargs)
+            else:
+                loop = asyncio.get_running_loop()
+                call = loop.run_in_executor(self._executor, functools.partial(model.generate_content, prompt, **kwargs))
+            return await asyncio.wait_for(call, self.timeout)
+
+    async def stream(self, model_name, prompt, **kwargs):
+        """Yield response chunks as they arrive (not coalesced).
+
+        The timeout applies to the wait for each chunk rather than the whole answer.
+        """
+        model = self.model(model_name)
+        async with self._semaphore:
+            if hasattr(model, "generate_content_async"):
+                response = await asyncio.wait_for(
+                    model.generate_content_async(prompt, stream=True, **kwargs), self.timeout
+                )
+                chunks = response.__aiter__()
+                while True:
+                    try:
+                        yield await asyncio.wait_for(chunks.__anext__(), self.timeout)
+                    except StopAsyncIteration:
+                        return
+            else:
+                loop = asyncio.get_running_loop()
+                queue = asyncio.Queue()
+                done = object()
+
+                def pump():
+                    try:
+                        for chunk in model.generate_content(prompt, stream=True, **kwargs):
+                            loop.call_soon_threadsafe(queue.put_nowait, chunk)
+                    except Exception as e:
+                        loop.call_soon_threadsafe(queue.put_nowait, e)
+                    finally:
+                        loop.call_soon_threadsafe(queue.put_nowait, done)
+
+                loop.run_in_executor(self._executor, pump)
+                while True:
+                    item = await asyncio.wait_for(queue.get(), self.timeout)
+                    if item is done:
+                        return
+                    if isinstance(item, Exception):
+                        raise item
+                    yield item
+
+
+client = GeminiClient(genai.GenerativeModel, GEMINI_MAX_CONCURRENCY, GEMINI_TIMEOUT_SECONDS)
+
 def get_model(model_name="gemini-2.0-flash-exp"):
-    return genai.GenerativeModel(model_name)
+    return client.model(model_name)
 
 async def generate_text(prompt, model_name="gemini-2.0-flash-exp", max_tokens=1000):
     try:
-        model = get_model(model_name)
-        response = model.generate_content(prompt)
+        response = await client.generate(model_name, prompt)
         return response.text
     except Exception as e:
+        note_quota_error(e)
         return None
 
+def extract_sources(response):
+    sources = []
+    metadata = getattr(response, "grounding_metadata", None)
+    if not metadata and getattr(response, "candidates", None):
+        # Streamed chunks carry grounding data on the candidate, usually only the last one
+        metadata = getattr(response.candidates[0], "grounding_metadata", None)
+    if metadata:
+        chunks = metadata.grounding_chunks
+        for chunk in chunks:
+            if hasattr(chunk, "web"):
+                sources.append({"title": chunk.web.title or "Source", "url": chunk.web.uri})
+    return sources
+
 async def generate_with_grounding(prompt, model_name="gemini-2.0-flash-exp", max_tokens=1000):
     try:
-        model = get_model(model_name)
-        response = model.generate_content(
-            prompt,
-            tools="google_search_retrieval"
-        )
-        sources = []
-        if hasattr(response, "grounding_metadata") and response.grounding_metadata:
-            chunks = response.grounding_metadata.grounding_chunks
-            for chunk in chunks:
-                if hasattr(chunk, "web"):
-                    sources.append({"title": chunk.web.title or "Source", "url": chunk.web.uri})
-        return {"text": response.text, "sources": sources}
+        response = await client.generate(model_name, prompt, tools="google_search_retrieval")
+        return {"text": response.text, "sources": extract_sources(response)}
+    except asyncio.TimeoutError:
+        return {"text": None, "sources": [], "error": "Gemini timed out after %ds" % client.timeout}
     except Exception as e:
+        note_quota_error(e)
         return {"text": None, "sources": [], "error": str(e)}
 
+async def stream_with_grounding(prompt, model_name="gemini-2.0-flash-exp"):
+    """Yield {"text": new_text, "sources": [...]} per chunk of a grounded answer.
+
+    Errors are yielded as a final {"error": ...} item instead of being raised.
+    """
+    try:
+        async for chunk in client.stream(model_name, prompt, tools="google_search_retrieval"):
+            try:
+                text = chunk.text
+            except ValueError:  # chunks with only metadata have no text parts
+                text = ""
+            yield {"text": text, "sources": extract_sources(chunk)}
+    except asyncio.TimeoutError:
+        yield {"error": "Gemini timed out after %ds" % client.timeout}
+    except Exception as e:
+        note_quota_error(e)
+        yield {"error": str(e)}
+
 async def generate_structured(prompt, response_schema=None, model_name="gemini-2.0-flash-exp"):
     try:
-        model = get_model(model_name)
         generation_config = {}
         if response_schema:
             generation_config["response_mime_type"] = "application/json"
             generation_config["response_schema"] = response_schema
-        response = model.generate_content(prompt, generation_config=generation_config)
+        response = await client.generate(model_name, prompt, generation_config=generation_config)
         return response.text
     except Exception as e:
+        note_quota_error(e)
         return None
@@ -30,8 +30,8 @@ def setup_help_commands(bot):
             inline=False
         )
         general_embed.add_field(
-            name="🏆 /top_media",
-            value="View top-rated media from the past week.\nExample: `/top_media`",
+            name="🏆 /top_media [window]",
+            value="View top-rated media from the past day, week, month or all time.\nExample: `/top_media window:Past month`",
             inline=False
         )
         general_embed.add_field(
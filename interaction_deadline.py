@@ -0,0 +1,118 @@
+import asyncio
+import functools
+
+import discord
+
+import outbound
+
+RESPONSE_WINDOW_SECONDS = 3.0
+DEFER_MARGIN_SECONDS = 0.8  # time left for the defer request itself to reach Discord
+
+defer_stats = {}  # command callback name -> {"calls": n, "deferred": n}
+
+
+def _interactive(func, *args, **kwargs):
+    return outbound.scheduler.submit(outbound.Priority.INTERACTIVE, func, *args, **kwargs)
+
+
+class ScheduledFollowup:
+    """Stands in for ``interaction.followup`` under ``auto_defer``.
+
+    Sends, edits and deletes go through the outbound scheduler as
+    interactive requests; everything else is passed through.
+    """
+
+    def __init__(self, followup):
+        self._followup = followup
+
+    def __getattr__(self, name):
+        return getattr(self._followup, name)
+
+    async def send(self, *args, **kwargs):
+        return await _interactive(self._followup.send, *args, **kwargs)
+
+    async def edit_message(self, *args, **kwargs):
+        return await _interactive(self._followup.edit_message, *args, **kwargs)
+
+    async def delete_message(self, *args, **kwargs):
+        return await _interactive(self._followup.delete_message, *args, **kwargs)
+
+
+class DeadlineResponse:
+    """Stands in for ``interaction.response`` while a command runs under ``auto_defer``.
+
+    If the command has been deferred automatically, ``send_message`` becomes a
+    followup and ``defer`` becomes a no-op, so handlers need no changes.
+    Defers, replies and edits go through the outbound scheduler as interactive
+    requests. Everything else is passed through to the real response.
+    """
+
+    def __init__(self, interaction, response, ephemeral):
+        self._interaction = interaction
+        self._response = response
+        self._ephemeral = ephemeral
+        self._lock = asyncio.Lock()
+        self.auto_deferred = False
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+    async def defer_now(self):
+        """Defer unless the handler already answered; returns True if this call deferred."""
+        async with self._lock:
+            if self._response.is_done():
+                return False
+            await _interactive(self._response.defer, ephemeral=self._ephemeral, thinking=True)
+            self.auto_deferred = True
+            return True
+
+    async def defer(self, **kwargs):
+        async with self._lock:
+            if not self.auto_deferred:
+                await _interactive(self._response.defer, **kwargs)
+
+    async def send_message(self, *args, **kwargs):
+        async with self._lock:
+            if not self.auto_deferred:
+                return await _interactive(self._response.send_message, *args, **kwargs)
+        kwargs.pop("delete_after", None)  # not supported on followups
+        await self._interaction.followup.send(*args, **kwargs)
+
+    async def edit_message(self, *args, **kwargs):
+        return await _interactive(self._response.edit_message, *args, **kwargs)
+
+
+async def _defer_after(response, delay, stats):
+    await asyncio.sleep(delay)
+    try:
+        if await response.defer_now():
+            stats["deferred"] += 1
+    except discord.HTTPException as e:
+        print(f"Auto-defer failed: {e}")
+
+
+def auto_defer(ephemeral=False, budget=RESPONSE_WINDOW_SECONDS - DEFER_MARGIN_SECONDS):
+    """Defer a slash command automatically if it hasn't answered when its budget runs out.
+
+    The budget counts from the interaction's creation, so gateway delay is
+    included. Use ``ephemeral=True`` for commands that answer ephemerally,
+    since a deferral fixes the visibility of the eventual reply. The command's
+    responses and followups are sent as interactive outbound requests.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(interaction: discord.Interaction, *args, **kwargs):
+            stats = defer_stats.setdefault(func.__name__, {"calls": 0, "deferred": 0})
+            stats["calls"] += 1
+
+            response = DeadlineResponse(interaction, interaction.response, ephemeral)
+            interaction._cs_response = response  # the slot discord.py caches Interaction.response in
+            interaction._cs_followup = ScheduledFollowup(interaction.followup)  # likewise for .followup
+            elapsed = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+            timer = asyncio.create_task(_defer_after(response, min(max(0.0, budget - elapsed), budget), stats))
+            try:
+                return await func(interaction, *args, **kwargs)
+            finally:
+                timer.cancel()
+        return wrapper
+    return decorator
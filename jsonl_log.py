@@ -0,0 +1,66 @@
+import json
+from datetime import date, datetime
+
+
+class RotatingJsonlLog:
+    """Append-only JSON Lines log that rolls over by size and by day.
+
+    Each append writes a single line, so cost does not grow with history.
+    Rolled-over segments are named ``<stem>-YYYYmmdd-HHMMSS<suffix>`` next to
+    the live file, which keeps them in chronological order when sorted by name.
+    """
+
+    def __init__(self, path, max_bytes=5 * 1024 * 1024, rotate_daily=True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+
+    def segments(self):
+        """Rolled-over segments oldest first, then the live file."""
+        rolled = sorted(self.path.parent.glob(f"{self.path.stem}-*{self.path.suffix}"))
+        return rolled + ([self.path] if self.path.exists() else [])
+
+    def _should_rotate(self):
+        if not self.path.exists():
+            return False
+        stat = self.path.stat()
+        if stat.st_size == 0:
+            return False
+        if self.max_bytes and stat.st_size >= self.max_bytes:
+            return True
+        return self.rotate_daily and date.fromtimestamp(stat.st_mtime) != date.today()
+
+    def rotate(self):
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        target = self.path.with_name(f"{self.path.stem}-{stamp}{self.path.suffix}")
+        n = 1
+        while target.exists():
+            target = self.path.with_name(f"{self.path.stem}-{stamp}.{n}{self.path.suffix}")
+            n += 1
+        self.path.rename(target)
+
+    def append(self, record):
+        if self._should_rotate():
+            self.rotate()
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def extend(self, records):
+        with open(self.path, "a") as f:
+            for record in records:
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def read(self, since=None):
+        """Yield records oldest first; with `since` (POSIX time), skip segments last written before it."""
+        for segment in self.segments():
+            if since is not None and segment.stat().st_mtime < since:
+                continue
+            with open(segment, "r") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn final line from a crash mid-write
@@ -0,0 +1,126 @@
+import json
+import threading
+
+import config
+import selection
+from config import LIVE_CONFIG_FILE
+from state_journal import write_json_atomic
+
+
+def _at_least(minimum):
+    return lambda value: None if value >= minimum else f"must be at least {minimum}"
+
+
+def _strategy(value):
+    # Checked against the registry at validation time so strategies registered later count too
+    return None if value in selection.STRATEGIES else f"must be one of: {', '.join(selection.STRATEGIES)}"
+
+
+def _one_of(*choices):
+    return lambda value: None if value in choices else f"must be one of: {', '.join(choices)}"
+
+
+# name -> (type, validator returning an error message or None)
+SETTINGS = {
+    "IMAGES_PER_BATCH": (int, _at_least(0)),
+    "VIDEOS_PER_BATCH": (int, _at_least(0)),
+    "MAX_UPLOAD_SIZE_MB": (int, _at_least(1)),
+    "SELECTION_ORDER": (str, _strategy),
+    "ARCHIVE_RETENTION_DAYS": (int, _at_least(0)),
+    "ARCHIVE_QUOTA_MB": (int, _at_least(0)),
+    "ARCHIVE_EVICTION_POLICY": (str, _one_of("oldest", "lowest_rated")),
+    "MEDIA_CHANNEL_ID": (int, _at_least(1)),
+    "MOVIES_CHANNEL_ID": (int, _at_least(1)),
+}
+
+
+class LiveConfig:
+    """Runtime-tunable settings layered over the values config.py read at startup.
+
+    Overrides live in a JSON file. ``update()`` validates every change before
+    any is applied, writes the file atomically and then notifies subscribers
+    with a {name: new_value} dict; ``reload()`` picks up edits made to the file
+    by hand the same way. Invalid files are rejected whole and the current
+    values are kept.
+    """
+
+    def __init__(self, path, specs, defaults):
+        self.path = path
+        self.specs = specs
+        self.defaults = defaults
+        self._values = dict(defaults)
+        self._overrides = {}
+        self._mtime = None
+        self._subscribers = []
+        self._lock = threading.RLock()
+
+    def __getattr__(self, name):
+        specs = self.__dict__.get("specs", {})
+        if name in specs:
+            return self._values[name]
+        raise AttributeError(name)
+
+    def as_dict(self):
+        return dict(self._values)
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def validate(self, changes):
+        """Return `changes` coerced to each setting's type, or raise ValueError naming the bad one."""
+        coerced = {}
+        for name, value in changes.items():
+            if name not in self.specs:
+                raise ValueError(f"Unknown setting {name}")
+            kind, check = self.specs[name]
+            try:
+                value = kind(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{name} must be {kind.__name__}")
+            error = check(value)
+            if error:
+                raise ValueError(f"{name} {error}")
+            coerced[name] = value
+        return coerced
+
+    def _apply(self, overrides):
+        values = {**self.defaults, **overrides}
+        changed = {name: value for name, value in values.items() if self._values.get(name) != value}
+        self._overrides = overrides
+        self._values = values  # one reference swap, so readers never see a half-applied change
+        for callback in list(self._subscribers):
+            if changed:
+                try:
+                    callback(changed)
+                except Exception as e:
+                    print(f"Config subscriber {callback.__name__} failed: {e}")
+        return changed
+
+    def update(self, **changes):
+        with self._lock:
+            overrides = {**self._overrides, **self.validate(changes)}
+            write_json_atomic(self.path, overrides, indent=2)
+            self._mtime = self.path.stat().st_mtime
+            return self._apply(overrides)
+
+    def reload(self, force=False):
+        """Re-read the overrides file if it changed; returns the settings that changed."""
+        with self._lock:
+            mtime = self.path.stat().st_mtime if self.path.exists() else None
+            if mtime == self._mtime and not force:
+                return {}
+            try:
+                overrides = {}
+                if mtime is not None:
+                    with open(self.path, "r") as f:
+                        overrides = self.validate(json.load(f))
+            except (ValueError, OSError) as e:  # JSONDecodeError is a ValueError
+                print(f"Ignoring {self.path}: {e}")
+                self._mtime = mtime
+                return {}
+            self._mtime = mtime
+            return self._apply(overrides)
+
+
+settings = LiveConfig(LIVE_CONFIG_FILE, SETTINGS, {name: getattr(config, name) for name in SETTINGS})
+settings.reload(force=True)
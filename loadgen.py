@@ -0,0 +1,440 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import traceback
+import types
+import zlib
+from collections import Counter, defaultdict
+from pathlib import Path
+
+# Every state file the bot touches, pointed into a scratch directory before config is imported
+SANDBOX_PATHS = {
+    "MEDIA_FOLDER": "media",
+    "ARCHIVE_FOLDER": "archive",
+    "HISTORY_FILE": "upload_history.json",
+    "LIVE_CONFIG_FILE": "live_config.json",
+    "SCHEDULE_CONFIG_FILE": "schedule_config.json",
+    "USER_DATA_FILE": "user_data.json",
+    "MEDIA_RATINGS_FILE": "media_ratings.json",
+    "JOURNAL_FILE": "state_journal.json",
+    "ARCHIVE_INDEX_FILE": "archive_index.json",
+    "ARCHIVE_MANIFEST_FILE": "archive_manifest.json",
+    "POLLS_FILE": "polls.json",
+    "SHOW_ALIAS_FILE": "show_aliases.json",
+    "TITLE_INDEX_FILE": "title_index.json",
+    "UPLOAD_QUEUE_FILE": "upload_queue.db",
+}
+
+BOT_USER_ID = 1
+USER_BASE = 10**17
+POST_BASE = 2 * 10**17
+POLL_BASE = 3 * 10**17
+CHANNEL_ID = 4 * 10**17
+GUILD_ID = 5 * 10**17
+FILES_PER_POST = 3
+POLL_OPTIONS = 4
+LAG_INTERVAL_SECONDS = 0.01
+
+
+def percentiles(samples):
+    """(p50, p99, max) of a list of seconds, in milliseconds."""
+    if not samples:
+        return 0.0, 0.0, 0.0
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+    return pick(0.5), pick(0.99), ordered[-1] * 1000
+
+
+def process_io():
+    """Bytes and syscalls from /proc/self/io (Linux), or None elsewhere."""
+    try:
+        with open("/proc/self/io") as f:
+            return {key: int(value) for key, value in (line.split(": ") for line in f)}
+    except OSError:
+        return None
+
+
+# ========== Traffic ==========
+
+def synthesize(args, rng):
+    """Reaction storm over seeded posts and polls plus bursts of slash commands, sorted by time."""
+    from media_functions import RATING_EMOJIS
+    from movie_functions import POLL_EMOJIS
+
+    posts = [POST_BASE + i for i in range(args.posts)]
+    polls = [POLL_BASE + i for i in range(args.polls)]
+    events = []
+    for i in range(int(args.duration * args.reactions_per_second)):
+        event = {"t": i / args.reactions_per_second, "user_id": USER_BASE + rng.randrange(args.users)}
+        if polls and rng.random() < args.poll_share:
+            removed = rng.random() < args.remove_ratio
+            event.update(kind="reaction_remove" if removed else "reaction_add", target="poll",
+                         message_id=rng.choice(polls), emoji=rng.choice(POLL_EMOJIS[:POLL_OPTIONS]))
+        else:
+            event.update(kind="reaction_add", target="post", message_id=rng.choice(posts),
+                         emoji=rng.choice(RATING_EMOJIS))
+        events.append(event)
+
+    mix = dict(item.split("=") for item in args.command_mix.split(","))
+    names, weights = list(mix), [float(w) for w in mix.values()]
+    t = 0.0
+    while t < args.duration:
+        for _ in range(args.burst_size):
+            name = rng.choices(names, weights)[0]
+            command_args = {"movie_name": f"Load Test Movie {rng.randrange(20)}"} if name == "movie" else {}
+            events.append({"t": t, "kind": "command", "name": name, "args": command_args,
+                           "user_id": USER_BASE + rng.randrange(args.users)})
+        t += args.burst_interval
+    events.sort(key=lambda event: event["t"])
+    return events
+
+
+def load_events(path):
+    with open(path) as f:
+        return sorted((json.loads(line) for line in f if line.strip()), key=lambda event: event["t"])
+
+
+def expected_votes(events):
+    """Reference tallies: distinct reacting users per post, last surviving pick per user per poll."""
+    post_voters = defaultdict(set)
+    poll_picks = defaultdict(dict)
+    for event in events:
+        if event["kind"] == "reaction_add" and event["target"] == "post":
+            post_voters[event["message_id"]].add(event["user_id"])
+        elif event["kind"].startswith("reaction") and event["target"] == "poll":
+            picks = poll_picks[event["message_id"]].setdefault(event["user_id"], [])
+            if event["emoji"] in picks:
+                picks.remove(event["emoji"])
+            if event["kind"] == "reaction_add":
+                picks.append(event["emoji"])
+    return post_voters, poll_picks
+
+
+# ========== Fakes ==========
+
+class FakeResponse:
+    """Just enough of InteractionResponse; each call costs one simulated Discord round trip."""
+
+    def __init__(self, interaction):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def _ack(self):
+        if self._done:
+            raise RuntimeError("Interaction has already been responded to")
+        self._done = True
+        self._interaction.acked_at = time.perf_counter()
+        await asyncio.sleep(self._interaction.rtt)
+
+    async def send_message(self, *args, **kwargs):
+        await self._ack()
+
+    async def defer(self, **kwargs):
+        await self._ack()
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self._interaction = interaction
+
+    async def send(self, *args, **kwargs):
+        await asyncio.sleep(self._interaction.rtt)
+
+
+class FakeInteraction:
+    def __init__(self, discord, user_id, rtt):
+        self.user = types.SimpleNamespace(
+            id=user_id,
+            display_name=f"user{user_id}",
+            mention=f"<@{user_id}>",
+            guild_permissions=types.SimpleNamespace(administrator=False),
+        )
+        self.guild_id = GUILD_ID
+        self.channel_id = CHANNEL_ID
+        self.created_at = discord.utils.utcnow()
+        self.started = time.perf_counter()
+        self.acked_at = None
+        self.rtt = rtt
+        self._cs_response = FakeResponse(self)  # auto_defer swaps this slot, like on a real Interaction
+        self._cs_followup = FakeFollowup(self)
+
+    @property
+    def response(self):
+        return self._cs_response
+
+    @property
+    def followup(self):
+        return self._cs_followup
+
+
+def fake_tmdb(client, latency):
+    """Canned TMDB answers after `latency` seconds, in place of TMDBClient._fetch."""
+    async def fetch(path, params):
+        client.upstream_calls += 1
+        await asyncio.sleep(latency)
+        parts = path.strip("/").split("/")
+        if parts[:2] == ["search", "movie"]:
+            movie_id = zlib.crc32(params.get("query", "").encode()) % 10**6
+            return {"results": [{"id": movie_id, "title": params.get("query"), "overview": "Synthetic.",
+                                 "release_date": "2000-01-01", "vote_average": 7.0, "vote_count": 100}]}
+        if parts[0] == "movie" and parts[-1] == "similar":
+            return {"results": [{"id": int(parts[1]) + n, "title": f"Similar {n}"} for n in range(1, 4)]}
+        if parts[0] == "movie":
+            return {"id": int(parts[1]), "title": f"Movie {parts[1]}", "overview": "Synthetic."}
+        return {}
+    return fetch
+
+
+# ========== Run ==========
+
+def seed_state(mf, mov, events, rng, args):
+    """Queued media files, posted batches for reaction votes, watchlists and open polls."""
+    import compact_store
+
+    for i in range(args.media_files):
+        path = mf.MEDIA_FOLDER / (f"queued_{i:05d}.jpg" if i % 2 else f"queued_{i:05d}.mp4")
+        with open(path, "wb") as f:
+            f.truncate(rng.randint(50_000, 5_000_000))  # sparse: real sizes without writing the bytes
+
+    posts = sorted({event["message_id"] for event in events if event.get("target") == "post"})
+    polls = sorted({event["message_id"] for event in events if event.get("target") == "poll"})
+    post_files = {message_id: [f"posted_{message_id}_{j}.jpg" for j in range(FILES_PER_POST)] for message_id in posts}
+    metadata = {
+        name: {"upload_date": "2024-01-01T12:00:00", "message_id": message_id}
+        for message_id, names in post_files.items() for name in names
+    }
+    mf.save_history({"uploaded_files": list(metadata), "metadata": metadata})
+
+    users = {event["user_id"] for event in events}
+    posted = list(metadata)
+    user_data = {}
+    for user_id in users:
+        entry = compact_store.new_user_entry()
+        for name in rng.sample(posted, min(5, len(posted))):
+            entry["watchlist"][name] = None
+        user_data[str(user_id)] = entry
+    mf.save_user_data(user_data)
+
+    closes_at = time.time() + 24 * 60 * 60
+    for message_id in polls:
+        options = [f"Option {n + 1}" for n in range(POLL_OPTIONS)]
+        mov.polls.open(message_id, CHANNEL_ID, options, mov.POLL_EMOJIS[:POLL_OPTIONS], closes_at)
+        mov.poll_wheel.schedule(str(message_id), closes_at)
+    return post_files
+
+
+async def watch_loop_lag(samples, stop):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL_SECONDS)
+        samples.append(time.perf_counter() - started - LAG_INTERVAL_SECONDS)
+
+
+async def run(args):
+    import discord
+    from discord.ext import commands
+
+    import interaction_deadline
+    import media_functions as mf
+    import movie_functions as mov
+    import rate_limit
+    import tmdb_functions
+    from poll_engine import PollBook
+
+    rng = random.Random(args.seed)
+    events = load_events(args.replay) if args.replay else synthesize(args, rng)
+    if args.save:
+        with open(args.save, "w") as f:
+            f.writelines(json.dumps(event) + "\n" for event in events)
+
+    bot = commands.Bot(command_prefix=commands.when_mentioned, intents=discord.Intents.none())
+    bot._connection.user = types.SimpleNamespace(id=BOT_USER_ID)  # handlers skip the bot's own reactions
+    mf.setup(bot)
+    mov.setup(bot)
+    tmdb_functions.client._fetch = fake_tmdb(tmdb_functions.client, args.tmdb_latency_ms / 1000)
+    if args.no_rate_limit:
+        rate_limit.limiter.command_limits = {}
+    post_files = seed_state(mf, mov, events, rng, args)
+    mov.poll_ticker.start()
+    mf.state_flusher.start()
+
+    reaction_handlers = {
+        "reaction_add": [("media.on_raw_reaction_add", bot.on_raw_reaction_add)],
+        "reaction_remove": [],
+    }
+    for kind in reaction_handlers:
+        for listener in bot.extra_events.get(f"on_raw_{kind}", []):
+            reaction_handlers[kind].append((f"movie.{listener.__name__}", listener))
+
+    latencies = defaultdict(list)
+    acks = defaultdict(list)
+    errors = Counter()
+    first_error = {}
+
+    async def timed(name, handler, *handler_args, **handler_kwargs):
+        started = time.perf_counter()
+        try:
+            await handler(*handler_args, **handler_kwargs)
+        except Exception as e:
+            errors[name] += 1
+            first_error.setdefault(name, "".join(traceback.format_exception_only(type(e), e)).strip())
+        latencies[name].append(time.perf_counter() - started)
+
+    async def command(name, callback, interaction, command_args):
+        await timed(f"/{name}", callback, interaction, **command_args)
+        if interaction.acked_at is not None:
+            acks[f"/{name}"].append(interaction.acked_at - interaction.started)
+
+    lag = []
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(watch_loop_lag(lag, stop))
+    io_before = process_io()
+    slips = []
+    pending = set()
+    start = time.perf_counter()
+    for event in events:
+        delay = start + event["t"] - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        else:
+            slips.append(-delay)
+        if event["kind"] == "command":
+            interaction = FakeInteraction(discord, event["user_id"], args.discord_rtt_ms / 1000)
+            callback = bot.tree.get_command(event["name"]).callback
+            jobs = [command(event["name"], callback, interaction, event.get("args", {}))]
+        else:
+            payload = types.SimpleNamespace(
+                message_id=event["message_id"], user_id=event["user_id"], emoji=event["emoji"],
+                channel_id=CHANNEL_ID, guild_id=GUILD_ID, member=None, event_type=event["kind"],
+            )
+            jobs = [timed(name, handler, payload) for name, handler in reaction_handlers[event["kind"]]]
+        for job in jobs:
+            task = asyncio.create_task(job)
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+    dispatched = time.perf_counter() - start
+    if pending:
+        await asyncio.wait(pending, timeout=args.drain_timeout)
+    stop.set()
+    await lag_task
+    mov.poll_ticker.cancel()
+    mf.state_flusher.cancel()
+    mov.polls.flush()
+    async with mf.state_lock:
+        mf.flush_state()
+    io_after = process_io()
+
+    # ========== Report ==========
+    print(f"\nReplayed {len(events)} events in {dispatched:.1f}s ({len(events) / max(dispatched, 1e-9):.0f}/s); "
+          f"{len(slips)} dispatched late, p99 slip {percentiles(slips)[1]:.1f} ms; {len(pending)} still running")
+    print(f"\n{'Handler':<36}{'calls':>8}{'errors':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for name in sorted(latencies):
+        p50, p99, worst = percentiles(latencies[name])
+        print(f"{name:<36}{len(latencies[name]):>8}{errors[name]:>8}{p50:>10.1f}{p99:>10.1f}{worst:>10.1f}")
+    for name, message in first_error.items():
+        print(f"  {name}: {message}")
+
+    if acks:
+        print(f"\n{'Command ack (first response)':<36}{'acked':>8}{'late':>8}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for name in sorted(acks):
+            p50, p99, worst = percentiles(acks[name])
+            late = sum(1 for ack in acks[name] if ack > interaction_deadline.RESPONSE_WINDOW_SECONDS)
+            print(f"{name:<36}{len(acks[name]):>8}{late:>8}{p50:>10.1f}{p99:>10.1f}{worst:>10.1f}")
+        deferred = sum(stats["deferred"] for stats in interaction_deadline.defer_stats.values())
+        print(f"Auto-deferred: {deferred}; rate-limited: {rate_limit.limiter.denied}; "
+              f"TMDB upstream calls: {tmdb_functions.client.upstream_calls}, "
+              f"coalesced: {tmdb_functions.client.coalesced_calls}")
+
+    p50, p99, worst = percentiles(lag)
+    print(f"\nEvent loop lag: p50 {p50:.1f} ms, p99 {p99:.1f} ms, max {worst:.1f} ms")
+
+    post_voters, poll_picks = expected_votes(events)
+    ratings = mf.load_media_ratings()
+    lost = duplicated = expected_total = 0
+    for message_id, names in post_files.items():
+        expected = len(post_voters.get(message_id, ()))
+        for name in names:
+            recorded = ratings.get(name, {}).get("votes", 0)
+            expected_total += expected
+            lost += max(0, expected - recorded)
+            duplicated += max(0, recorded - expected)
+    print(f"Media votes: expected {expected_total}, lost {lost}, duplicated {duplicated}")
+
+    on_disk = PollBook(mov.polls.path)
+    poll_lost = poll_duplicated = poll_total = 0
+    for message_id, picks in poll_picks.items():
+        poll = on_disk.get(message_id)
+        recorded = on_disk.tally(message_id) if poll else [0] * POLL_OPTIONS
+        expected = Counter(p[-1] for p in picks.values() if p)
+        for option, emoji in enumerate(mov.POLL_EMOJIS[:POLL_OPTIONS]):
+            poll_total += expected[emoji]
+            poll_lost += max(0, expected[emoji] - recorded[option])
+            poll_duplicated += max(0, recorded[option] - expected[emoji])
+    print(f"Poll votes: expected {poll_total}, lost {poll_lost}, duplicated {poll_duplicated}")
+
+    if io_before and io_after:
+        delta = {key: io_after[key] - io_before[key] for key in io_before}
+        print(f"File I/O: read {delta['rchar'] / 2**20:.1f} MB in {delta['syscr']} calls, "
+              f"wrote {delta['wchar'] / 2**20:.1f} MB in {delta['syscw']} calls "
+              f"({delta['write_bytes'] / 2**20:.1f} MB reached the disk)")
+    else:
+        print("File I/O: not available on this platform (/proc/self/io)")
+
+    return 1 if lost or duplicated or poll_lost or poll_duplicated else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay gateway traffic against the bot's real reaction and slash command handlers "
+                    "in a scratch sandbox, with fake Discord and TMDB round trips."
+    )
+    parser.add_argument("--duration", type=float, default=10, help="seconds of synthetic traffic")
+    parser.add_argument("--reactions-per-second", type=float, default=2000)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--posts", type=int, default=20, help="posted batches receiving rating reactions")
+    parser.add_argument("--polls", type=int, default=3, help="open movie polls receiving votes")
+    parser.add_argument("--poll-share", type=float, default=0.3, help="fraction of reactions aimed at polls")
+    parser.add_argument("--remove-ratio", type=float, default=0.1, help="fraction of poll reactions that are removals")
+    parser.add_argument("--burst-size", type=int, default=50, help="slash commands per burst")
+    parser.add_argument("--burst-interval", type=float, default=2.0, help="seconds between command bursts")
+    parser.add_argument("--command-mix", default="check_media=1,watchlist=2,movie=2",
+                        help="command=weight pairs used in bursts")
+    parser.add_argument("--media-files", type=int, default=500, help="queued files created for /check_media")
+    parser.add_argument("--discord-rtt-ms", type=float, default=60, help="simulated Discord response round trip")
+    parser.add_argument("--tmdb-latency-ms", type=float, default=150, help="simulated TMDB response time")
+    parser.add_argument("--no-rate-limit", action="store_true", help="disable per-command token buckets")
+    parser.add_argument("--drain-timeout", type=float, default=60, help="seconds to wait for handlers after the last event")
+    parser.add_argument("--replay", help="JSONL events to replay instead of synthetic traffic")
+    parser.add_argument("--save", help="write the events that were run to this JSONL file")
+    parser.add_argument("--sandbox", help="state directory (default: a new temp dir)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for name in ("replay", "save"):
+        if getattr(args, name):
+            setattr(args, name, os.path.abspath(getattr(args, name)))
+    sandbox = Path(args.sandbox or tempfile.mkdtemp(prefix="loadgen-")).resolve()
+    sandbox.mkdir(parents=True, exist_ok=True)
+    for name, default in SANDBOX_PATHS.items():
+        os.environ[name] = str(sandbox / default)
+    os.environ["TMDB_MOVIE_EXPORT_FILE"] = ""
+    os.environ["TMDB_TV_EXPORT_FILE"] = ""
+    os.environ["UPLOAD_WORKER"] = "false"
+    # config.py reads secrets.txt from the working directory; nothing here talks to Discord or TMDB
+    os.chdir(sandbox)
+    with open("secrets.txt", "w") as f:
+        f.write("DISCORD_TOKEN=loadgen\nTMDB_API_KEY=loadgen\n")
+    print(f"Sandbox: {sandbox}")
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,26 @@
 import discord
 from discord.ext import tasks
 import json
-import shutil
-import random
+import hashlib
+import uuid
 import asyncio
-from datetime import datetime, timedelta, time
+import heapq
+from datetime import datetime, timedelta, time, timezone
 from tqdm import tqdm
+from media_index import MediaIndex, LEADERBOARD_WINDOWS
+import compact_store
+from archive_retention import RetentionIndex
+from archive_store import ArchiveStore, archive_id
+from state_journal import StateJournal, write_json_atomic
+import outbound
+import selection
+from interaction_deadline import auto_defer
+from live_config import settings
+from upload_worker import UploadQueue, send_via_worker
 from config import (
-    MEDIA_CHANNEL_ID,
-    IMAGES_PER_BATCH,
-    VIDEOS_PER_BATCH,
-    ARCHIVE_RETENTION_DAYS,
-    MAX_UPLOAD_SIZE_MB,
-    SELECTION_ORDER,
+    ARCHIVE_INDEX_FILE,
+    ARCHIVE_MANIFEST_FILE,
+    ARCHIVE_COMPRESSION,
     IMAGE_EXTENSIONS,
     VIDEO_EXTENSIONS,
     MEDIA_FOLDER,
@@ -22,10 +30,19 @@ from config import (
     MEDIA_RATINGS_FILE,
     BOT_OWNER_ID,
     USER_DATA_FILE,
+    JOURNAL_FILE,
+    UPLOAD_WORKER,
+    UPLOAD_WORKER_CLAIM_TIMEOUT_SECONDS,
+    UPLOAD_QUEUE_FILE,
 )
 
 # ========== JSON Data Management ========== 
 
+# Every read-modify-write of the JSON state files runs on the bot's event loop
+# while holding this lock, so slash commands, reaction events and TUI requests
+# (see bot_control.py) go through a single writer instead of clobbering each other.
+state_lock = asyncio.Lock()
+
 def load_history():
     if HISTORY_FILE.exists():
         with open(HISTORY_FILE, "r") as f:
@@ -33,8 +50,15 @@ def load_history():
     return {"uploaded_files": []}
 
 def save_history(history):
-    with open(HISTORY_FILE, "w") as f:
-        json.dump(history, f, indent=2)
+    write_json_atomic(HISTORY_FILE, history, indent=2)
+
+media_index = MediaIndex()
+
+def get_media_index():
+    """Return the upload/leaderboard index, building it from disk on first use."""
+    if not media_index.loaded:
+        media_index.load(load_history().get("metadata", {}), get_ratings())
+    return media_index
 
 def load_schedule_config():
     if SCHEDULE_CONFIG_FILE.exists():
@@ -47,124 +71,250 @@ def save_schedule_config(config):
         json.dump(config, f, indent=2)
 
 def load_media_ratings():
+    """Return {filename: {"votes": int, "voters": set of int user IDs}}."""
     if MEDIA_RATINGS_FILE.exists():
         with open(MEDIA_RATINGS_FILE, "r") as f:
-            return json.load(f)
+            return compact_store.ratings_from_disk(json.load(f))
     return {}
 
 def save_media_ratings(ratings):
-    with open(MEDIA_RATINGS_FILE, "w") as f:
-        json.dump(ratings, f, indent=2)
+    write_json_atomic(MEDIA_RATINGS_FILE, compact_store.ratings_to_disk(ratings), separators=(",", ":"))
 
 def load_user_data():
+    """Return {user_id_str: {"watched": {filename: None}, "watchlist": {filename: None}}}."""
     if USER_DATA_FILE.exists():
         with open(USER_DATA_FILE, "r") as f:
-            return json.load(f)
+            return compact_store.user_data_from_disk(json.load(f))
     return {}
 
 def save_user_data(user_data):
-    with open(USER_DATA_FILE, "w") as f:
-        json.dump(user_data, f, indent=2)
+    write_json_atomic(USER_DATA_FILE, compact_store.user_data_to_disk(user_data), separators=(",", ":"))
+
+# Once loaded, ratings and user data live in memory and are the source of truth.
+# Changes only mark them dirty; state_flusher writes them out every
+# STATE_FLUSH_SECONDS, so a reaction storm doesn't rewrite both files per click.
+STATE_FLUSH_SECONDS = 5
+_ratings = None
+_user_data = None
+_dirty = set()
+
+def get_ratings():
+    global _ratings
+    if _ratings is None:
+        _ratings = load_media_ratings()
+    return _ratings
+
+def get_user_data():
+    global _user_data
+    if _user_data is None:
+        _user_data = load_user_data()
+    return _user_data
+
+def mark_dirty(*names):
+    _dirty.update(names)
+
+def flush_state():
+    """Write out whichever of ratings/user data changed. Callers must hold ``state_lock``."""
+    if "ratings" in _dirty:
+        save_media_ratings(get_ratings())
+    if "user_data" in _dirty:
+        save_user_data(get_user_data())
+    _dirty.clear()
+
+# Read-side copy of each user's watched/watchlist order, so paging through
+# /watched and /watchlist never copies the underlying dicts.
+_user_lists = None
+
+def touch_user(user_id):
+    """Record that one user's lists changed: refresh their read-side copy and mark user data dirty."""
+    user_id = str(user_id)
+    if _user_lists is not None:
+        entry = get_user_data().get(user_id, compact_store.new_user_entry())
+        _user_lists[user_id] = {"watched": list(entry["watched"]), "watchlist": list(entry["watchlist"])}
+    mark_dirty("user_data")
+
+def get_user_list(user_id, kind):
+    """Return the user's "watched" or "watchlist" filenames in insertion order."""
+    global _user_lists
+    if _user_lists is None:
+        _user_lists = {
+            uid: {"watched": list(entry["watched"]), "watchlist": list(entry["watchlist"])}
+            for uid, entry in get_user_data().items()
+        }
+    return _user_lists.get(str(user_id), {}).get(kind, [])
 
-class RemoveWatchlistItemView(discord.ui.View):
-    def __init__(self, user_id, watchlist_items, timeout=180):
+class MediaListView(discord.ui.View):
+    """Paginated /watched or /watchlist view backed by the in-memory user list index.
+
+    Only the visible page is rendered; the next page is prepared right after a
+    page is shown so "Next" answers without any extra work. Select options carry
+    a short hash of the filename (values are capped at 100 characters), so a
+    click removes the title it showed even if the list changed in between.
+    """
+
+    PAGE_SIZE = 10
+    TITLES = {
+        "watched": ("🎬 {name}'s Watched Media", 0x2ECC71),
+        "watchlist": ("👀 {name}'s Watchlist", 0x3498DB),
+    }
+
+    def __init__(self, user_id, kind, display_name, guild_id=None, timeout=180):
         super().__init__(timeout=timeout)
         self.user_id = str(user_id)
-        self.watchlist_items = watchlist_items # Pass filenames
-
-        # Add buttons for each item
-        for i, filename in enumerate(watchlist_items):
-            # Max 25 components per view, and 5 per row.
-            # If there are many items, we might need pagination or select dropdown
-            if i < 25: # Discord button limit
-                self.add_item(discord.ui.Button(
-                    label=f"Remove {i+1}",
-                    custom_id=f"remove_wl_{filename}",
-                    style=discord.ButtonStyle.red
-                ))
-
-    @discord.ui.button(label="Clear All", style=discord.ButtonStyle.red, custom_id="remove_wl_all")
-    async def clear_all_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.kind = kind
+        self.display_name = display_name
+        self.guild_id = guild_id
+        self.page = 0
+        self._prefetched = None  # (page, items, embed)
+        self._option_files = {}  # select option value -> filename it was rendered for
+
+        self.remove_select = discord.ui.Select(placeholder="Remove an item from this page...", row=0)
+        self.remove_select.callback = self.on_remove
+        if kind != "watchlist":
+            self.remove_item(self.clear_all_button)
+
+    def page_count(self):
+        total = len(get_user_list(self.user_id, self.kind))
+        return max(1, -(-total // self.PAGE_SIZE))
+
+    def _render(self, page):
+        items = get_user_list(self.user_id, self.kind)[page * self.PAGE_SIZE:(page + 1) * self.PAGE_SIZE]
+        title, color = self.TITLES[self.kind]
+        embed = discord.Embed(title=title.format(name=self.display_name), color=color)
+
+        index = get_media_index()
+        description = []
+        for i, filename in enumerate(items, page * self.PAGE_SIZE + 1):
+            message_id = index.message_id(filename)
+            if message_id and self.guild_id:
+                message_link = f"https://discord.com/channels/{self.guild_id}/{settings.MEDIA_CHANNEL_ID}/{message_id}"
+                description.append(f"{i}. [{filename}]({message_link})")
+            else:
+                description.append(f"{i}. {filename}")
+        embed.description = "\n".join(description) or "Nothing here."
+
+        total = len(get_user_list(self.user_id, self.kind))
+        embed.set_footer(text=f"Page {page + 1}/{self.page_count()} • {total} item{'s' if total != 1 else ''}")
+        return items, embed
+
+    def show_page(self, page):
+        """Switch to `page` and return its embed, then warm up the following page."""
+        self.page = min(max(page, 0), self.page_count() - 1)
+        if self._prefetched and self._prefetched[0] == self.page:
+            _, items, embed = self._prefetched
+        else:
+            items, embed = self._render(self.page)
+
+        if self.kind == "watchlist":
+            if self.remove_select in self.children:
+                self.remove_item(self.remove_select)
+            if items:
+                self._option_files = {hashlib.sha1(filename.encode()).hexdigest()[:16]: filename for filename in items}
+                self.remove_select.options = [
+                    discord.SelectOption(label=filename[:100], value=value)
+                    for value, filename in self._option_files.items()
+                ]
+                self.add_item(self.remove_select)
+
+        self.previous_button.disabled = self.page == 0
+        self.next_button.disabled = self.page >= self.page_count() - 1
+
+        next_page = self.page + 1
+        self._prefetched = (next_page, *self._render(next_page)) if next_page < self.page_count() else None
+        return embed
+
+    def _invalidate(self):
+        self._prefetched = None
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
         if str(interaction.user.id) != self.user_id:
             await interaction.response.send_message("❌ You can only modify your own watchlist.", ephemeral=True)
-            return
-        
-        user_data = load_user_data()
-        user_data_for_user = user_data.get(self.user_id, {"watched": [], "watchlist": []})
-        user_data_for_user["watchlist"] = []
-        user_data[self.user_id] = user_data_for_user
-        save_user_data(user_data)
+            return False
+        return True
+
+    @discord.ui.button(label="◀ Prev", style=discord.ButtonStyle.grey, row=1)
+    async def previous_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.edit_message(embed=self.show_page(self.page - 1), view=self)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.grey, row=1)
+    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.edit_message(embed=self.show_page(self.page + 1), view=self)
+
+    @discord.ui.button(label="Clear All", style=discord.ButtonStyle.red, row=1)
+    async def clear_all_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        async with state_lock:
+            get_user_data().setdefault(self.user_id, compact_store.new_user_entry())["watchlist"] = {}
+            touch_user(self.user_id)
         await interaction.response.edit_message(content="✅ Your watchlist has been cleared.", embed=None, view=None)
 
+    async def on_remove(self, interaction: discord.Interaction):
+        filename_to_remove = self._option_files.get(self.remove_select.values[0])
 
-    @discord.ui.button(label="Cancel", style=discord.ButtonStyle.grey, custom_id="remove_wl_cancel")
-    async def cancel_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if str(interaction.user.id) != self.user_id:
-            await interaction.response.send_message("❌ You can only modify your own watchlist.", ephemeral=True)
+        async with state_lock:
+            watchlist = get_user_data().get(self.user_id, compact_store.new_user_entry())["watchlist"]
+            removed = filename_to_remove in watchlist
+            if removed:
+                del watchlist[filename_to_remove]
+                touch_user(self.user_id)
+
+        if not removed:
+            await interaction.response.send_message("❌ That item is no longer in your watchlist.", ephemeral=True)
             return
-        
-        await interaction.response.edit_message(content="Operation cancelled.", view=None)
 
+        self._invalidate()
+        if not get_user_list(self.user_id, "watchlist"):
+            await interaction.response.edit_message(content="✅ Your watchlist is now empty.", embed=None, view=None)
+            return
+        await interaction.response.edit_message(
+            content=f"✅ Removed '{filename_to_remove}' from your watchlist.",
+            embed=self.show_page(self.page),
+            view=self,
+        )
 
-    async def interaction_check(self, interaction: discord.Interaction) -> bool:
-        if interaction.custom_id.startswith("remove_wl_"):
-            if str(interaction.user.id) != self.user_id:
-                await interaction.response.send_message("❌ You can only modify your own watchlist.", ephemeral=True)
-                return False
-            
-            filename_to_remove = interaction.custom_id[len("remove_wl_"):]
-            if filename_to_remove == "all" or filename_to_remove == "cancel":
-                # Handled by specific buttons above
-                return True
-
-            user_data = load_user_data()
-            user_data_for_user = user_data.get(self.user_id, {"watched": [], "watchlist": []})
-            
-            if filename_to_remove in user_data_for_user["watchlist"]:
-                user_data_for_user["watchlist"].remove(filename_to_remove)
-                user_data[self.user_id] = user_data_for_user
-                save_user_data(user_data)
-
-                await interaction.response.edit_message(content=f"✅ Removed '{filename_to_remove}' from your watchlist.", view=None)
-                # You might want to refresh the watchlist embed here
-            else:
-                await interaction.response.send_message(f"❌ '{filename_to_remove}' not found in your watchlist.", ephemeral=True)
-            return False # Interaction handled, no need for further processing
+archive_store = ArchiveStore(ARCHIVE_FOLDER, ARCHIVE_MANIFEST_FILE, compress=ARCHIVE_COMPRESSION)
 
-        return True
+archive_index = RetentionIndex(
+    ARCHIVE_FOLDER,
+    ARCHIVE_INDEX_FILE,
+    delete_file=archive_store.delete,
+    seed_entries=archive_store.entries,
+)
+
+def get_archive_index():
+    """Return the archive retention index, loading (or seeding) it on first use."""
+    if not archive_index.loaded:
+        archive_index.load()
+    return archive_index
 
 def cleanup_old_archives():
-    cutoff = datetime.now() - timedelta(days=ARCHIVE_RETENTION_DAYS)
-    for file in ARCHIVE_FOLDER.iterdir():
-        if file.is_file() and datetime.fromtimestamp(file.stat().st_mtime) < cutoff:
-            file.unlink()
+    """Drop archives past ARCHIVE_RETENTION_DAYS, then enforce ARCHIVE_QUOTA_MB if set."""
+    index = get_archive_index()
+    cutoff = (datetime.now() - timedelta(days=settings.ARCHIVE_RETENTION_DAYS)).timestamp()
+    removed = index.pop_expired(cutoff)
+    if settings.ARCHIVE_QUOTA_MB > 0:
+        removed += index.enforce_quota(
+            settings.ARCHIVE_QUOTA_MB * 1024 * 1024,
+            settings.ARCHIVE_EVICTION_POLICY,
+            rating_of=lambda key: get_media_index().votes.get(archive_store.name_of(key), 0),
+        )
+    if removed:
+        index.save()
+        archive_store.save()
+        print(f"Archive cleanup: removed {len(removed)} file(s)")
+    return removed
 
 def get_file_size_mb(file_path):
     return file_path.stat().st_size / (1024 * 1024)
 
-def order_files(files, order_type):
-    if order_type == "random":
-        shuffled = list(files)
-        random.shuffle(shuffled)
-        return shuffled
-    if order_type == "name":
-        return sorted(files, key=lambda x: x.name)
-    return list(files)
-
 def select_batch(images, videos, target_images, target_videos, max_size_mb, order_type="random"):
     """
     Select a batch of files prioritizing target counts while respecting size limits.
     This function attempts to maintain the target batch size by selecting the smallest files
     when the original ordering would exceed the size limit.
     """
-    # First, try with the specified order
-    ordered_images = order_files(images, order_type)
-    ordered_videos = order_files(videos, order_type)
-
-    # Take the first target_images and target_videos from the ordered lists
-    # But only if we have enough files
-    candidate_images = ordered_images[:min(target_images, len(ordered_images))]
-    candidate_videos = ordered_videos[:min(target_videos, len(ordered_videos))]
+    # First, take the files the selection strategy prefers (only as many as we need)
+    candidate_images = selection.pick(images, target_images, order_type)
+    candidate_videos = selection.pick(videos, target_videos, order_type)
 
     # Calculate total size of candidates
     total_size = sum(get_file_size_mb(f) for f in candidate_images + candidate_videos)
@@ -174,8 +324,8 @@ def select_batch(images, videos, target_images, target_videos, max_size_mb, orde
         return candidate_images + candidate_videos
 
     # Check if we could fit the target counts with the smallest files
-    smallest_images = sorted(images, key=get_file_size_mb)[:min(target_images, len(images))]
-    smallest_videos = sorted(videos, key=get_file_size_mb)[:min(target_videos, len(videos))]
+    smallest_images = heapq.nsmallest(target_images, images, key=get_file_size_mb)
+    smallest_videos = heapq.nsmallest(target_videos, videos, key=get_file_size_mb)
 
     smallest_total_size = sum(get_file_size_mb(f) for f in smallest_images + smallest_videos)
 
@@ -221,13 +371,9 @@ def prioritize_target_counts_over_size(all_images, all_videos, target_images, ta
     Attempts to maintain target counts by selecting smallest files when possible.
     If target counts cannot be maintained within size limits, falls back to size-first approach.
     """
-    # Sort by size to get smallest files from all available
-    sorted_images_by_size = sorted(all_images, key=get_file_size_mb)
-    sorted_videos_by_size = sorted(all_videos, key=get_file_size_mb)
-
     # Try to take the smallest target_images and target_videos
-    potential_images = sorted_images_by_size[:min(target_images, len(sorted_images_by_size))]
-    potential_videos = sorted_videos_by_size[:min(target_videos, len(sorted_videos_by_size))]
+    potential_images = heapq.nsmallest(target_images, all_images, key=get_file_size_mb)
+    potential_videos = heapq.nsmallest(target_videos, all_videos, key=get_file_size_mb)
 
     # Check if this combination fits within the size limit
     total_size = sum(get_file_size_mb(f) for f in potential_images + potential_videos)
@@ -297,6 +443,33 @@ def reduced_batch_selection(images, videos, max_size_mb):
 
     return selected
 
+def collect_queued_media(uploaded_set=None):
+    """Return (images, videos) in MEDIA_FOLDER that have not been uploaded yet.
+
+    Files of an upload whose outcome is still unknown (a journal entry left
+    "prepared") are held back so they cannot be posted twice.
+    """
+    if uploaded_set is None:
+        uploaded_set = set(load_history()["uploaded_files"])
+    held = {name for entry in journal.pending() if entry["op"] == "upload" for name in entry["files"]}
+    images = []
+    videos = []
+    for f in MEDIA_FOLDER.iterdir():
+        if f.name in uploaded_set or f.name in held:
+            continue
+        suffix = f.suffix.lower()
+        if suffix in IMAGE_EXTENSIONS:
+            images.append(f)
+        elif suffix in VIDEO_EXTENSIONS:
+            videos.append(f)
+    return images, videos
+
+def report(progress, message):
+    """Print a status line and forward it to an optional progress callback."""
+    print(message)
+    if progress:
+        progress(message)
+
 def pretty_tqdm(iterable, desc):
     return tqdm(
         iterable,
@@ -306,41 +479,299 @@ def pretty_tqdm(iterable, desc):
         bar_format="[{desc:^10}] {l_bar}{bar} | {n_fmt}/{total_fmt} ({elapsed}<{remaining})",
     )
 
+RATING_EMOJIS = ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣"]
+
+def record_reaction_vote(message_id, user_id, emoji):
+    """Count a reaction as one vote per user and mark rated files as watched.
+
+    Works on the in-memory state only; state_flusher persists it. Callers
+    must hold ``state_lock``.
+    """
+    index = get_media_index()
+    rated_files = index.files_for_message(message_id)
+    if not rated_files:
+        return
+
+    # Rating emojis (1-5) also add the files to the user's watched list (ordered set, O(1) check)
+    if emoji in RATING_EMOJIS:
+        user_id_str = str(user_id)
+        watched = get_user_data().setdefault(user_id_str, compact_store.new_user_entry())["watched"]
+        new_files = [filename for filename in rated_files if filename not in watched]
+        if new_files:
+            watched.update(dict.fromkeys(new_files))
+            touch_user(user_id_str)
+
+    ratings = get_ratings()
+    for filename in rated_files:
+        entry = ratings.setdefault(filename, {"votes": 0, "voters": set()})
+        if user_id not in entry["voters"]:
+            entry["votes"] += 1
+            entry["voters"].add(user_id)
+            index.record_vote(filename, entry["votes"], len(entry["voters"]))
+            mark_dirty("ratings")
+
 # ========== Upload Logic ========== 
 
-async def perform_upload(channel, batch, batch_label="Daily Batch Upload"):
-    """Core upload logic without automatic rating reactions."""
+journal = StateJournal(JOURNAL_FILE)
+upload_jobs = UploadQueue(UPLOAD_QUEUE_FILE) if UPLOAD_WORKER else None
+
+def archive_batch(names, tag):
+    """Move uploaded files into the archive under ids tagged with the upload's txid.
+
+    Safe to replay: files an earlier attempt already moved come back from the
+    manifest, so their retention entries are rebuilt rather than lost.
+    """
+    archive = get_archive_index()
+    for name in pretty_tqdm(names, "Archiving"):
+        src = MEDIA_FOLDER / name
+        key = archive_id(name, tag)
+        if not src.exists() and not archive_store.contains(key):
+            print(f"Warning: {name} is missing and was never archived; skipping it")
+            continue
+        entry = archive_store.put(src, key)
+        archive.add(key, entry["size"], entry["archived_at"])
+
+def commit_upload(names, message_id, upload_date, tag):
+    """Record a posted batch: one history write plus the archive manifest/index."""
     history = load_history()
     uploaded_set = set(history["uploaded_files"])
+    uploaded_set.update(names)
+    metadata = history.setdefault("metadata", {})
+    index = get_media_index()
+    for name in names:
+        metadata[name] = {"upload_date": upload_date, "message_id": message_id, "archive_id": archive_id(name, tag)}
+        index.add_upload(name, upload_date, message_id)
+    history["uploaded_files"] = list(uploaded_set)
+    save_history(history)
+    archive_store.save()
+    get_archive_index().save()
+
+def restore_batch(items, replay=False):
+    """Restore [(name, archive_id), ...] to MEDIA_FOLDER in parallel. Returns {name: exception or None}.
+
+    When replaying a journal entry, files already back in MEDIA_FOLDER are
+    treated as restored and only their leftover archive entries are dropped.
+    """
+    pairs = []
+    errors = {}
+    names_by_key = {}
+    for name, key in items:
+        names_by_key[key] = name
+        if replay and (MEDIA_FOLDER / name).exists():
+            archive_store.delete(key)
+            errors[key] = None
+        else:
+            pairs.append((key, MEDIA_FOLDER / name))
+    errors.update(archive_store.restore_many(pairs))
+    archive = get_archive_index()
+    for key, error in errors.items():
+        if error is None:
+            archive.discard(key)
+    return {names_by_key[key]: error for key, error in errors.items()}
+
+def commit_undo(names):
+    """Forget an undone batch: one history write, one ratings write."""
+    names = set(names)
+    history = load_history()
+    metadata = history.get("metadata", {})
+    index = get_media_index()
+    for name in names:
+        metadata.pop(name, None)
+        index.remove(name)
+    history["metadata"] = metadata
+    history["uploaded_files"] = [f for f in history.get("uploaded_files", []) if f not in names]
+    save_history(history)
+
+    ratings = get_ratings()
+    if names & ratings.keys():
+        for name in names:
+            ratings.pop(name, None)
+        mark_dirty("ratings")
+    flush_state()
+
+    archive_store.save()
+    get_archive_index().save()
+
+def settle_entry(entry):
+    """Roll a journal entry back if it never got past "prepared", otherwise replay it, then drop it."""
+    if entry["phase"] == "prepared":
+        print(f"Rolling back interrupted {entry['op']} ({entry['txid']})")
+    elif entry["op"] == "upload":
+        print(f"Replaying interrupted upload of {len(entry['files'])} file(s) ({entry['txid']})")
+        archive_batch(entry["files"], entry["txid"])
+        commit_upload(entry["files"], entry["message_id"], entry["upload_date"], entry["txid"])
+    elif entry["op"] == "undo":
+        print(f"Replaying interrupted undo of {len(entry['files'])} file(s) ({entry['txid']})")
+        # Undo entries from before archive ids name their files by plain filename
+        restore_batch(zip(entry["files"], entry.get("archive_ids", entry["files"])), replay=True)
+        commit_undo(entry["files"])
+    journal.finish(entry)
+
+def recover_journal():
+    """Finish or roll back operations interrupted by a crash. Callers must hold ``state_lock``.
+
+    Uploads marked for a recheck are left alone: nobody knows yet whether
+    they were posted.
+    """
+    recovered = []
+    for entry in journal.pending():
+        if entry.get("recheck"):
+            continue
+        settle_entry(entry)
+        recovered.append(entry)
+    return recovered
+
+def attachment_name(filename):
+    """The name Discord gives an uploaded file (it turns spaces into underscores)."""
+    return filename.replace(" ", "_")
+
+async def find_posted_batch(channel, entry, limit=50):
+    """Look for the message an upload journal entry may already have posted.
+
+    Matches on the send nonce when Discord echoes it back (cached gateway
+    messages), otherwise on the bot's own messages since the attempt started
+    whose label and attachment filenames match the batch. Sizes are no use
+    here because Discord strips image metadata on upload.
+    """
+    expected = sorted(attachment_name(name) for name in entry["files"])
+    after = datetime.fromtimestamp(entry["started"] - 60, tz=timezone.utc)
+    async for message in channel.history(limit=limit, after=after):
+        if message.author.id != channel.guild.me.id:
+            continue
+        if message.nonce is not None and str(message.nonce) == entry["nonce"]:
+            return message
+        if (message.content.startswith(f"📤 **{entry['label']}**")
+                and sorted(a.filename for a in message.attachments) == expected):
+            return message
+    return None
+
+async def send_batch(channel, batch, content, nonce, progress=None):
+    """Post a batch and return its message ID, through the upload worker process when enabled."""
+    if upload_jobs is not None:
+        message_id = await send_via_worker(
+            upload_jobs, channel.id, content, [str(f) for f in batch], nonce, UPLOAD_WORKER_CLAIM_TIMEOUT_SECONDS
+        )
+        if message_id is not None:
+            return message_id
+        report(progress, "Upload worker did not pick up the batch; sending it from the bot.")
 
     files = []
     for f in pretty_tqdm(batch, "Preparing"):
         files.append(discord.File(str(f)))
-
-    print("Uploading to Discord...")
-    message = await channel.send(
-        f"📤 **{batch_label}** ({len(batch)} files)",
-        files=files,
+    message = await outbound.scheduler.submit(
+        outbound.Priority.BACKGROUND, channel.send, content, files=files, nonce=nonce
     )
+    return message.id
+
+async def perform_upload(channel, batch, batch_label="Daily Batch Upload", progress=None):
+    """Core upload logic without automatic rating reactions. Returns the posted message ID."""
+    names = [f.name for f in batch]
+
+    # Record the attempt first so a crash mid-send can be reconciled instead of re-sent
+    nonce = str(uuid.uuid4().int % 10**18)
+    entry = journal.begin(
+        "upload",
+        files=names,
+        label=batch_label,
+        nonce=nonce,
+    )
+    report(progress, "Uploading to Discord...")
+    try:
+        message_id = await send_batch(channel, batch, f"📤 **{batch_label}** ({len(batch)} files)", nonce, progress)
+    except Exception as e:
+        # A 4xx (e.g. 413) was definitely rejected, so the attempt can be dropped.
+        if isinstance(e, discord.HTTPException) and e.status < 500:
+            journal.finish(entry)
+            raise
+        # A 5xx, timeout, dropped connection or worker failure may still have
+        # posted. If the message can't be found yet, the entry stays "prepared":
+        # its files are held back and the next upload run checks the channel again.
+        try:
+            message = await outbound.scheduler.submit(outbound.Priority.MAINTENANCE, find_posted_batch, channel, entry)
+        except discord.HTTPException:
+            message = None
+        if message is None:
+            journal.advance(entry, "prepared", recheck=True)
+            raise
+        message_id = message.id
+        report(progress, f"Send reported an error but the batch was posted ({message_id}); continuing.")
+
+    report(progress, "Upload successful!")
+
+    async with state_lock:
+        journal.advance(entry, "applying", message_id=message_id, upload_date=datetime.now().isoformat())
+        archive_batch(names, entry["txid"])
+        commit_upload(names, message_id, entry["upload_date"], entry["txid"])
+        journal.finish(entry)
+    report(progress, f"Completed: {len(batch)} files archived")
+    return message_id
+
+async def run_manual_upload(bot, batch_label="Manual Upload", progress=None):
+    """Select the next batch and upload it now. Returns the number of files posted."""
+    channel = bot.get_channel(settings.MEDIA_CHANNEL_ID)
+    if not channel:
+        report(progress, "Error: Channel not found")
+        return 0
 
-    print("Upload successful!")
+    await recheck_uploads(channel)
+    cleanup_old_archives()
+    images, videos = collect_queued_media()
 
-    for f in pretty_tqdm(batch, "Archiving"):
-        dest = ARCHIVE_FOLDER / f.name
-        shutil.move(str(f), str(dest))
-        uploaded_set.add(f.name)
+    batch = select_batch(
+        images,
+        videos,
+        settings.IMAGES_PER_BATCH,
+        settings.VIDEOS_PER_BATCH,
+        settings.MAX_UPLOAD_SIZE_MB,
+        settings.SELECTION_ORDER,
+    )
 
-        # Store upload metadata
-        if "metadata" not in history:
-            history["metadata"] = {}
-        history["metadata"][f.name] = {
-            "upload_date": datetime.now().isoformat(),
-            "message_id": message.id
-        }
+    if not batch:
+        report(progress, "No files to upload")
+        return 0
 
-    history["uploaded_files"] = list(uploaded_set)
-    save_history(history)
-    print(f"Completed: {len(batch)} files archived")
+    batch_size = sum(get_file_size_mb(f) for f in batch)
+    report(progress, f"Selected {len(batch)} files ({batch_size:.2f} MB)")
+    await perform_upload(channel, batch, batch_label, progress=progress)
+    return len(batch)
+
+async def reset_history():
+    """Clear upload history so all files are eligible again."""
+    async with state_lock:
+        save_history({"uploaded_files": [], "metadata": {}})
+        media_index.load({}, get_ratings())
+
+async def update_schedule(enabled=True, hour=None, minute=None):
+    """Update the daily upload schedule and return the new config."""
+    async with state_lock:
+        config = load_schedule_config()
+        config["enabled"] = enabled
+        if hour is not None:
+            config["hour"] = hour
+        if minute is not None:
+            config["minute"] = minute
+        save_schedule_config(config)
+        return config
+
+def preview_batches(count=1):
+    """Return the next `count` batches (lists of paths) without uploading anything."""
+    images, videos = collect_queued_media()
+    batches = []
+    for _ in range(count):
+        batch = select_batch(
+            images, videos,
+            settings.IMAGES_PER_BATCH, settings.VIDEOS_PER_BATCH,
+            settings.MAX_UPLOAD_SIZE_MB, settings.SELECTION_ORDER
+        )
+        if not batch:
+            break
+        batches.append(batch)
+
+        # Remove from available pool
+        chosen = set(batch)
+        images = [f for f in images if f not in chosen]
+        videos = [f for f in videos if f not in chosen]
+    return batches
 
 # ========== Scheduled Upload Task ========== 
 
@@ -360,7 +791,7 @@ async def daily_upload():
     if now.hour != target_hour or now.minute != target_minute:
         return
 
-    channel = daily_upload.bot.get_channel(MEDIA_CHANNEL_ID)
+    channel = daily_upload.bot.get_channel(settings.MEDIA_CHANNEL_ID)
     if not channel:
         print("Error: Channel not found")
         return
@@ -369,28 +800,17 @@ async def daily_upload():
     print("Starting Scheduled Upload Process")
     print("=" * 60)
 
+    await recheck_uploads(channel)
     cleanup_old_archives()
-    history = load_history()
-    uploaded_set = set(history["uploaded_files"])
-
-    images = [
-        f
-        for f in MEDIA_FOLDER.iterdir()
-        if f.suffix.lower() in IMAGE_EXTENSIONS and f.name not in uploaded_set
-    ]
-    videos = [
-        f
-        for f in MEDIA_FOLDER.iterdir()
-        if f.suffix.lower() in VIDEO_EXTENSIONS and f.name not in uploaded_set
-    ]
+    images, videos = collect_queued_media()
 
     batch = select_batch(
         images,
         videos,
-        IMAGES_PER_BATCH,
-        VIDEOS_PER_BATCH,
-        MAX_UPLOAD_SIZE_MB,
-        SELECTION_ORDER,
+        settings.IMAGES_PER_BATCH,
+        settings.VIDEOS_PER_BATCH,
+        settings.MAX_UPLOAD_SIZE_MB,
+        settings.SELECTION_ORDER,
     )
 
     if not batch:
@@ -408,9 +828,9 @@ async def daily_upload():
             smart_batch = smart_fit_batch(
                 images,
                 videos,
-                IMAGES_PER_BATCH,
-                VIDEOS_PER_BATCH,
-                MAX_UPLOAD_SIZE_MB * 0.8,
+                settings.IMAGES_PER_BATCH,
+                settings.VIDEOS_PER_BATCH,
+                settings.MAX_UPLOAD_SIZE_MB * 0.8,
             )
 
             if smart_batch and len(smart_batch) >= len(batch) * 0.5:
@@ -424,7 +844,7 @@ async def daily_upload():
 
             print("Trying reduced batch...")
             reduced_batch = reduced_batch_selection(
-                images, videos, MAX_UPLOAD_SIZE_MB * 0.6
+                images, videos, settings.MAX_UPLOAD_SIZE_MB * 0.6
             )
 
             if reduced_batch:
@@ -440,6 +860,108 @@ async def daily_upload():
 
     print("=" * 60)
 
+async def check_prepared_upload(channel, entry):
+    """Look for a "prepared" upload in the channel.
+
+    Returns True if it was posted (the entry is advanced to "applying"),
+    False if it wasn't, and None if the channel couldn't be checked.
+    """
+    if not channel:
+        print(f"Could not check channel history for upload {entry['txid']}: channel not found")
+        return None
+    try:
+        message = await outbound.scheduler.submit(outbound.Priority.MAINTENANCE, find_posted_batch, channel, entry)
+    except discord.HTTPException as e:
+        print(f"Could not check channel history for upload {entry['txid']}: {e}")
+        return None
+    if message is None:
+        return False
+    print(f"Upload {entry['txid']} was already posted as message {message.id}; finishing it without re-sending.")
+    upload_date = message.created_at.astimezone().replace(tzinfo=None).isoformat()
+    journal.advance(entry, "applying", message_id=message.id, upload_date=upload_date)
+    return True
+
+async def recover_pending_operations(bot):
+    """Reconcile interrupted uploads against the channel, then replay or roll back the journal.
+
+    Uploads that couldn't be checked stay "prepared" and marked for a
+    recheck, so their files remain held back until recheck_uploads runs.
+    """
+    channel = bot.get_channel(settings.MEDIA_CHANNEL_ID)
+    async with state_lock:
+        for entry in journal.pending():
+            if entry["op"] != "upload" or entry["phase"] != "prepared":
+                continue
+            found = await check_prepared_upload(channel, entry)
+            if found is None:
+                journal.advance(entry, "prepared", recheck=True)
+            elif entry.get("recheck"):
+                journal.advance(entry, entry["phase"], recheck=False)
+        return recover_journal()
+
+async def recheck_uploads(channel):
+    """Settle uploads whose outcome was unknown, once the channel can be checked. Takes ``state_lock``."""
+    async with state_lock:
+        for entry in journal.pending():
+            if not entry.get("recheck") or await check_prepared_upload(channel, entry) is None:
+                continue
+            settle_entry(entry)
+
+async def clear_archives(progress=None):
+    """Delete every archived file. Returns (deleted, {filename: error})."""
+    async with state_lock:
+        archive = get_archive_index()
+        deleted = 0
+        errors = {}
+        for filename in list(archive_store.entries()):
+            try:
+                archive_store.delete(filename)
+                archive.discard(filename)
+                deleted += 1
+            except Exception as e:
+                errors[filename] = e
+                report(progress, f"Error deleting {filename}: {e}")
+        archive_store.save()
+        archive.save()
+    return deleted, errors
+
+async def sweep_archives():
+    async with state_lock:
+        cleanup_old_archives()
+
+@tasks.loop(minutes=10)
+async def archive_sweeper():
+    """Expire old archives in the background so uploads don't pay for it."""
+    await sweep_archives()
+
+@tasks.loop(seconds=STATE_FLUSH_SECONDS)
+async def state_flusher():
+    """Persist ratings and watch lists changed since the last tick."""
+    async with state_lock:
+        flush_state()
+
+@state_flusher.after_loop
+async def flush_on_stop():
+    async with state_lock:
+        flush_state()
+
+@tasks.loop(seconds=5)
+async def config_watcher():
+    """Pick up hand edits to the live config file."""
+    settings.reload()
+
+ARCHIVE_SETTINGS = {"ARCHIVE_RETENTION_DAYS", "ARCHIVE_QUOTA_MB", "ARCHIVE_EVICTION_POLICY"}
+
+def on_settings_changed(changed):
+    """Live config subscriber; runs on the bot loop (config_watcher or BotControl)."""
+    print("Config updated: " + ", ".join(f"{name}={value}" for name, value in changed.items()))
+    if changed.keys() & ARCHIVE_SETTINGS:
+        asyncio.create_task(sweep_archives())  # apply a tighter retention/quota right away
+    if "MEDIA_CHANNEL_ID" in changed and daily_upload.bot.get_channel(changed["MEDIA_CHANNEL_ID"]) is None:
+        print(f"Warning: media channel {changed['MEDIA_CHANNEL_ID']} is not visible to the bot")
+
+settings.subscribe(on_settings_changed)
+
 # ========== Bot Setup ========== 
 
 def setup(bot: discord.Client):
@@ -452,32 +974,23 @@ def setup(bot: discord.Client):
         name="check_media",
         description="Check queued media and next batch details.",
     )
+    @auto_defer()
     async def check_media(interaction: discord.Interaction):
-        history = load_history()
-        uploaded_set = set(history["uploaded_files"])
-
-        images = [
-            f
-            for f in MEDIA_FOLDER.iterdir()
-            if f.suffix.lower() in IMAGE_EXTENSIONS and f.name not in uploaded_set
-        ]
-        videos = [
-            f
-            for f in MEDIA_FOLDER.iterdir()
-            if f.suffix.lower() in VIDEO_EXTENSIONS and f.name not in uploaded_set
-        ]
+        # Directory scans run off the loop so a slow disk can't stall the auto-defer timer
+        images, videos = await asyncio.to_thread(collect_queued_media)
 
         total_images = len(images)
         total_videos = len(videos)
-        archived_count = len(list(ARCHIVE_FOLDER.iterdir()))
+        archived_count = len(get_archive_index())
 
-        next_batch = select_batch(
+        next_batch = await asyncio.to_thread(
+            select_batch,
             images,
             videos,
-            IMAGES_PER_BATCH,
-            VIDEOS_PER_BATCH,
-            MAX_UPLOAD_SIZE_MB,
-            SELECTION_ORDER,
+            settings.IMAGES_PER_BATCH,
+            settings.VIDEOS_PER_BATCH,
+            settings.MAX_UPLOAD_SIZE_MB,
+            settings.SELECTION_ORDER,
         )
 
         batch_size_mb = sum(get_file_size_mb(f) for f in next_batch)
@@ -498,7 +1011,7 @@ def setup(bot: discord.Client):
             f"({round(batch_size_mb, 2)} MB)"
         )
         embed.add_field(name="Next Batch", value=next_batch_text, inline=False)
-        embed.add_field(name="Order", value=SELECTION_ORDER, inline=False)
+        embed.add_field(name="Order", value=settings.SELECTION_ORDER, inline=False)
 
         await interaction.response.send_message(embed=embed)
 
@@ -514,8 +1027,7 @@ def setup(bot: discord.Client):
             )
             return
 
-        history = {"uploaded_files": [], "metadata": {}}
-        save_history(history)
+        await reset_history()
         await interaction.response.send_message(
             "✅ Upload history cleared! All media files will be eligible for upload again."
         )
@@ -537,40 +1049,7 @@ def setup(bot: discord.Client):
         )
 
         # Temporarily disable schedule check
-        await perform_manual_upload()
-
-    async def perform_manual_upload():
-        channel = bot.get_channel(MEDIA_CHANNEL_ID)
-        if not channel:
-            print("Error: Channel not found")
-            return
-
-        cleanup_old_archives()
-        history = load_history()
-        uploaded_set = set(history["uploaded_files"])
-
-        images = [
-            f
-            for f in MEDIA_FOLDER.iterdir()
-            if f.suffix.lower() in IMAGE_EXTENSIONS and f.name not in uploaded_set
-        ]
-        videos = [
-            f
-            for f in MEDIA_FOLDER.iterdir()
-            if f.suffix.lower() in VIDEO_EXTENSIONS and f.name not in uploaded_set
-        ]
-
-        batch = select_batch(
-            images,
-            videos,
-            IMAGES_PER_BATCH,
-            VIDEOS_PER_BATCH,
-            MAX_UPLOAD_SIZE_MB,
-            SELECTION_ORDER,
-        )
-
-        if batch:
-            await perform_upload(channel, batch, "Manual Upload")
+        await run_manual_upload(bot)
 
     # ========== New Commands ========== 
 
@@ -586,11 +1065,8 @@ def setup(bot: discord.Client):
             )
             return
 
-        config = load_schedule_config()
-
         if time_str.lower() == "off":
-            config["enabled"] = False
-            save_schedule_config(config)
+            await update_schedule(enabled=False)
             await interaction.response.send_message("✅ Daily uploads disabled.")
             return
 
@@ -599,10 +1075,7 @@ def setup(bot: discord.Client):
             if not (0 <= hour <= 23 and 0 <= minute <= 59):
                 raise ValueError
 
-            config["enabled"] = True
-            config["hour"] = hour
-            config["minute"] = minute
-            save_schedule_config(config)
+            await update_schedule(enabled=True, hour=hour, minute=minute)
 
             await interaction.response.send_message(
                 f"✅ Daily upload scheduled for {hour:02d}:{minute:02d}"
@@ -617,6 +1090,7 @@ def setup(bot: discord.Client):
         name="dry_run",
         description="Preview the next N batches without uploading",
     )
+    @auto_defer()
     async def dry_run_cmd(interaction: discord.Interaction, count: int = 1):
         if count < 1 or count > 10:
             await interaction.response.send_message(
@@ -625,38 +1099,14 @@ def setup(bot: discord.Client):
             )
             return
 
-        history = load_history()
-        uploaded_set = set(history["uploaded_files"])
-
-        images = [
-            f for f in MEDIA_FOLDER.iterdir()
-            if f.suffix.lower() in IMAGE_EXTENSIONS and f.name not in uploaded_set
-        ]
-        videos = [
-            f for f in MEDIA_FOLDER.iterdir()
-            if f.suffix.lower() in VIDEO_EXTENSIONS and f.name not in uploaded_set
-        ]
+        batches = await asyncio.to_thread(preview_batches, count)
 
         embed = discord.Embed(
             title=f"🔍 Dry Run - Next {count} Batch(es)",
             color=0xE67E22
         )
 
-        for i in range(count):
-            batch = select_batch(
-                images, videos,
-                IMAGES_PER_BATCH, VIDEOS_PER_BATCH,
-                MAX_UPLOAD_SIZE_MB, SELECTION_ORDER
-            )
-
-            if not batch:
-                embed.add_field(
-                    name=f"Batch {i+1}",
-                    value="No more files available",
-                    inline=False
-                )
-                break
-
+        for i, batch in enumerate(batches):
             batch_size = sum(get_file_size_mb(f) for f in batch)
             file_list = "\n".join([f"• {f.name} ({get_file_size_mb(f):.2f} MB)" for f in batch[:5]])
             if len(batch) > 5:
@@ -668,9 +1118,12 @@ def setup(bot: discord.Client):
                 inline=False
             )
 
-            # Remove from available pool
-            images = [f for f in images if f not in batch]
-            videos = [f for f in videos if f not in batch]
+        if len(batches) < count:
+            embed.add_field(
+                name=f"Batch {len(batches)+1}",
+                value="No more files available",
+                inline=False
+            )
 
         await interaction.response.send_message(embed=embed)
 
@@ -698,41 +1151,35 @@ def setup(bot: discord.Client):
     
     @tree.command(
             name="top_media", 
-            description="Top voted media (past week)")
-    async def top_media_cmd(interaction: discord.Interaction):
-        ratings = load_media_ratings()
-        history = load_history()
-        metadata = history.get("metadata", {})
-
-        week_ago = (datetime.now() - timedelta(days=7)).isoformat()
-        recent_files = [
-            filename for filename, data in metadata.items()
-            if data.get("upload_date", "") >= week_ago
-        ]
-
-        top_files = []
-        for filename in recent_files:
-            if filename in ratings:
-                votes = ratings[filename].get("votes", 0)
-                voters = len(ratings[filename].get("voters", []))
-                top_files.append((filename, votes, voters))
-
-        top_files.sort(key=lambda x: x[1], reverse=True)
+            description="Top voted media for a time window")
+    @discord.app_commands.describe(window="Time window to rank (default: past week)")
+    @discord.app_commands.choices(window=[
+        discord.app_commands.Choice(name="Past day", value="day"),
+        discord.app_commands.Choice(name="Past week", value="week"),
+        discord.app_commands.Choice(name="Past month", value="month"),
+        discord.app_commands.Choice(name="All time", value="all"),
+    ])
+    @auto_defer(ephemeral=True)
+    async def top_media_cmd(interaction: discord.Interaction, window: str = "week"):
+        top_files = get_media_index().top(window, limit=10)
+
+        span = LEADERBOARD_WINDOWS[window]
+        period = "All Time" if span is None else f"Past {span.days} Day{'s' if span.days != 1 else ''}"
 
         if not top_files:
             await interaction.response.send_message(
-                "📊 No voted media from past week.",
+                f"📊 No voted media from {period.lower()}.",
                 ephemeral=True
             )
             return
 
         embed = discord.Embed(
-            title="🏆 Top Voted Media (Past 7 Days)",
+            title=f"🏆 Top Voted Media ({period})",
             description="Any reaction = 1 vote per user",
             color=0xF39C12
         )
 
-        for i, (filename, votes, voters) in enumerate(top_files[:10], 1):
+        for i, (filename, votes, voters) in enumerate(top_files, 1):
             embed.add_field(
                 name=f"{i}. {filename}",
                 value=f"**{votes} votes** from {voters} user{'s' if voters != 1 else ''}",
@@ -778,9 +1225,8 @@ def setup(bot: discord.Client):
 
         # --- PRE-CHECK: Verify all files exist in archive before proceeding ---
         missing_archive_files = []
-        for fname, _ in batch_files_to_undo:
-            archive_path = ARCHIVE_FOLDER / fname
-            if not archive_path.exists():
+        for fname, data in batch_files_to_undo:
+            if not archive_store.contains(data.get("archive_id", fname)):
                 missing_archive_files.append(fname)
         
         if missing_archive_files:
@@ -792,12 +1238,17 @@ def setup(bot: discord.Client):
             return
         # --- END PRE-CHECK ---
 
+        batch_names = [fname for fname, _ in batch_files_to_undo]
+        # Uploads recorded before archive ids were archived under their plain filename
+        batch_keys = [data.get("archive_id", fname) for fname, data in batch_files_to_undo]
+        entry = journal.begin("undo", files=batch_names, archive_ids=batch_keys, message_id=latest_message_id)
+
         # Delete the Discord message for the batch
         try:
-            channel = interaction.guild.get_channel(MEDIA_CHANNEL_ID)
+            channel = interaction.guild.get_channel(settings.MEDIA_CHANNEL_ID)
             if channel and latest_message_id:
-                message = await channel.fetch_message(latest_message_id)
-                await message.delete()
+                # Partial message: one DELETE instead of a fetch plus a delete
+                await outbound.scheduler.submit(outbound.Priority.MAINTENANCE, channel.get_partial_message(latest_message_id).delete)
                 status_messages.append(f"✅ Original Discord message `{latest_message_id}` deleted.")
             else:
                 status_messages.append(f"⚠️ Could not delete Discord message `{latest_message_id}` (channel not found or message_id missing).")
@@ -806,44 +1257,33 @@ def setup(bot: discord.Client):
         except Exception as e:
             status_messages.append(f"❌ Error deleting Discord message `{latest_message_id}`: {e}")
             print(f"Error deleting Discord message: {e}") # Server-side logging
+        # The post may be gone now, so from here a crash must roll the undo forward.
+        # Advance before any other await (the status edit, waiting for state_lock).
+        journal.advance(entry, "applying")
         await interaction.edit_original_response(content="\n".join(status_messages))
 
         restored_files_count = 0
         errors_during_restoration = []
 
-        for fname, data in batch_files_to_undo:
-            # Restore single file
-            archive_path = ARCHIVE_FOLDER / fname
-            media_path = MEDIA_FOLDER / fname
-            
-            if archive_path.exists():
-                try:
-                    archive_path.rename(media_path)
+        async with state_lock:
+            # Restore the whole batch in parallel (hardlink or streaming decompress)
+            restore_errors = await asyncio.get_running_loop().run_in_executor(None, restore_batch, list(zip(batch_names, batch_keys)))
+
+            for fname in batch_names:
+                error = restore_errors.get(fname)
+                if error is None:
                     restored_files_count += 1
                     status_messages.append(f"✅ Restored: `{fname}`")
-                except Exception as e:
-                    errors_during_restoration.append(f"❌ Error restoring `{fname}`: {e}")
-                    print(f"Error renaming file '{fname}': {e}") # Server-side logging
-            else:
-                errors_during_restoration.append(f"❌ Archive file missing for `{fname}`.")
-                print(f"Archive file '{fname}' not found at {archive_path}") # Server-side logging
-            
-            # Clean history for this file only
-            if fname in metadata:
-                del metadata[fname]
-            history['uploaded_files'] = [f for f in history.get('uploaded_files', []) if f != fname]
-            
-            # Clear ratings
-            ratings = load_media_ratings()
-            if fname in ratings:
-                ratings.pop(fname, None)
-                save_media_ratings(ratings) # Save ratings after each file removal
-            
-            await interaction.edit_original_response(content="\n".join(status_messages + errors_during_restoration))
-        
-        history['metadata'] = metadata # Ensure updated metadata is assigned back
-        save_history(history) # Save history once after processing all files in batch
-        
+                else:
+                    errors_during_restoration.append(f"❌ Error restoring `{fname}`: {error}")
+                    print(f"Error restoring file '{fname}': {error}") # Server-side logging
+
+            # Clean history and ratings for the whole batch in one commit
+            commit_undo(batch_names)
+            journal.finish(entry)
+
+        await interaction.edit_original_response(content="\n".join(status_messages + errors_during_restoration))
+
         final_message = f"✅ Undo complete: Restored {restored_files_count} file(s) from the last batch."
         if errors_during_restoration:
             final_message += "\n\n**Errors encountered during restoration:**\n" + "\n".join(errors_during_restoration)
@@ -852,112 +1292,44 @@ def setup(bot: discord.Client):
 
     @tree.context_menu(name="Add to Watchlist")
     async def add_to_watchlist_context_menu(interaction: discord.Interaction, message: discord.Message):
-        history = load_history()
-        metadata = history.get("metadata", {})
-        user_data = load_user_data()
-
         # Find the filename associated with this message
-        filename = None
-        for fname, data in metadata.items():
-            if data.get("message_id") == message.id:
-                filename = fname
-                break
-        
+        files = get_media_index().files_for_message(message.id)
+        filename = files[0] if files else None
+
         if not filename:
             await interaction.response.send_message("❌ This message does not correspond to an uploaded media item.", ephemeral=True)
             return
 
         user_id_str = str(interaction.user.id)
-        if user_id_str not in user_data:
-            user_data[user_id_str] = {"watched": [], "watchlist": []}
-
-        if filename in user_data[user_id_str]["watchlist"]:
+        async with state_lock:
+            watchlist = get_user_data().setdefault(user_id_str, compact_store.new_user_entry())["watchlist"]
+            already_added = filename in watchlist
+            if not already_added:
+                watchlist[filename] = None
+                touch_user(user_id_str)
+
+        if already_added:
             await interaction.response.send_message(f"ℹ️ '{filename}' is already in your watchlist.", ephemeral=True)
         else:
-            user_data[user_id_str]["watchlist"].append(filename)
-            save_user_data(user_data)
             await interaction.response.send_message(f"✅ Added '{filename}' to your watchlist.", ephemeral=True)
 
     @tree.command(name="watched", description="Show media you have marked as watched.")
     async def watched_cmd(interaction: discord.Interaction):
-        user_id_str = str(interaction.user.id)
-        user_data = load_user_data()
-
-        if user_id_str not in user_data or not user_data[user_id_str]["watched"]:
+        if not get_user_list(interaction.user.id, "watched"):
             await interaction.response.send_message("❌ You have not marked any media as watched yet.", ephemeral=True)
             return
 
-        watched_list = user_data[user_id_str]["watched"]
-        history = load_history()
-        metadata = history.get("metadata", {})
-
-        embed = discord.Embed(
-            title=f"🎬 {interaction.user.display_name}'s Watched Media",
-            color=0x2ECC71
-        )
-
-        description = []
-        for i, filename in enumerate(watched_list[:20]): # Limit to 20 to prevent too large embeds
-            # Try to get the original message link if available
-            message_id = metadata.get(filename, {}).get("message_id")
-            if message_id and interaction.guild:
-                # Construct a jump URL for the original message
-                message_link = f"https://discord.com/channels/{interaction.guild.id}/{MEDIA_CHANNEL_ID}/{message_id}"
-                description.append(f"{i+1}. [{filename}]({message_link})")
-            else:
-                description.append(f"{i+1}. {filename}")
-        
-        if not description:
-            await interaction.response.send_message("❌ Could not retrieve details for your watched media.", ephemeral=True)
-            return
-
-        embed.description = "\n".join(description)
-
-        if len(watched_list) > 20:
-            embed.set_footer(text=f"Showing 20 of {len(watched_list)} watched media items.")
-
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        view = MediaListView(interaction.user.id, "watched", interaction.user.display_name, interaction.guild_id)
+        await interaction.response.send_message(embed=view.show_page(0), view=view, ephemeral=True)
 
     @tree.command(name="watchlist", description="Show media you have added to your watchlist.")
     async def watchlist_cmd(interaction: discord.Interaction):
-        user_id_str = str(interaction.user.id)
-        user_data = load_user_data()
-
-        if user_id_str not in user_data or not user_data[user_id_str]["watchlist"]:
+        if not get_user_list(interaction.user.id, "watchlist"):
             await interaction.response.send_message("❌ Your watchlist is empty.", ephemeral=True)
             return
 
-        watchlist = user_data[user_id_str]["watchlist"]
-        history = load_history()
-        metadata = history.get("metadata", {})
-
-        embed = discord.Embed(
-            title=f"👀 {interaction.user.display_name}'s Watchlist",
-            color=0x3498DB
-        )
-
-        description = []
-        for i, filename in enumerate(watchlist[:5]): # Limit buttons to 5 to avoid too many components
-            # Try to get the original message link if available
-            message_id = metadata.get(filename, {}).get("message_id")
-            if message_id and interaction.guild:
-                message_link = f"https://discord.com/channels/{interaction.guild.id}/{MEDIA_CHANNEL_ID}/{message_id}"
-                description.append(f"{i+1}. [{filename}]({message_link})")
-            else:
-                description.append(f"{i+1}. {filename}")
-        
-        if not description:
-            await interaction.response.send_message("❌ Could not retrieve details for your watchlist.", ephemeral=True)
-            return
-
-        embed.description = "\n".join(description)
-
-        if len(watchlist) > 5: # Show more if there are many items
-            embed.set_footer(text=f"Showing 5 of {len(watchlist)} watchlist items. Use buttons to remove.")
-
-        view = RemoveWatchlistItemView(interaction.user.id, watchlist[:5]) # Pass only the displayed items to the view
-
-        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+        view = MediaListView(interaction.user.id, "watchlist", interaction.user.display_name, interaction.guild_id)
+        await interaction.response.send_message(embed=view.show_page(0), view=view, ephemeral=True)
         # ========== Event Handlers ========== 
     @bot.event
     async def on_raw_reaction_add(payload):
@@ -965,42 +1337,5 @@ def setup(bot: discord.Client):
         if payload.user_id == bot.user.id:
             return
 
-        history = load_history()
-        metadata = history.get("metadata", {})
-        ratings = load_media_ratings()
-        user_data = load_user_data() # Load user data
-
-        # Find files from this message
-        rated_files = [
-            filename for filename, data in metadata.items()
-            if data.get("message_id") == payload.message_id
-        ]
-
-        if not rated_files:
-            return
-
-        user_id_str = str(payload.user.id) # Convert to string for JSON keys
-
-        # Ensure user entry exists in user_data
-        if user_id_str not in user_data:
-            user_data[user_id_str] = {"watched": [], "watchlist": []}
-
-        # Check if the reaction is a rating emoji (1-5) for watched list
-        rating_emojis = ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣"]
-        if str(payload.emoji) in rating_emojis:
-            for filename in rated_files:
-                # Add to watched list if not already present
-                if filename not in user_data[user_id_str]["watched"]:
-                    user_data[user_id_str]["watched"].append(filename)
-            save_user_data(user_data) # Save user data after updating watched list
-
-        # Existing logic for reaction-based rating
-        for filename in rated_files:
-            if filename not in ratings:
-                ratings[filename] = {"votes": 0, "voters": []}
-            
-            if user_id_str not in ratings[filename]["voters"]:
-                ratings[filename]["votes"] += 1
-                ratings[filename]["voters"].append(user_id_str)
-        
-        save_media_ratings(ratings)
+        async with state_lock:
+            record_reaction_vote(payload.message_id, payload.user_id, str(payload.emoji))
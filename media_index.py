@@ -0,0 +1,183 @@
+import bisect
+import threading
+from datetime import datetime, timedelta
+
+# Windows offered by /top_media. None means "all time".
+LEADERBOARD_WINDOWS = {
+    "day": timedelta(days=1),
+    "week": timedelta(days=7),
+    "month": timedelta(days=30),
+    "all": None,
+}
+
+
+def parse_upload_date(value):
+    """Turn a stored ISO upload_date into a POSIX timestamp (0 if unusable)."""
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class _WindowBoard:
+    """Ranked, rated uploads newer than now - span, expired lazily as time moves on."""
+
+    def __init__(self, span):
+        self.span = span
+        self.cutoff = float("-inf")  # everything older than this has been evicted
+        self.members = set()
+        self.ranked = []  # sorted (-votes, filename) of rated members
+
+    def in_window(self, ts):
+        return self.span is None or ts >= self.cutoff
+
+
+class MediaIndex:
+    """In-memory upload timeline plus per-window vote leaderboards.
+
+    Built once from upload_history.json metadata and media_ratings.json, then
+    kept current by uploads, votes and undo instead of re-reading the files.
+    Methods are guarded by a lock because the TUI thread reads it too.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.loaded = False
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.timeline = []  # sorted (timestamp, filename)
+            self.upload_ts = {}
+            self.message_ids = {}
+            self.message_files = {}  # message_id -> filenames posted in it
+            self.votes = {}
+            self.voters = {}
+            self.boards = {name: _WindowBoard(span) for name, span in LEADERBOARD_WINDOWS.items()}
+
+    def load(self, metadata, ratings):
+        with self._lock:
+            self.clear()
+            for filename, data in metadata.items():
+                ts = parse_upload_date(data.get("upload_date"))
+                self.upload_ts[filename] = ts
+                self.timeline.append((ts, filename))
+                if data.get("message_id"):
+                    self._link_message(filename, data["message_id"])
+            self.timeline.sort()
+            for filename, data in ratings.items():
+                self.votes[filename] = data.get("votes", 0)
+                self.voters[filename] = len(data.get("voters", []))
+            for board in self.boards.values():
+                self._rebuild(board)
+            self.loaded = True
+
+    def _rebuild(self, board):
+        board.cutoff = float("-inf")
+        board.members = set(self.upload_ts)
+        board.ranked = sorted((-self.votes[f], f) for f in board.members if f in self.votes)
+
+    def _expire(self, board, now):
+        """Evict members that fell out of the window since the last query: O(expired)."""
+        if board.span is None:
+            return
+        new_cutoff = (now - board.span).timestamp()
+        if new_cutoff <= board.cutoff:
+            return
+        start = bisect.bisect_left(self.timeline, (board.cutoff, ""))
+        end = bisect.bisect_left(self.timeline, (new_cutoff, ""))
+        for _, filename in self.timeline[start:end]:
+            if filename in board.members:
+                board.members.discard(filename)
+                self._unrank(board, filename)
+        board.cutoff = new_cutoff
+
+    def _unrank(self, board, filename):
+        if filename not in self.votes:
+            return
+        key = (-self.votes[filename], filename)
+        i = bisect.bisect_left(board.ranked, key)
+        if i < len(board.ranked) and board.ranked[i] == key:
+            del board.ranked[i]
+
+    def add_upload(self, filename, upload_date, message_id=None):
+        with self._lock:
+            if filename in self.upload_ts:
+                self.remove(filename)
+            ts = parse_upload_date(upload_date)
+            self.upload_ts[filename] = ts
+            if message_id:
+                self._link_message(filename, message_id)
+            bisect.insort(self.timeline, (ts, filename))
+            for board in self.boards.values():
+                if board.in_window(ts):
+                    board.members.add(filename)
+                    if filename in self.votes:
+                        bisect.insort(board.ranked, (-self.votes[filename], filename))
+
+    def remove(self, filename):
+        """Forget an upload and its votes (used by /undo)."""
+        with self._lock:
+            ts = self.upload_ts.pop(filename, None)
+            message_id = self.message_ids.pop(filename, None)
+            if message_id is not None:
+                files = self.message_files.get(message_id, [])
+                if filename in files:
+                    files.remove(filename)
+                if not files:
+                    self.message_files.pop(message_id, None)
+            if ts is not None:
+                i = bisect.bisect_left(self.timeline, (ts, filename))
+                if i < len(self.timeline) and self.timeline[i] == (ts, filename):
+                    del self.timeline[i]
+            for board in self.boards.values():
+                if filename in board.members:
+                    board.members.discard(filename)
+                    self._unrank(board, filename)
+            self.votes.pop(filename, None)
+            self.voters.pop(filename, None)
+
+    def record_vote(self, filename, votes, voters):
+        """Store the new vote totals for a file and re-rank it in every window holding it."""
+        with self._lock:
+            boards = [b for b in self.boards.values() if filename in b.members]
+            for board in boards:
+                self._unrank(board, filename)
+            self.votes[filename] = votes
+            self.voters[filename] = voters
+            for board in boards:
+                bisect.insort(board.ranked, (-votes, filename))
+
+    def _link_message(self, filename, message_id):
+        self.message_ids[filename] = message_id
+        self.message_files.setdefault(message_id, []).append(filename)
+
+    def message_id(self, filename):
+        return self.message_ids.get(filename)
+
+    def files_for_message(self, message_id):
+        """Filenames posted in `message_id`, in upload order (empty if it isn't an upload)."""
+        with self._lock:
+            return list(self.message_files.get(message_id, ()))
+
+    def top(self, window="week", limit=10, now=None):
+        """Return up to `limit` (filename, votes, voters) tuples for the window."""
+        with self._lock:
+            board = self.boards[window]
+            self._expire(board, now or datetime.now())
+            return [
+                (filename, -neg_votes, self.voters.get(filename, 0))
+                for neg_votes, filename in board.ranked[:limit]
+                if neg_votes < 0
+            ]
+
+    def recent(self, limit=10, since=None):
+        """Return up to `limit` (filename, timestamp) pairs, newest first."""
+        with self._lock:
+            start = 0 if since is None else bisect.bisect_left(self.timeline, (since.timestamp(), ""))
+            window = self.timeline[max(start, len(self.timeline) - limit):]
+            return [(filename, ts) for ts, filename in reversed(window)]
+
+    def count_since(self, since):
+        with self._lock:
+            return len(self.timeline) - bisect.bisect_left(self.timeline, (since.timestamp(), ""))
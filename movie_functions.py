@@ -1,27 +1,97 @@
 
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import discord.app_commands
-import requests
+import asyncio
 import re
-
+import time
+
+import outbound
+import rate_limit
+from interaction_deadline import auto_defer
+from live_config import settings
+import tmdb_functions
+import title_index
+from poll_engine import PollBook, TimerWheel
+from show_aliases import ShowAliasCache
 from config import (
-    TMDB_API_KEY,
-    MOVIES_CHANNEL_ID,
+    POLLS_FILE,
+    SHOW_ALIAS_FILE,
+    SHOW_ALIAS_REVALIDATE_DAYS,
 )
 
+# Autocomplete choices carry the TMDB id so a picked title needs no search call
+TMDB_ID_VALUE = re.compile(r"^tmdb:(\d+)$")
+
+show_aliases = ShowAliasCache(SHOW_ALIAS_FILE, SHOW_ALIAS_REVALIDATE_DAYS * 24 * 60 * 60)
+_revalidating = set()
+
+POLL_EMOJIS = ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣"]
+POLL_FLUSH_SECONDS = 5
+
+# Open polls survive restarts: reload them and put their deadlines back on the wheel
+polls = PollBook(POLLS_FILE)
+poll_wheel = TimerWheel()
+for _message_id, _poll in polls.polls.items():
+    poll_wheel.schedule(_message_id, _poll["closes_at"])
+_last_poll_flush = 0.0
+
+
+async def resolve_movie(query: str):
+    """Return the TMDB movie for an autocomplete pick or the top search hit, or None."""
+    match = TMDB_ID_VALUE.match(query)
+    if match:
+        item = await tmdb_functions.movie_details(int(match.group(1)))
+        if not item.get("id"):
+            return None
+    else:
+        res = await tmdb_functions.search_movie(query)
+        if not res.get("results"):
+            return None
+        item = res["results"][0]
+    title_index.remember_movie(item)
+    return item
+
+
+async def resolve_show(query: str):
+    """Return the TMDB show for an autocomplete pick or the top search hit, or None."""
+    match = TMDB_ID_VALUE.match(query)
+    if match:
+        item = await tmdb_functions.load_show(int(match.group(1)))
+        if not item.get("id"):
+            return None
+    else:
+        res = await tmdb_functions.search_tv(query)
+        if not res.get("results"):
+            return None
+        item = res["results"][0]
+    title_index.remember_show(item)
+    return item
+
+
+async def movie_title_autocomplete(interaction: discord.Interaction, current: str):
+    return [
+        discord.app_commands.Choice(name=label[:100], value=f"tmdb:{tmdb_id}")
+        for tmdb_id, label in title_index.movie_titles.suggest(current)
+    ]
+
+
+async def show_title_autocomplete(interaction: discord.Interaction, current: str):
+    return [
+        discord.app_commands.Choice(name=label[:100], value=f"tmdb:{tmdb_id}")
+        for tmdb_id, label in title_index.tv_titles.suggest(current)
+    ]
+
 
 async def request_movie(interaction: discord.Interaction, movie_name: str):
-    movie_channel = interaction.client.get_channel(MOVIES_CHANNEL_ID)
+    movie_channel = interaction.client.get_channel(settings.MOVIES_CHANNEL_ID)
     target = movie_channel if movie_channel else interaction.channel
 
-    url = "https://api.themoviedb.org/3/search/movie"
-    res = requests.get(url, params={"api_key": TMDB_API_KEY, "query": movie_name}).json()
-    if not res.get("results"):
+    item = await resolve_movie(movie_name)
+    if not item:
         await interaction.response.send_message(f"❌ No movie found for: {movie_name}")
         return
 
-    item = res["results"][0]
     tmdb_id = item["id"]
     title = item.get("title")
     watch_url = f"https://rivestream.org/embed?type=movie&id={tmdb_id}"
@@ -56,32 +126,14 @@ async def request_movie(interaction: discord.Interaction, movie_name: str):
     )
 
     await interaction.response.send_message(embed=embed, view=view)
-    if movie_channel and interaction.channel_id != MOVIES_CHANNEL_ID:
-        await interaction.followup.send(f"✅ Sent to <#{MOVIES_CHANNEL_ID}>")
+    if movie_channel and interaction.channel_id != settings.MOVIES_CHANNEL_ID:
+        await interaction.followup.send(f"✅ Sent to <#{settings.MOVIES_CHANNEL_ID}>")
 
 
-async def request_show(interaction: discord.Interaction, query: str):
-    movie_channel = interaction.client.get_channel(MOVIES_CHANNEL_ID)
-    target = movie_channel if movie_channel else interaction.channel
-
-    s_e_match = re.search(r" [Ss](\d+)[Ee](\d+)", query)
-    if not s_e_match:
-        await interaction.response.send_message("❌ Please use format: /rshow Show Name S01E01")
-        return
-
-    season = str(int(s_e_match.group(1)))
-    episode = str(int(s_e_match.group(2)))
-    search_query = query[: s_e_match.start()]
-
-    url = "https://api.themoviedb.org/3/search/tv"
-    res = requests.get(url, params={"api_key": TMDB_API_KEY, "query": search_query}).json()
-    if not res.get("results"):
-        await interaction.response.send_message(f"❌ No show found for: {search_query}")
-        return
-
-    item = res["results"][0]
-    tmdb_id = item["id"]
-    title = item.get("name")
+def build_episode_message(show, season: str, episode: str, picker=None):
+    """Embed and link buttons for one episode of `show`; `picker` adds a "Wrong show?" select."""
+    tmdb_id = show["id"]
+    title = show.get("name")
 
     watch_url = (
         f"https://rivestream.org/embed?type=tv&id={tmdb_id}"
@@ -93,17 +145,17 @@ async def request_show(interaction: discord.Interaction, query: str):
     )
 
     display_title = f"{title} (S{season.zfill(2)}E{episode.zfill(2)})"
-    overview = item.get("overview", "")
+    overview = show.get("overview") or ""
     if len(overview) > 300:
         overview = overview[:300] + "..."
 
     embed = discord.Embed(title=display_title, description=overview, color=0x9B59B6)
-    if item.get("poster_path"):
+    if show.get("poster_path"):
         embed.set_thumbnail(
-            url=f"https://image.tmdb.org/t/p/w500{item['poster_path']}"
+            url=f"https://image.tmdb.org/t/p/w500{show['poster_path']}"
         )
 
-    view = discord.ui.View()
+    view = picker or discord.ui.View()
     view.add_item(
         discord.ui.Button(
             label="Watch Now",
@@ -120,20 +172,141 @@ async def request_show(interaction: discord.Interaction, query: str):
             emoji="📥",
         )
     )
+    return embed, view
+
+
+class ShowPickView(discord.ui.View):
+    """Lets the requester swap in another search result; the pick is remembered for that name."""
+
+    def __init__(self, user_id: int, show_name: str, alternatives: list, season: str, episode: str, timeout=180):
+        super().__init__(timeout=timeout)
+        self.user_id = user_id
+        self.show_name = show_name
+        self.alternatives = {str(alt["id"]): alt for alt in alternatives[:25]}
+        self.season = season
+        self.episode = episode
+
+        select = discord.ui.Select(
+            placeholder="Wrong show? Pick the right one...",
+            options=[
+                discord.SelectOption(
+                    label=(alt.get("name") or "Unknown")[:100],
+                    description=(alt.get("first_air_date") or "")[:4] or None,
+                    value=tmdb_id,
+                )
+                for tmdb_id, alt in self.alternatives.items()
+            ],
+            row=1,
+        )
+        select.callback = self.on_pick
+        self.add_item(select)
+
+    async def on_pick(self, interaction: discord.Interaction):
+        if interaction.user.id != self.user_id:
+            await interaction.response.send_message("❌ Only the person who asked can change the show.", ephemeral=True)
+            return
+        show = self.alternatives[interaction.data["values"][0]]
+        show_aliases.confirm(self.show_name, show)
+        title_index.remember_show(show)
+        embed, view = build_episode_message(show, self.season, self.episode)
+        await interaction.response.edit_message(embed=embed, view=view)
+        self.stop()
+
+
+async def revalidate_show_alias(show_name: str):
+    """Refresh a stale alias: re-run the search, or just the details for a user-confirmed pick."""
+    key = title_index.normalize_title(show_name)
+    if key in _revalidating:
+        return
+    _revalidating.add(key)
+    try:
+        entry = show_aliases.get(show_name)
+        if entry and entry["confirmed"]:
+            details = await tmdb_functions.tv_details(entry["show"]["id"])
+            if details.get("id"):
+                show_aliases.put(show_name, details, entry["alternatives"], confirmed=True)
+        else:
+            res = await tmdb_functions.search_tv(show_name)
+            if res.get("results"):
+                show_aliases.put(show_name, res["results"][0], res["results"][1:6])
+    except Exception as e:
+        print(f"Failed to revalidate show alias '{show_name}': {e}")
+    finally:
+        _revalidating.discard(key)
+
+
+def missing_episode(show, season: int, episode: int):
+    """Explain why SxxEyy does not exist in `show`, or return None if it does."""
+    title = show.get("name")
+    for entry in show.get("seasons", []):
+        if entry.get("season_number") == season:
+            if entry.get("episode_count") and episode > entry["episode_count"]:
+                return f"{title} Season {season} only has {entry['episode_count']} episodes."
+            return None
+    return f"{title} has no Season {season}."
+
+
+async def warm_show(tmdb_id: int):
+    try:
+        await tmdb_functions.load_show(tmdb_id)
+    except Exception as e:
+        print(f"Failed to load TMDB show {tmdb_id}: {e}")
+
+
+async def request_show(interaction: discord.Interaction, query: str):
+    movie_channel = interaction.client.get_channel(settings.MOVIES_CHANNEL_ID)
+    target = movie_channel if movie_channel else interaction.channel
+
+    s_e_match = re.search(r" [Ss](\d+)[Ee](\d+)", query)
+    if not s_e_match:
+        await interaction.response.send_message("❌ Please use format: /rshow Show Name S01E01")
+        return
+
+    season = str(int(s_e_match.group(1)))
+    episode = str(int(s_e_match.group(2)))
+    search_query = query[: s_e_match.start()]
+
+    # Known shows need no TMDB call; stale entries are served and refreshed in the background
+    entry = show_aliases.get(search_query)
+    if entry:
+        if show_aliases.is_stale(entry):
+            asyncio.create_task(revalidate_show_alias(search_query))
+    else:
+        if not await rate_limit.allow(interaction, "rshow"):
+            return
+        res = await tmdb_functions.search_tv(search_query)
+        if not res.get("results"):
+            await interaction.response.send_message(f"❌ No show found for: {search_query}")
+            return
+        title_index.remember_show(res["results"][0])
+        entry = show_aliases.put(search_query, res["results"][0], res["results"][1:6])
+
+    # Validate against the cached show document; if it isn't cached yet, warm it for next time
+    show = tmdb_functions.cached_show(entry["show"]["id"])
+    if show is None:
+        asyncio.create_task(warm_show(entry["show"]["id"]))
+    else:
+        problem = missing_episode(show, int(season), int(episode))
+        if problem:
+            await interaction.response.send_message(f"❌ {problem}")
+            return
+
+    picker = None
+    if entry["alternatives"] and not entry["confirmed"]:
+        picker = ShowPickView(interaction.user.id, search_query, entry["alternatives"], season, episode)
+    embed, view = build_episode_message(entry["show"], season, episode, picker)
 
     await interaction.response.send_message(embed=embed, view=view)
-    if movie_channel and interaction.channel_id != MOVIES_CHANNEL_ID:
-        await interaction.followup.send(f"✅ Sent to <#{MOVIES_CHANNEL_ID}>")
+    if movie_channel and interaction.channel_id != settings.MOVIES_CHANNEL_ID:
+        await interaction.followup.send(f"✅ Sent to <#{settings.MOVIES_CHANNEL_ID}>")
 
 
 async def movie_info(interaction: discord.Interaction, movie_name: str):
-    url = "https://api.themoviedb.org/3/search/movie"
-    res = requests.get(url, params={"api_key": TMDB_API_KEY, "query": movie_name}).json()
-    if not res.get("results"):
+    item = await resolve_movie(movie_name)
+    if not item:
         await interaction.response.send_message(f"❌ No movie found for: {movie_name}")
         return
 
-    item = res["results"][0]
     tmdb_id = item["id"]
     title = item.get("title")
     release_date = item.get("release_date", "Unknown")
@@ -157,26 +330,59 @@ async def movie_info(interaction: discord.Interaction, movie_name: str):
     )
 
     view = SimilarMoviesView(tmdb_id)
+    view.start_prefetch()
     await interaction.response.send_message(embed=embed, view=view)
 
 
+async def fetch_similar(tmdb_id: int, count: int = 3):
+    """Top similar movies, each upgraded to its full details when that lookup succeeds."""
+    similar_res = await tmdb_functions.similar_movies(tmdb_id)
+    suggestions = similar_res.get("results", [])[:count]
+    details = await asyncio.gather(
+        *(tmdb_functions.movie_details(item["id"]) for item in suggestions), return_exceptions=True
+    )
+    return [
+        detail if isinstance(detail, dict) and detail.get("id") else item
+        for item, detail in zip(suggestions, details)
+    ]
+
+
 class SimilarMoviesView(discord.ui.View):
+    """Info-embed button whose suggestions are fetched speculatively while the user reads.
+
+    The prefetch is cancelled if the view times out without being clicked.
+    """
+
     def __init__(self, tmdb_id: int, timeout=180):
         super().__init__(timeout=timeout)
         self.tmdb_id = tmdb_id
+        self._prefetch = None
+
+    def start_prefetch(self):
+        self._prefetch = asyncio.create_task(self._fetch())
+
+    async def _fetch(self):
+        try:
+            return await fetch_similar(self.tmdb_id)
+        except Exception as e:
+            print(f"Failed to fetch similar movies for {self.tmdb_id}: {e}")
+            return None
+
+    async def on_timeout(self):
+        if self._prefetch and not self._prefetch.done():
+            self._prefetch.cancel()
 
     @discord.ui.button(label="More Like This", style=discord.ButtonStyle.blurple)
     async def more_like_this(self, interaction: discord.Interaction, button: discord.ui.Button):
         await interaction.response.defer(ephemeral=True)
-        
-        similar_url = f"https://api.themoviedb.org/3/movie/{self.tmdb_id}/similar"
-        similar_res = requests.get(similar_url, params={"api_key": TMDB_API_KEY}).json()
 
-        if not similar_res.get("results"):
+        if self._prefetch is None or (self._prefetch.done() and self._prefetch.result() is None):
+            self.start_prefetch()  # nothing warmed yet, or the speculative fetch failed
+        suggestions = await self._prefetch
+
+        if suggestions is None:
             await interaction.followup.send("❌ Could not find similar movies.", ephemeral=True)
             return
-
-        suggestions = similar_res["results"][:3] # Get top 3 suggestions
         if not suggestions:
             await interaction.followup.send("❌ No similar movies found.", ephemeral=True)
             return
@@ -184,7 +390,7 @@ class SimilarMoviesView(discord.ui.View):
         embeds = []
         for item in suggestions:
             title = item.get("title")
-            overview = item.get("overview", "No description available.")
+            overview = item.get("overview") or "No description available."
             if len(overview) > 200:
                 overview = overview[:200] + "..."
             
@@ -197,6 +403,10 @@ class SimilarMoviesView(discord.ui.View):
                 embed.set_thumbnail(url=f"https://image.tmdb.org/t/p/w500{item['poster_path']}")
             
             embed.add_field(name="Rating", value=f"{item.get('vote_average', 'N/A')}/10", inline=True)
+            if item.get("runtime"):
+                embed.add_field(name="Runtime", value=f"{item['runtime']} min", inline=True)
+            if item.get("genres"):
+                embed.add_field(name="Genres", value=", ".join(genre["name"] for genre in item["genres"][:3]), inline=True)
             embeds.append(embed)
         
         await interaction.followup.send("Here are some similar movies:", embeds=embeds, ephemeral=True)
@@ -204,13 +414,11 @@ class SimilarMoviesView(discord.ui.View):
 
 
 async def show_info(interaction: discord.Interaction, show_name: str):
-    url = "https://api.themoviedb.org/3/search/tv"
-    res = requests.get(url, params={"api_key": TMDB_API_KEY, "query": show_name}).json()
-    if not res.get("results"):
+    item = await resolve_show(show_name)
+    if not item:
         await interaction.response.send_message(f"❌ No show found for: {show_name}")
         return
 
-    item = res["results"][0]
     tmdb_id = item["id"]
     title = item.get("name")
     first_air = item.get("first_air_date", "Unknown")
@@ -237,18 +445,15 @@ async def show_info(interaction: discord.Interaction, show_name: str):
 
 
 async def list_seasons(interaction: discord.Interaction, show_name: str):
-    search_url = "https://api.themoviedb.org/3/search/tv"
-    search_res = requests.get(search_url, params={"api_key": TMDB_API_KEY, "query": show_name}).json()
-    
-    if not search_res.get("results"):
+    show = await resolve_show(show_name)
+    if not show:
         await interaction.response.send_message(f"❌ No show found for: {show_name}")
         return
-    
-    show_id = search_res["results"][0]["id"]
-    show_title = search_res["results"][0]["name"]
 
-    details_url = f"https://api.themoviedb.org/3/tv/{show_id}"
-    details_res = requests.get(details_url, params={"api_key": TMDB_API_KEY}).json()
+    show_id = show["id"]
+    show_title = show["name"]
+
+    details_res = await tmdb_functions.load_show(show_id)
 
     if not details_res.get("seasons"):
         await interaction.response.send_message(f"❌ Could not retrieve season information for {show_title}.")
@@ -272,114 +477,194 @@ async def list_seasons(interaction: discord.Interaction, show_name: str):
 
 
 async def list_episodes(interaction: discord.Interaction, show_name: str, season_number: int):
-    search_url = "https://api.themoviedb.org/3/search/tv"
-    search_res = requests.get(search_url, params={"api_key": TMDB_API_KEY, "query": show_name}).json()
-
-    if not search_res.get("results"):
+    show = await resolve_show(show_name)
+    if not show:
         await interaction.response.send_message(f"❌ No show found for: {show_name}")
         return
 
-    show_id = search_res["results"][0]["id"]
-    show_title = search_res["results"][0]["name"]
+    show_id = show["id"]
+    show_title = show["name"]
 
-    season_url = f"https://api.themoviedb.org/3/tv/{show_id}/season/{season_number}"
-    season_res = requests.get(season_url, params={"api_key": TMDB_API_KEY}).json()
+    season_res = await tmdb_functions.load_season(show_id, season_number)
 
     if not season_res.get("episodes"):
         await interaction.response.send_message(f"❌ Could not retrieve episodes for {show_title} Season {season_number}.")
         return
 
-    embed = discord.Embed(
-        title=f"Episodes for {show_title} - Season {season_number}",
-        color=0x1ABC9C
-    )
+    pages = episode_pages(f"Episodes for {show_title} - Season {season_number}", season_res["episodes"])
+    if len(pages) == 1:
+        await interaction.response.send_message(embed=pages[0])
+    else:
+        view = EpisodePagesView(pages)
+        await interaction.response.send_message(embed=view.show_page(0), view=view)
+
 
-    for episode in season_res["episodes"]:
+def episode_pages(title: str, episodes: list, color=0x1ABC9C):
+    """Split episodes into embeds within Discord's 25-field and 6000-character limits."""
+    pages = [[]]
+    size = 0
+    for episode in episodes:
         episode_number = episode.get("episode_number")
         name = episode.get("name", f"Episode {episode_number}")
         air_date = episode.get("air_date", "Unknown")
         overview = episode.get("overview", "No description available.")
 
+        field_name = f"E{str(episode_number).zfill(2)} - {name}"[:256]
         value = f"Air Date: {air_date}\n{overview[:150]}..." if overview else f"Air Date: {air_date}"
-        embed.add_field(name=f"E{str(episode_number).zfill(2)} - {name}", value=value, inline=False)
-    
-    await interaction.response.send_message(embed=embed)
-
+        if pages[-1] and (len(pages[-1]) == 25 or size + len(field_name) + len(value) > 5000):
+            pages.append([])
+            size = 0
+        pages[-1].append((field_name, value))
+        size += len(field_name) + len(value)
+
+    embeds = []
+    for i, fields in enumerate(pages, 1):
+        embed = discord.Embed(title=title, color=color)
+        for field_name, value in fields:
+            embed.add_field(name=field_name, value=value, inline=False)
+        if len(pages) > 1:
+            embed.set_footer(text=f"Page {i}/{len(pages)}")
+        embeds.append(embed)
+    return embeds
+
+
+class EpisodePagesView(discord.ui.View):
+    def __init__(self, pages: list, timeout=180):
+        super().__init__(timeout=timeout)
+        self.pages = pages
+        self.page = 0
 
-async def poll_monitor(bot, poll_message: discord.Message, movie_details: list, emojis: list, timeout_seconds: int = 300):
-    await asyncio.sleep(timeout_seconds)
+    def show_page(self, page):
+        self.page = min(max(page, 0), len(self.pages) - 1)
+        self.previous_button.disabled = self.page == 0
+        self.next_button.disabled = self.page >= len(self.pages) - 1
+        return self.pages[self.page]
 
-    # Fetch the updated message to get latest reactions
-    updated_message = await poll_message.channel.fetch_message(poll_message.id)
+    @discord.ui.button(label="◀ Prev", style=discord.ButtonStyle.grey)
+    async def previous_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.edit_message(embed=self.show_page(self.page - 1), view=self)
 
-    results = {}
-    for emoji in emojis:
-        results[emoji] = 0
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.grey)
+    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.edit_message(embed=self.show_page(self.page + 1), view=self)
 
-    for reaction in updated_message.reactions:
-        if reaction.emoji in emojis:
-            results[reaction.emoji] = reaction.count - 1 # Exclude bot's own reaction
 
-    # Determine winner(s)
-    winning_emojis = []
-    max_votes = 0
-    for emoji, votes in results.items():
-        if votes > max_votes:
-            max_votes = votes
-            winning_emojis = [emoji]
-        elif votes == max_votes and max_votes > 0:
-            winning_emojis.append(emoji)
+def poll_results_message(poll: dict, counts: list):
+    emojis = poll["emojis"]
+    movie_details = poll["options"]
+    max_votes = max(counts, default=0)
+    winning = [i for i, votes in enumerate(counts) if votes == max_votes]
 
-    winner_announcement = ""
     if max_votes == 0:
-        winner_announcement = "The poll ended with no votes!"
-    elif len(winning_emojis) > 1:
+        return "The poll ended with no votes!"
+    if len(winning) > 1:
         winner_announcement = "It's a tie between:\n"
-        for emoji in winning_emojis:
-            index = emojis.index(emoji)
-            winner_announcement += f"{emoji} {movie_details[index]['title']}\n"
+        for index in winning:
+            winner_announcement += f"{emojis[index]} {movie_details[index]['title']}\n"
         winner_announcement += f"with {max_votes} votes each!"
-    else:
-        winner_emoji = winning_emojis[0]
-        winner_index = emojis.index(winner_emoji)
-        winner_movie = movie_details[winner_index]
-        winner_announcement = f"The winner is: {winner_emoji} **{winner_movie['title']}** with {max_votes} votes!\n\n"
-        winner_announcement += f"Watch Now: https://rivestream.org/embed?type=movie&id={winner_movie['tmdb_id']}\n"
-        winner_announcement += f"Download: https://rivestream.org/download?type=movie&id={winner_movie['tmdb_id']}"
+        return winner_announcement
+
+    winner_movie = movie_details[winning[0]]
+    winner_announcement = f"The winner is: {emojis[winning[0]]} **{winner_movie['title']}** with {max_votes} votes!\n\n"
+    winner_announcement += f"Watch Now: https://rivestream.org/embed?type=movie&id={winner_movie['tmdb_id']}\n"
+    winner_announcement += f"Download: https://rivestream.org/download?type=movie&id={winner_movie['tmdb_id']}"
+    return winner_announcement
+
+
+async def close_poll(bot, message_id: str):
+    """Announce the result from the in-memory tally; no message fetch needed."""
+    poll, counts = polls.close(message_id)
+    channel = bot.get_channel(poll["channel_id"])
+    if channel is None:
+        print(f"Poll {message_id}: channel {poll['channel_id']} not found, dropping result")
+        return
+    try:
+        await outbound.scheduler.submit(outbound.Priority.BACKGROUND, channel.send, poll_results_message(poll, counts))
+    except discord.HTTPException as e:
+        print(f"Poll {message_id}: failed to announce result: {e}")
+
+
+@tasks.loop(seconds=1)
+async def poll_ticker():
+    """Single timer for every open poll: close the ones that are due and flush vote changes."""
+    global _last_poll_flush
+    for message_id in poll_wheel.advance():
+        await close_poll(poll_ticker.bot, message_id)
+
+    now = time.time()
+    if polls.dirty and now - _last_poll_flush >= POLL_FLUSH_SECONDS:
+        polls.flush()
+        _last_poll_flush = now
 
-    await poll_message.channel.send(winner_announcement)
 
 def setup(bot):
     tree = bot.tree
+    poll_ticker.bot = bot
+
+    async def on_poll_reaction_add(payload):
+        if payload.user_id != bot.user.id:
+            polls.react(payload.message_id, payload.user_id, str(payload.emoji), added=True)
+
+    async def on_poll_reaction_remove(payload):
+        if payload.user_id != bot.user.id:
+            polls.react(payload.message_id, payload.user_id, str(payload.emoji), added=False)
+
+    # Listeners rather than @bot.event so media_functions' reaction handler keeps working
+    bot.add_listener(on_poll_reaction_add, "on_raw_reaction_add")
+    bot.add_listener(on_poll_reaction_remove, "on_raw_reaction_remove")
+
+    # Export files can hold hundreds of thousands of titles; load them without blocking the gateway
+    asyncio.get_running_loop().run_in_executor(None, title_index.load_title_indexes)
 
     @tree.command(name="rmovie", description="Get watch/download links for a movie.")
     @discord.app_commands.describe(movie_name="The name of the movie")
+    @discord.app_commands.autocomplete(movie_name=movie_title_autocomplete)
+    @auto_defer()
     async def rmovie_slash(interaction: discord.Interaction, movie_name: str):
+        if not await rate_limit.allow(interaction, "rmovie"):
+            return
         await request_movie(interaction, movie_name=movie_name)
     
     @tree.command(name="rshow", description="Get watch/download links for a TV episode.")
     @discord.app_commands.describe(query="The TV show name and episode (e.g., 'Breaking Bad S01E01')")
+    @auto_defer()
     async def rshow_slash(interaction: discord.Interaction, query: str):
         await request_show(interaction, query=query)
 
     @tree.command(name="movie", description="Get detailed movie information.")
     @discord.app_commands.describe(movie_name="The name of the movie")
+    @discord.app_commands.autocomplete(movie_name=movie_title_autocomplete)
+    @auto_defer()
     async def movie_slash(interaction: discord.Interaction, movie_name: str):
+        if not await rate_limit.allow(interaction, "movie"):
+            return
         await movie_info(interaction, movie_name=movie_name)
 
     @tree.command(name="show", description="Get detailed TV show information.")
     @discord.app_commands.describe(show_name="The name of the TV show")
+    @discord.app_commands.autocomplete(show_name=show_title_autocomplete)
+    @auto_defer()
     async def show_slash(interaction: discord.Interaction, show_name: str):
+        if not await rate_limit.allow(interaction, "show"):
+            return
         await show_info(interaction, show_name=show_name)
 
     @tree.command(name="seasons", description="List seasons for a TV show.")
     @discord.app_commands.describe(show_name="The name of the TV show")
+    @discord.app_commands.autocomplete(show_name=show_title_autocomplete)
+    @auto_defer()
     async def seasons_slash(interaction: discord.Interaction, show_name: str):
+        if not await rate_limit.allow(interaction, "seasons"):
+            return
         await list_seasons(interaction, show_name=show_name)
 
     @tree.command(name="episodes", description="List episodes for a specific TV show season.")
     @discord.app_commands.describe(show_name="The name of the TV show", season_number="The season number")
+    @discord.app_commands.autocomplete(show_name=show_title_autocomplete)
+    @auto_defer()
     async def episodes_slash(interaction: discord.Interaction, show_name: str, season_number: int):
+        if not await rate_limit.allow(interaction, "episodes"):
+            return
         await list_episodes(interaction, show_name=show_name, season_number=season_number)
 
     @tree.command(name="moviepoll", description="Create a poll to vote on movies to watch.")
@@ -388,7 +673,15 @@ def setup(bot):
         title2="Second movie title",
         title3="Third movie title (optional)",
         title4="Fourth movie title (optional)",
-        title5="Fifth movie title (optional)"
+        title5="Fifth movie title (optional)",
+        duration_minutes="How long voting stays open (default 5 minutes)"
+    )
+    @discord.app_commands.autocomplete(
+        title1=movie_title_autocomplete,
+        title2=movie_title_autocomplete,
+        title3=movie_title_autocomplete,
+        title4=movie_title_autocomplete,
+        title5=movie_title_autocomplete,
     )
     async def moviepoll_slash(
         interaction: discord.Interaction,
@@ -396,7 +689,8 @@ def setup(bot):
         title2: str,
         title3: str = None,
         title4: str = None,
-        title5: str = None
+        title5: str = None,
+        duration_minutes: discord.app_commands.Range[int, 1, 10080] = 5
     ):
         titles = [t for t in [title1, title2, title3, title4, title5] if t is not None]
         
@@ -406,16 +700,16 @@ def setup(bot):
         if len(titles) > 5:
             await interaction.response.send_message("❌ You can only provide up to five movie titles for the poll.", ephemeral=True)
             return
+        if not await rate_limit.allow(interaction, "moviepoll"):
+            return
 
         await interaction.response.defer() # Defer the response as TMDB API calls can take time
 
         movie_details = []
         for title in titles:
-            url = "https://api.themoviedb.org/3/search/movie"
-            res = requests.get(url, params={"api_key": TMDB_API_KEY, "query": title}).json()
-            
-            if res.get("results"):
-                item = res["results"][0]
+            item = await resolve_movie(title)
+
+            if item:
                 movie_details.append({
                     "title": item.get("title"),
                     "tmdb_id": item["id"],
@@ -429,7 +723,7 @@ def setup(bot):
             await interaction.followup.send("❌ No valid movie titles found to create a poll.", ephemeral=True)
             return
 
-        emojis = ["1️⃣", "2️⃣", "3️⃣", "4️⃣", "5️⃣"]
+        emojis = POLL_EMOJIS[:len(movie_details)]
         poll_description = "Vote for your favorite movie:\n\n"
         for i, movie in enumerate(movie_details):
             poll_description += f"{emojis[i]} **{movie['title']}**\n"
@@ -443,10 +737,17 @@ def setup(bot):
         if movie_details[0].get("poster_path"):
             embed.set_thumbnail(url=f"https://image.tmdb.org/t/p/w500{movie_details[0]['poster_path']}")
 
+        closes_at = int(time.time()) + duration_minutes * 60
+        embed.add_field(name="Voting ends", value=f"<t:{closes_at}:R>", inline=False)
+
         poll_message = await interaction.followup.send(embed=embed)
 
-        for i in range(len(movie_details)):
-            await poll_message.add_reaction(emojis[i])
+        # Register before adding reactions so early votes are counted
+        options = [{"title": movie["title"], "tmdb_id": movie["tmdb_id"]} for movie in movie_details]
+        polls.open(poll_message.id, poll_message.channel.id, options, emojis, closes_at)
+        poll_wheel.schedule(str(poll_message.id), closes_at)
+
+        for emoji in emojis:
+            await outbound.scheduler.submit(outbound.Priority.INTERACTIVE, poll_message.add_reaction, emoji)
 
-        # TODO: Implement timeout and winner announcement
-        await interaction.followup.send("Poll created! Voting ends after a set time. (Winner announcement coming soon!)", ephemeral=True)
+        await interaction.followup.send(f"Poll created! Voting ends <t:{closes_at}:R>.", ephemeral=True)
@@ -0,0 +1,104 @@
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from enum import IntEnum
+
+from config import OUTBOUND_MAX_IN_FLIGHT, OUTBOUND_INTERACTIVE_RESERVE
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0  # replies and edits a user is waiting on (auto_defer commands, poll reactions, fact-check edits)
+    BACKGROUND = 1  # batch uploads and other scheduled posts
+    MAINTENANCE = 2  # undo deletions, history scans during recovery
+
+
+class OutboundScheduler:
+    """Priority gate in front of outbound Discord requests submitted to it.
+
+    At most ``max_in_flight`` requests run at once and background classes
+    may never take the last ``interactive_reserve`` slots, so a large upload
+    cannot hold up interactive requests. Waiters are served highest priority
+    first, FIFO within a class.
+
+    Only submitted calls are gated. Commands under ``auto_defer`` submit their
+    responses and followups automatically; interaction calls made elsewhere
+    (plain commands, /undo's progress edits, component callbacks) go straight
+    to discord.py.
+    """
+
+    def __init__(self, max_in_flight=4, interactive_reserve=2, sample_size=500):
+        self.max_in_flight = max_in_flight
+        self.interactive_reserve = interactive_reserve
+        self._queue = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self.in_flight = {p: 0 for p in Priority}
+        self.completed = {p: 0 for p in Priority}
+        self._waits = {p: deque(maxlen=sample_size) for p in Priority}
+
+    def _can_start(self, priority):
+        if sum(self.in_flight.values()) >= self.max_in_flight:
+            return False
+        if priority == Priority.INTERACTIVE:
+            return True
+        background = sum(n for p, n in self.in_flight.items() if p != Priority.INTERACTIVE)
+        return background < self.max_in_flight - self.interactive_reserve
+
+    def _dispatch(self):
+        while self._queue:
+            priority, _, future = self._queue[0]
+            if future.done():  # waiter was cancelled
+                heapq.heappop(self._queue)
+                continue
+            if not self._can_start(priority):
+                # Anything higher priority would be at the top, so nothing else can start either
+                return
+            heapq.heappop(self._queue)
+            self.in_flight[priority] += 1
+            future.set_result(None)
+
+    def _release(self, priority):
+        self.in_flight[priority] -= 1
+        self._dispatch()
+
+    async def submit(self, priority, func, *args, **kwargs):
+        """Await ``func(*args, **kwargs)`` once a slot for `priority` is free and return its result."""
+        queued_at = time.monotonic()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), future))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self._release(priority)  # slot was granted just as we were cancelled
+            raise
+        self._waits[priority].append(time.monotonic() - queued_at)
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            self.completed[priority] += 1
+            self._release(priority)
+
+    def metrics(self):
+        """Queue depth, in-flight and completed counts plus p50/p99 queue wait (ms) per class."""
+        queued = {p: 0 for p in Priority}
+        for priority, _, future in self._queue:
+            if not future.done():
+                queued[priority] += 1
+        stats = {}
+        for p in Priority:
+            waits = sorted(self._waits[p])
+            pick = lambda q: round(waits[min(len(waits) - 1, int(q * len(waits)))] * 1000, 1) if waits else 0.0
+            stats[p.name.lower()] = {
+                "queued": queued[p],
+                "in_flight": self.in_flight[p],
+                "completed": self.completed[p],
+                "wait_p50_ms": pick(0.5),
+                "wait_p99_ms": pick(0.99),
+            }
+        return stats
+
+
+scheduler = OutboundScheduler(OUTBOUND_MAX_IN_FLIGHT, OUTBOUND_INTERACTIVE_RESERVE)
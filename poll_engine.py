@@ -0,0 +1,119 @@
+import json
+import time
+
+from state_journal import write_json_atomic
+
+
+class TimerWheel:
+    """Hashed timing wheel: one periodic tick fires every timer that has come due.
+
+    Timers hash into ``slots`` buckets by their due tick, so a tick only looks
+    at one bucket no matter how many timers are pending. Timers further out
+    than one revolution simply stay in their bucket until their tick arrives.
+    """
+
+    def __init__(self, tick_seconds=1.0, slots=512, now=None):
+        self.tick_seconds = tick_seconds
+        self.slots = [dict() for _ in range(slots)]  # key -> due tick
+        self.current = self._tick(time.time() if now is None else now)
+        self._slot_of = {}
+
+    def __len__(self):
+        return len(self._slot_of)
+
+    def _tick(self, when):
+        return int(when // self.tick_seconds)
+
+    def schedule(self, key, due):
+        self.cancel(key)
+        due_tick = max(self._tick(due), self.current + 1)
+        slot = due_tick % len(self.slots)
+        self.slots[slot][key] = due_tick
+        self._slot_of[key] = slot
+
+    def cancel(self, key):
+        slot = self._slot_of.pop(key, None)
+        if slot is not None:
+            self.slots[slot].pop(key, None)
+
+    def advance(self, now=None):
+        """Move the wheel to `now` and return the keys that came due, catching up after downtime."""
+        target = self._tick(time.time() if now is None else now)
+        fired = []
+        # After a long gap every bucket is visited once; due ticks decide what fires
+        for tick in range(max(self.current + 1, target - len(self.slots) + 1), target + 1):
+            bucket = self.slots[tick % len(self.slots)]
+            for key in [key for key, due_tick in bucket.items() if due_tick <= target]:
+                del bucket[key]
+                del self._slot_of[key]
+                fired.append(key)
+        self.current = max(self.current, target)
+        return fired
+
+
+class PollBook:
+    """Open polls persisted to JSON, with votes tallied from raw reaction events.
+
+    A user's vote is their most recent reaction that is still on the message,
+    so switching emoji moves the vote and removing it falls back to the
+    previous one. Reaction updates only mark the book dirty; ``flush()``
+    writes it out, so busy polls don't rewrite the file on every click.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.polls = {}  # message_id (str) -> poll dict
+        self.dirty = False
+        if path.exists():
+            with open(path, "r") as f:
+                self.polls = json.load(f)
+
+    def flush(self):
+        if self.dirty:
+            write_json_atomic(self.path, self.polls, separators=(",", ":"))
+            self.dirty = False
+
+    def open(self, message_id, channel_id, options, emojis, closes_at):
+        self.polls[str(message_id)] = {
+            "channel_id": channel_id,
+            "options": options,
+            "emojis": emojis,
+            "closes_at": closes_at,
+            "reactions": {},  # user_id -> option indexes in the order they were added
+        }
+        self.dirty = True
+        self.flush()
+
+    def get(self, message_id):
+        return self.polls.get(str(message_id))
+
+    def react(self, message_id, user_id, emoji, added):
+        """Apply one reaction add/remove; returns True if it touched an open poll."""
+        poll = self.polls.get(str(message_id))
+        if poll is None or emoji not in poll["emojis"]:
+            return False
+        option = poll["emojis"].index(emoji)
+        picks = poll["reactions"].setdefault(str(user_id), [])
+        if option in picks:
+            picks.remove(option)
+        if added:
+            picks.append(option)
+        if not picks:
+            del poll["reactions"][str(user_id)]
+        self.dirty = True
+        return True
+
+    def tally(self, message_id):
+        poll = self.polls[str(message_id)]
+        counts = [0] * len(poll["options"])
+        for picks in poll["reactions"].values():
+            counts[picks[-1]] += 1
+        return counts
+
+    def close(self, message_id):
+        """Remove a poll and return it with its final counts."""
+        counts = self.tally(message_id)
+        poll = self.polls.pop(str(message_id))
+        self.dirty = True
+        self.flush()
+        return poll, counts
@@ -0,0 +1,121 @@
+import time
+
+# (capacity, per_seconds): bursts of `capacity`, refilling to that many every `per_seconds`
+UPSTREAM_LIMITS = {
+    "tmdb": (40, 10),
+    "gemini": (15, 60),
+}
+COMMAND_LIMITS = {
+    "factcheck": {"upstream": "gemini", "user": (3, 60), "guild": (10, 60)},
+    "moviepoll": {"upstream": "tmdb", "user": (2, 60), "guild": (6, 60)},
+    "movie": {"upstream": "tmdb", "user": (10, 60), "guild": (30, 60)},
+    "rmovie": {"upstream": "tmdb", "user": (10, 60), "guild": (30, 60)},
+    "show": {"upstream": "tmdb", "user": (10, 60), "guild": (30, 60)},
+    "rshow": {"upstream": "tmdb", "user": (10, 60), "guild": (30, 60)},
+    "seasons": {"upstream": "tmdb", "user": (10, 60), "guild": (30, 60)},
+    "episodes": {"upstream": "tmdb", "user": (10, 60), "guild": (30, 60)},
+}
+
+
+class TokenBucket:
+    def __init__(self, capacity, per_seconds, now):
+        self.capacity = capacity
+        self.rate = capacity / per_seconds
+        self.tokens = float(capacity)
+        self.updated = now
+        self.paused_until = 0.0
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+    def is_idle(self, now):
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.paused_until
+
+
+class RateLimiter:
+    """Per-user, per-guild and per-upstream token buckets for slash commands.
+
+    A command only runs if every bucket that applies to it has a token, and
+    only then are tokens taken, so a denied call costs nothing. Upstream
+    buckets are shared by all commands that hit the same API and can be
+    paused when that API answers 429.
+    """
+
+    def __init__(self, command_limits, upstream_limits, max_buckets=10000):
+        self.command_limits = command_limits
+        self.upstream_limits = upstream_limits
+        self.max_buckets = max_buckets
+        self._buckets = {}
+        self.denied = 0
+
+    def _bucket(self, key, limit, now):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self.max_buckets:
+                self._prune(now)
+            bucket = self._buckets[key] = TokenBucket(*limit, now)
+        return bucket
+
+    def _prune(self, now):
+        for key in [key for key, bucket in self._buckets.items() if bucket.is_idle(now)]:
+            del self._buckets[key]
+
+    def acquire(self, command, user_id, guild_id=None, now=None):
+        """Take a token for `command` and return 0, or return the seconds to wait and take nothing."""
+        spec = self.command_limits.get(command)
+        if spec is None:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        buckets = [self._bucket(("user", command, user_id), spec["user"], now)]
+        if guild_id is not None and "guild" in spec:
+            buckets.append(self._bucket(("guild", command, guild_id), spec["guild"], now))
+        upstream = spec.get("upstream")
+        if upstream in self.upstream_limits:
+            buckets.append(self._bucket(("upstream", upstream), self.upstream_limits[upstream], now))
+
+        wait = max(bucket.wait_time(now) for bucket in buckets)
+        if wait > 0:
+            self.denied += 1
+            return wait
+        for bucket in buckets:
+            bucket.take()
+        return 0.0
+
+    def pause_upstream(self, upstream, seconds, now=None):
+        """Hold every command that uses `upstream` for `seconds`, e.g. from a 429 Retry-After."""
+        if upstream not in self.upstream_limits:
+            return
+        now = time.monotonic() if now is None else now
+        bucket = self._bucket(("upstream", upstream), self.upstream_limits[upstream], now)
+        bucket.paused_until = max(bucket.paused_until, now + seconds)
+        print(f"Rate limit: pausing {upstream} requests for {seconds:.0f}s")
+
+
+limiter = RateLimiter(COMMAND_LIMITS, UPSTREAM_LIMITS)
+
+
+async def allow(interaction, command):
+    """Return True if `command` may run; otherwise tell the user when to retry and return False."""
+    wait = limiter.acquire(command, interaction.user.id, interaction.guild_id)
+    if not wait:
+        return True
+    message = f"⏳ Slow down! Try `/{command}` again in {max(1, round(wait))}s."
+    if interaction.response.is_done():
+        await interaction.followup.send(message, ephemeral=True)
+    else:
+        await interaction.response.send_message(message, ephemeral=True)
+    return False
@@ -0,0 +1,64 @@
+import heapq
+import random
+import time
+
+SECONDS_PER_DAY = 86400
+
+
+def _name(path):
+    return path.name
+
+
+def _size(path):
+    return path.stat().st_size
+
+
+def _mtime(path):
+    return path.stat().st_mtime
+
+
+def pick_random(files, k):
+    """Uniform sample without replacement: O(k) draws instead of shuffling every file."""
+    return random.sample(files, min(k, len(files)))
+
+
+def pick_weighted(files, k, now=None):
+    """Random sample that favours files waiting longest, weight = days in the folder + 1.
+
+    Weighted sampling without replacement by keeping the k largest
+    ``u ** (1 / weight)`` keys (Efraimidis-Spirakis), O(n log k).
+    """
+    now = time.time() if now is None else now
+    def key(path):
+        weight = max(0.0, now - _mtime(path)) / SECONDS_PER_DAY + 1
+        return random.random() ** (1 / weight)
+    return heapq.nlargest(k, files, key=key)
+
+
+def smallest_by(key):
+    return lambda files, k: heapq.nsmallest(k, files, key=key)
+
+
+# SELECTION_ORDER value -> strategy(files, k) returning up to k files, best first
+STRATEGIES = {
+    "random": pick_random,
+    "weighted": pick_weighted,
+    "name": smallest_by(_name),
+    "oldest": smallest_by(_mtime),
+    "size": smallest_by(_size),
+}
+
+
+def register(name, strategy):
+    """Add a selection strategy; it becomes a valid SELECTION_ORDER value."""
+    STRATEGIES[name] = strategy
+
+
+def pick(files, k, order_type):
+    """Return up to `k` of `files` in the order `order_type` prefers."""
+    if k <= 0:
+        return []
+    strategy = STRATEGIES.get(order_type)
+    if strategy is None:
+        return list(files[:k])
+    return strategy(files, k)
@@ -0,0 +1,70 @@
+import json
+import time
+
+from state_journal import write_json_atomic
+from title_index import normalize_title
+
+SHOW_FIELDS = ("id", "name", "overview", "poster_path", "first_air_date")
+
+
+def compact_show(item):
+    """Keep only what an /rshow embed needs."""
+    return {field: item.get(field) for field in SHOW_FIELDS}
+
+
+class ShowAliasCache:
+    """Persistent map of normalized show names to TMDB shows for /rshow.
+
+    Entries learned from a search can go stale and are revalidated in the
+    background after ``max_age_seconds``; entries a user confirmed by picking
+    a show keep their ID and only have their details refreshed.
+    """
+
+    def __init__(self, path, max_age_seconds):
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        self._aliases = None
+
+    def _load(self):
+        if self._aliases is None:
+            if self.path.exists():
+                with open(self.path, "r") as f:
+                    self._aliases = json.load(f)
+            else:
+                self._aliases = {}
+        return self._aliases
+
+    def save(self):
+        write_json_atomic(self.path, self._load(), separators=(",", ":"))
+
+    def __len__(self):
+        return len(self._load())
+
+    def get(self, name):
+        return self._load().get(normalize_title(name))
+
+    def is_stale(self, entry, now=None):
+        now = time.time() if now is None else now
+        return now - entry["checked"] > self.max_age_seconds
+
+    def put(self, name, item, alternatives=(), confirmed=False):
+        """Cache `item` for `name` and return the entry; names that normalize to "" are not stored."""
+        entry = {
+            "show": compact_show(item),
+            "alternatives": [compact_show(alt) for alt in alternatives],
+            "confirmed": confirmed,
+            "checked": time.time(),
+        }
+        key = normalize_title(name)
+        if key:
+            self._load()[key] = entry
+            self.save()
+        return entry
+
+    def confirm(self, name, item):
+        """Pin `name` to a show the user picked; search results no longer override it."""
+        entry = self.get(name)
+        alternatives = [alt for alt in (entry or {}).get("alternatives", []) if alt["id"] != item["id"]]
+        if entry and entry["show"]["id"] != item["id"]:
+            alternatives.insert(0, entry["show"])
+        return self.put(name, item, alternatives, confirmed=True)
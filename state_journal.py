@@ -0,0 +1,64 @@
+import json
+import os
+import time
+import uuid
+
+
+def write_json_atomic(path, data, **dump_kwargs):
+    """Write JSON to a temp file, fsync it and rename it over `path`."""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(data, f, **dump_kwargs)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class StateJournal:
+    """Write-ahead journal for upload and undo operations.
+
+    An operation records its intent before touching anything, advances to
+    "applying" once the irreversible Discord step is done, then moves files and
+    commits all JSON state in one batch before its entry is dropped. On startup
+    leftover entries are rolled back if they never got past "prepared", and
+    rolled forward (replayed) otherwise; the replay steps are idempotent.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._entries = None
+
+    def _load(self):
+        if self._entries is None:
+            if self.path.exists():
+                with open(self.path, "r") as f:
+                    self._entries = json.load(f)
+            else:
+                self._entries = {}
+        return self._entries
+
+    def _flush(self):
+        if self._entries:
+            write_json_atomic(self.path, self._entries)
+        else:
+            self.path.unlink(missing_ok=True)
+
+    def pending(self):
+        """Return unfinished entries, oldest first."""
+        return sorted(self._load().values(), key=lambda entry: entry["started"])
+
+    def begin(self, op, **payload):
+        entry = {"op": op, "txid": uuid.uuid4().hex, "phase": "prepared", "started": time.time(), **payload}
+        self._load()[entry["txid"]] = entry
+        self._flush()
+        return entry
+
+    def advance(self, entry, phase, **updates):
+        entry.update(updates, phase=phase)
+        self._load()[entry["txid"]] = entry
+        self._flush()
+        return entry
+
+    def finish(self, entry):
+        self._load().pop(entry["txid"], None)
+        self._flush()
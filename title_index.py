@@ -0,0 +1,225 @@
+import bisect
+import gzip
+import json
+import re
+import threading
+
+from config import TITLE_INDEX_FILE, TMDB_MOVIE_EXPORT_FILE, TMDB_TV_EXPORT_FILE, TMDB_EXPORT_MIN_POPULARITY
+from state_journal import write_json_atomic
+
+_NON_WORD = re.compile(r"[^\w\s]")
+
+
+def normalize_title(title):
+    """Casefold, drop punctuation and collapse whitespace."""
+    return " ".join(_NON_WORD.sub(" ", title.casefold()).split())
+
+
+def trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _remove_title(entries, keys, grams, tmdb_id):
+    key = normalize_title(entries.pop(tmdb_id)[0])
+    i = bisect.bisect_left(keys, (key, tmdb_id))
+    if i < len(keys) and keys[i] == (key, tmdb_id):
+        del keys[i]
+    for gram in trigrams(key):
+        ids = grams.get(gram)
+        if ids:
+            ids.discard(tmdb_id)
+            if not ids:
+                del grams[gram]
+
+
+def _insert_titles(entries, keys, grams, items, replace):
+    """Index (tmdb_id, title, year, popularity) tuples into the given structures."""
+    new_keys = []
+    for tmdb_id, title, year, popularity in items:
+        key = normalize_title(title or "")
+        if not key:
+            continue
+        old = entries.get(tmdb_id)
+        if old and not replace:
+            continue
+        if old and normalize_title(old[0]) == key:
+            entries[tmdb_id] = (title, year or old[1], popularity or old[2])
+            continue
+        if old:
+            _remove_title(entries, keys, grams, tmdb_id)
+        entries[tmdb_id] = (title, year, popularity)
+        new_keys.append((key, tmdb_id))
+        for gram in trigrams(key):
+            grams.setdefault(gram, set()).add(tmdb_id)
+    if len(new_keys) > 64:
+        keys.extend(new_keys)
+        keys.sort()
+    else:
+        for entry in new_keys:
+            bisect.insort(keys, entry)
+
+
+class TitleIndex:
+    """In-memory title lookup for autocomplete; never touches the network.
+
+    Prefix matches come from a sorted (normalized title, id) list searched
+    with bisect, which answers the same queries as a prefix trie at a
+    fraction of the memory. Typos and mid-title words fall back to trigram
+    matching through a trigram -> ids inverted index. Results are ranked by
+    TMDB popularity.
+    """
+
+    def __init__(self, prefix_scan=200, min_similarity=0.5):
+        self.prefix_scan = prefix_scan
+        self.min_similarity = min_similarity
+        self.entries = {}  # tmdb_id -> (title, year, popularity)
+        self.resolved = {}  # tmdb_id -> [title, year, popularity] for titles users actually picked
+        self._keys = []  # sorted (normalized title, tmdb_id)
+        self._trigrams = {}  # trigram -> set of tmdb_ids
+        self._lock = threading.RLock()  # exports load on a worker thread
+        self._build_lock = threading.Lock()  # one export build at a time
+        self._late = None  # [(items, replace)] added while an export build runs
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add_many(self, items, replace=True):
+        """Add (tmdb_id, title, year, popularity) tuples; with replace=False known ids are left alone."""
+        items = list(items)
+        with self._lock:
+            _insert_titles(self.entries, self._keys, self._trigrams, items, replace)
+            if self._late is not None:
+                self._late.append((items, replace))
+
+    def _add_bulk(self, items, replace):
+        """add_many for whole exports: index copies off the lock, then swap them in.
+
+        Autocomplete keeps answering from the old structures meanwhile. Adds
+        that land during the build are replayed onto the new ones.
+        """
+        with self._build_lock:
+            with self._lock:
+                entries = dict(self.entries)
+                keys = list(self._keys)
+                grams = {gram: set(ids) for gram, ids in self._trigrams.items()}
+                self._late = []
+            try:
+                _insert_titles(entries, keys, grams, items, replace)
+            except BaseException:
+                with self._lock:
+                    self._late = None
+                raise
+            with self._lock:
+                self.entries, self._keys, self._trigrams = entries, keys, grams
+                for late_items, late_replace in self._late:
+                    _insert_titles(entries, keys, grams, late_items, late_replace)
+                self._late = None
+
+    def add(self, tmdb_id, title, year=None, popularity=0.0):
+        self.add_many([(tmdb_id, title, year, popularity)])
+
+    def remember(self, tmdb_id, title, year=None, popularity=0.0):
+        """Index a title a user resolved; returns True if it is new to the persisted set."""
+        if not title:
+            return False
+        with self._lock:
+            self.add(tmdb_id, title, year, popularity)
+            is_new = tmdb_id not in self.resolved
+            self.resolved[tmdb_id] = [title, year, popularity]
+            return is_new
+
+    def resolved_snapshot(self):
+        with self._lock:
+            return dict(self.resolved)
+
+    def load_export(self, path, title_field, min_popularity=0.0):
+        """Load a TMDB daily ID export (JSON lines, optionally gzipped)."""
+        items = []
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                popularity = record.get("popularity") or 0.0
+                if record.get("adult") or popularity < min_popularity:
+                    continue
+                items.append((record["id"], record.get(title_field), None, popularity))
+        # Exports only carry original-language titles; keep the localized ones users resolved
+        self._add_bulk(items, replace=False)
+        return len(items)
+
+    def label(self, tmdb_id):
+        title, year, _ = self.entries[tmdb_id]
+        return f"{title} ({year})" if year else title
+
+    def suggest(self, query, limit=25):
+        """Return up to `limit` (tmdb_id, label) pairs for what the user has typed so far."""
+        key = normalize_title(query)
+        if not key:
+            return []
+        with self._lock:
+            popularity = lambda tmdb_id: self.entries[tmdb_id][2]
+            start = bisect.bisect_left(self._keys, (key,))
+            found = []
+            for title_key, tmdb_id in self._keys[start:start + self.prefix_scan]:
+                if not title_key.startswith(key):
+                    break
+                found.append(tmdb_id)
+            found.sort(key=popularity, reverse=True)
+            found = found[:limit]
+
+            if len(found) < limit:
+                grams = trigrams(key)
+                overlap = {}
+                for gram in grams:
+                    for tmdb_id in self._trigrams.get(gram, ()):
+                        overlap[tmdb_id] = overlap.get(tmdb_id, 0) + 1
+                seen = set(found)
+                fuzzy = [
+                    (shared / len(grams), popularity(tmdb_id), tmdb_id)
+                    for tmdb_id, shared in overlap.items()
+                    if tmdb_id not in seen and shared / len(grams) >= self.min_similarity
+                ]
+                fuzzy.sort(reverse=True)
+                found.extend(tmdb_id for _, _, tmdb_id in fuzzy[:limit - len(found)])
+
+            return [(tmdb_id, self.label(tmdb_id)) for tmdb_id in found]
+
+
+movie_titles = TitleIndex()
+tv_titles = TitleIndex()
+
+
+def save_resolved():
+    write_json_atomic(TITLE_INDEX_FILE, {"movie": movie_titles.resolved_snapshot(), "tv": tv_titles.resolved_snapshot()})
+
+
+def load_title_indexes():
+    """Load resolved titles and any TMDB export files; blocking, run it off the event loop."""
+    if TITLE_INDEX_FILE.exists():
+        with open(TITLE_INDEX_FILE, "r") as f:
+            data = json.load(f)
+        for index, kind in ((movie_titles, "movie"), (tv_titles, "tv")):
+            for tmdb_id, (title, year, popularity) in data.get(kind, {}).items():
+                index.remember(int(tmdb_id), title, year, popularity)
+
+    for index, path, title_field in (
+        (movie_titles, TMDB_MOVIE_EXPORT_FILE, "original_title"),
+        (tv_titles, TMDB_TV_EXPORT_FILE, "original_name"),
+    ):
+        if path and path.exists():
+            count = index.load_export(path, title_field, TMDB_EXPORT_MIN_POPULARITY)
+            print(f"Loaded {count} titles from {path}")
+
+
+def remember_movie(item):
+    if movie_titles.remember(item["id"], item.get("title"), (item.get("release_date") or "")[:4] or None, item.get("popularity") or 0.0):
+        save_resolved()
+
+
+def remember_show(item):
+    if tv_titles.remember(item["id"], item.get("name"), (item.get("first_air_date") or "")[:4] or None, item.get("popularity") or 0.0):
+        save_resolved()
@@ -0,0 +1,146 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+import requests
+import rate_limit
+from config import TMDB_API_KEY
+
+TMDB_API_URL = "https://api.themoviedb.org/3"
+REQUEST_TIMEOUT_SECONDS = 10
+SHOW_CACHE_TTL_SECONDS = 6 * 60 * 60
+APPENDED_SEASONS = 20  # append_to_response accepts at most 20 sub-requests
+
+
+class TTLCache:
+    """Small LRU cache whose entries also expire after ``ttl_seconds``."""
+
+    def __init__(self, ttl_seconds, max_entries=256):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (stored_at, value)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry[0] > self.ttl_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key, value):
+        self._entries[key] = (time.time(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class TMDBClient:
+    """Async TMDB front-end that coalesces identical in-flight requests.
+
+    When several users look up the same title at once, only the first caller
+    hits TMDB; the rest await that same request and get its result
+    ("singleflight"). An optional ``cache`` with ``get(key)``/``put(key, value)``
+    is consulted first, but coalescing works the same without one.
+    """
+
+    def __init__(self, api_key, cache=None):
+        self.api_key = api_key
+        self.cache = cache
+        self._inflight = {}
+        self.upstream_calls = 0
+        self.coalesced_calls = 0
+        self.cache_hits = 0
+
+    async def get(self, path, **params):
+        key = (path, tuple(sorted(params.items())))
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.cache_hits += 1
+                return cached
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(path, params))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced_calls += 1
+        # shield: one caller's interaction being cancelled must not fail the others
+        result = await asyncio.shield(task)
+        if self.cache is not None:
+            self.cache.put(key, result)
+        return result
+
+    async def _fetch(self, path, params):
+        for attempt in range(2):
+            self.upstream_calls += 1
+            response = await asyncio.to_thread(
+                requests.get,
+                f"{TMDB_API_URL}{path}",
+                params={"api_key": self.api_key, **params},
+                timeout=REQUEST_TIMEOUT_SECONDS,
+            )
+            if response.status_code != 429:
+                break
+            # Hold new TMDB commands for the whole window; retry this one once if the wait is short
+            retry_after = float(response.headers.get("Retry-After", 1))
+            rate_limit.limiter.pause_upstream("tmdb", retry_after)
+            if attempt or retry_after > REQUEST_TIMEOUT_SECONDS:
+                break
+            await asyncio.sleep(retry_after)
+        return response.json()
+
+    def stats(self):
+        return {
+            "upstream_calls": self.upstream_calls,
+            "coalesced_calls": self.coalesced_calls,
+            "cache_hits": self.cache_hits,
+        }
+
+
+client = TMDBClient(TMDB_API_KEY)
+show_cache = TTLCache(SHOW_CACHE_TTL_SECONDS)
+
+async def search_movie(query):
+    return await client.get("/search/movie", query=query)
+
+async def search_tv(query):
+    return await client.get("/search/tv", query=query)
+
+async def movie_details(tmdb_id):
+    return await client.get(f"/movie/{tmdb_id}")
+
+async def similar_movies(tmdb_id):
+    return await client.get(f"/movie/{tmdb_id}/similar")
+
+async def tv_details(tmdb_id):
+    return await client.get(f"/tv/{tmdb_id}")
+
+async def tv_season(tmdb_id, season_number):
+    return await client.get(f"/tv/{tmdb_id}/season/{season_number}")
+
+async def load_show(tmdb_id):
+    """TV details plus seasons 1-20 with their episodes, fetched in one request and cached."""
+    show = show_cache.get(tmdb_id)
+    if show is None:
+        appended = ",".join(f"season/{n}" for n in range(1, APPENDED_SEASONS + 1))
+        show = await client.get(f"/tv/{tmdb_id}", append_to_response=appended)
+        if show.get("id"):
+            show_cache.put(tmdb_id, show)
+    return show
+
+def cached_show(tmdb_id):
+    return show_cache.get(tmdb_id)
+
+async def load_season(tmdb_id, season_number):
+    """One season with episodes, from the cached show document where possible."""
+    show = await load_show(tmdb_id)
+    key = f"season/{season_number}"
+    if key not in show and any(s.get("season_number") == season_number for s in show.get("seasons", [])):
+        # Specials (season 0) and seasons past the appended range need their own call
+        show[key] = await tv_season(tmdb_id, season_number)
+    return show.get(key, {})
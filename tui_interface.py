@@ -10,24 +10,24 @@ from rich.align import Align
 import threading
 import time
 from config import (
-    MEDIA_CHANNEL_ID,
-    IMAGES_PER_BATCH,
-    VIDEOS_PER_BATCH,
-    ARCHIVE_RETENTION_DAYS,
-    MAX_UPLOAD_SIZE_MB,
-    SELECTION_ORDER,
     MEDIA_FOLDER,
-    ARCHIVE_FOLDER,
     HISTORY_FILE,
 )
 import media_functions
+import tmdb_functions
+import outbound
+import selection
+import interaction_deadline
+from live_config import settings
+from bot_control import BotControl
 import json
 from pathlib import Path
 
 
 class BotTUI:
-    def __init__(self):
+    def __init__(self, control=None):
         self.console = Console()
+        self.control = control
         self.running = True
         self.media_stats = {}
         self.upload_history = []
@@ -55,8 +55,7 @@ class BotTUI:
         stats['total_queued'] = len(images) + len(videos)
         
         # Count archived files
-        archived = list(ARCHIVE_FOLDER.iterdir())
-        stats['archived_files'] = len(archived)
+        stats['archived_files'] = len(media_functions.get_archive_index())
         
         return stats
     
@@ -156,19 +155,18 @@ class BotTUI:
         layout["footer"].update(Panel(Align.center(footer_text), border_style="green"))
     
     def run_manual_upload(self):
-        """Trigger a manual upload"""
-        # This would need to interact with the bot instance
-        # For now, just a placeholder
-        self.console.print("[bold yellow]Manual upload triggered![/bold yellow]")
-        # In a real implementation, this would call the upload function
-        return "Manual upload initiated"
+        """Trigger a manual upload on the bot loop"""
+        if not self.control or not self.control.connected:
+            return "[red]Bot is not connected yet.[/red]"
+        self.control.manual_upload()
+        return "[yellow]Manual upload initiated[/yellow]"
     
     def clear_history(self):
         """Clear upload history"""
+        if not self.control or not self.control.connected:
+            return "[red]Bot is not connected yet.[/red]"
         try:
-            history = {"uploaded_files": [], "metadata": {}}
-            with open(HISTORY_FILE, "w") as f:
-                json.dump(history, f, indent=2)
+            self.control.clear_history().result(timeout=10)
             return "[green]History cleared successfully![/green]"
         except Exception as e:
             return f"[red]Error clearing history: {str(e)}[/red]"
@@ -206,10 +204,32 @@ def simple_tui_main(bot_instance=None):
     from rich.console import Console
     from rich.table import Table
     from rich.prompt import Prompt
-    import os
     import sys
     
     console = Console()
+    control = BotControl(bot_instance) if bot_instance else None
+
+    config_changes = []  # (time, {name: value}) seen by this TUI
+
+    def on_settings_changed(changed):
+        config_changes.append((datetime.now(), changed))
+        del config_changes[:-10]
+
+    settings.subscribe(on_settings_changed)
+
+    def run_job(start_job):
+        """Submit a job to the bot loop and stream its progress until it finishes."""
+        if not control or not control.connected:
+            console.print("[red]Bot is not connected yet. Try again in a moment.[/red]")
+            return None
+        try:
+            job = start_job()
+            for message in job.iter_progress():
+                console.print(f"  {message}")
+            return job.result()
+        except Exception as e:
+            console.print(f"[red]Error: {str(e)}[/red]")
+            return None
     
     def display_status():
         console.clear()
@@ -239,8 +259,11 @@ def simple_tui_main(bot_instance=None):
         table.add_row("Queued Videos", str(stats['queued_videos']))
         table.add_row("Total Queued", str(stats['total_queued']))
         table.add_row("Archived Files", str(stats['archived_files']))
-        table.add_row("Max Upload Size", f"{MAX_UPLOAD_SIZE_MB} MB")
-        table.add_row("Batch Size", f"{IMAGES_PER_BATCH} images + {VIDEOS_PER_BATCH} videos")
+        table.add_row("Max Upload Size", f"{settings.MAX_UPLOAD_SIZE_MB} MB")
+        table.add_row("Batch Size", f"{settings.IMAGES_PER_BATCH} images + {settings.VIDEOS_PER_BATCH} videos")
+        if config_changes:
+            changed_at, changed = config_changes[-1]
+            table.add_row("Config Changed", f"{changed_at:%H:%M:%S} " + ", ".join(f"{k}={v}" for k, v in changed.items()))
         
         console.print(table)
         
@@ -255,6 +278,7 @@ def simple_tui_main(bot_instance=None):
         console.print("7. Edit Bot Configuration")
         console.print("8. View Statistics Dashboard")
         console.print("9. Refresh Status")
+        console.print("D. Dry Run Next Batches")
         console.print("Q. Quit TUI")
 
         return table
@@ -285,26 +309,31 @@ def simple_tui_main(bot_instance=None):
         stats['total_queued'] = len(images) + len(videos)
         
         # Count archived files
-        archived = list(ARCHIVE_FOLDER.iterdir())
-        stats['archived_files'] = len(archived)
+        stats['archived_files'] = len(media_functions.get_archive_index())
         
         return stats
     
     def manual_upload_action():
         console.print("[bold yellow]Initiating manual upload...[/bold yellow]")
-        # In a real implementation, this would interact with the bot instance
-        # For now, just simulate
-        time.sleep(1)
-        console.print("[green]Manual upload completed![/green]")
+        uploaded = run_job(lambda: control.manual_upload())
+        if uploaded:
+            console.print(f"[green]Manual upload completed! ({uploaded} files)[/green]")
     
     def clear_history_action():
-        try:
-            history = {"uploaded_files": [], "metadata": {}}
-            with open(HISTORY_FILE, "w") as f:
-                json.dump(history, f, indent=2)
+        if run_job(lambda: control.clear_history()):
             console.print("[green]Upload history cleared![/green]")
-        except Exception as e:
-            console.print(f"[red]Error clearing history: {str(e)}[/red]")
+
+    def dry_run_action():
+        try:
+            count = int(Prompt.ask("How many batches to preview (1-10)", default="1"))
+        except ValueError:
+            console.print("[red]Please enter a valid number![/red]")
+            return
+        if not 1 <= count <= 10:
+            console.print("[red]Count must be between 1 and 10[/red]")
+            return
+        console.print(f"\n[bold]Dry Run - Next {count} Batch(es):[/bold]")
+        run_job(lambda: control.dry_run(count))
     
     def view_schedule_config():
         if Path("schedule_config.json").exists():
@@ -319,7 +348,7 @@ def simple_tui_main(bot_instance=None):
     def clear_archive_action():
         """Clear archived files"""
         try:
-            archived_files = list(ARCHIVE_FOLDER.iterdir())
+            archived_files = list(media_functions.archive_store.entries())
             if not archived_files:
                 console.print("[yellow]No archived files to clear.[/yellow]")
                 return
@@ -328,126 +357,57 @@ def simple_tui_main(bot_instance=None):
             confirm = Prompt.ask("Type 'YES' to confirm deletion", default="NO")
 
             if confirm.upper() == 'YES':
-                deleted_count = 0
-                for file_path in archived_files:
-                    try:
-                        file_path.unlink()  # Delete the file
-                        deleted_count += 1
-                    except Exception as e:
-                        console.print(f"[red]Error deleting {file_path.name}: {str(e)}[/red]")
-
-                console.print(f"[green]Successfully deleted {deleted_count} archived files![/green]")
+                # Deletion runs on the bot loop under state_lock, like every other state change
+                result = run_job(lambda: control.clear_archive())
+                if result:
+                    deleted_count, _ = result
+                    console.print(f"[green]Successfully deleted {deleted_count} archived files![/green]")
             else:
                 console.print("[yellow]Deletion cancelled.[/yellow]")
         except Exception as e:
             console.print(f"[red]Error clearing archive: {str(e)}[/red]")
 
     def edit_bot_config():
-        """Edit bot configuration settings"""
+        """Edit bot configuration settings; changes apply live, no restart needed"""
         console.print("\n[bold]Bot Configuration Editor[/bold]")
         console.print("Current settings:")
 
-        # Read current config values from environment or defaults
-        import os
-        from pathlib import Path
-
-        # Display current values
-        console.print(f"1. Images per batch: {os.getenv('IMAGES_PER_BATCH', '3')}")
-        console.print(f"2. Videos per batch: {os.getenv('VIDEOS_PER_BATCH', '7')}")
-        console.print(f"3. Max upload size (MB): {os.getenv('MAX_UPLOAD_SIZE_MB', '25')}")
-        console.print(f"4. Archive retention days: {os.getenv('ARCHIVE_RETENTION_DAYS', '3')}")
-        console.print(f"5. Selection order: {os.getenv('SELECTION_ORDER', 'random')}")
-        console.print(f"6. Media channel ID: {os.getenv('MEDIA_CHANNEL_ID', '439072343285956618')}")
-        console.print(f"7. Movies channel ID: {os.getenv('MOVIES_CHANNEL_ID', '370237203462488064')}")
-        console.print("8. Back to main menu")
+        editable = [
+            ("IMAGES_PER_BATCH", "Images per batch"),
+            ("VIDEOS_PER_BATCH", "Videos per batch"),
+            ("MAX_UPLOAD_SIZE_MB", "Max upload size (MB)"),
+            ("ARCHIVE_RETENTION_DAYS", "Archive retention days"),
+            ("SELECTION_ORDER", "Selection order"),
+            ("MEDIA_CHANNEL_ID", "Media channel ID"),
+            ("MOVIES_CHANNEL_ID", "Movies channel ID"),
+        ]
+        for i, (name, label) in enumerate(editable, 1):
+            console.print(f"{i}. {label}: {getattr(settings, name)}")
+        back = len(editable) + 1
+        console.print(f"{back}. Back to main menu")
 
         try:
-            choice = Prompt.ask("\nSelect setting to edit (1-8)", default="8")
-            choice = int(choice)
-
-            if choice == 1:
-                new_value = Prompt.ask("Enter new number of images per batch", default=str(os.getenv('IMAGES_PER_BATCH', '3')))
-                try:
-                    val = int(new_value)
-                    if val >= 0:
-                        # In a real implementation, we'd update the actual config
-                        console.print(f"[green]Would update IMAGES_PER_BATCH to {val}[/green]")
-                        console.print("[yellow]Note: Changes require bot restart to take effect[/yellow]")
-                    else:
-                        console.print("[red]Value must be non-negative[/red]")
-                except ValueError:
-                    console.print("[red]Please enter a valid number[/red]")
-
-            elif choice == 2:
-                new_value = Prompt.ask("Enter new number of videos per batch", default=str(os.getenv('VIDEOS_PER_BATCH', '7')))
-                try:
-                    val = int(new_value)
-                    if val >= 0:
-                        console.print(f"[green]Would update VIDEOS_PER_BATCH to {val}[/green]")
-                        console.print("[yellow]Note: Changes require bot restart to take effect[/yellow]")
-                    else:
-                        console.print("[red]Value must be non-negative[/red]")
-                except ValueError:
-                    console.print("[red]Please enter a valid number[/red]")
-
-            elif choice == 3:
-                new_value = Prompt.ask("Enter new max upload size in MB", default=str(os.getenv('MAX_UPLOAD_SIZE_MB', '25')))
-                try:
-                    val = int(new_value)
-                    if val > 0:
-                        console.print(f"[green]Would update MAX_UPLOAD_SIZE_MB to {val}[/green]")
-                        console.print("[yellow]Note: Changes require bot restart to take effect[/yellow]")
-                    else:
-                        console.print("[red]Value must be positive[/red]")
-                except ValueError:
-                    console.print("[red]Please enter a valid number[/red]")
-
-            elif choice == 4:
-                new_value = Prompt.ask("Enter new archive retention days", default=str(os.getenv('ARCHIVE_RETENTION_DAYS', '3')))
-                try:
-                    val = int(new_value)
-                    if val >= 0:
-                        console.print(f"[green]Would update ARCHIVE_RETENTION_DAYS to {val}[/green]")
-                        console.print("[yellow]Note: Changes require bot restart to take effect[/yellow]")
-                    else:
-                        console.print("[red]Value must be non-negative[/red]")
-                except ValueError:
-                    console.print("[red]Please enter a valid number[/red]")
-
-            elif choice == 5:
-                current_order = os.getenv('SELECTION_ORDER', 'random')
-                console.print(f"Current selection order: {current_order}")
-                console.print("Options: 'random', 'name', 'size'")
-                new_value = Prompt.ask("Enter new selection order", default=current_order)
-                if new_value in ['random', 'name', 'size']:
-                    console.print(f"[green]Would update SELECTION_ORDER to '{new_value}'[/green]")
-                    console.print("[yellow]Note: Changes require bot restart to take effect[/yellow]")
-                else:
-                    console.print("[red]Invalid selection order. Use 'random', 'name', or 'size'[/red]")
-
-            elif choice == 6:
-                new_value = Prompt.ask("Enter new media channel ID", default=str(os.getenv('MEDIA_CHANNEL_ID', '439072343285956618')))
-                try:
-                    val = int(new_value)
-                    console.print(f"[green]Would update MEDIA_CHANNEL_ID to {val}[/green]")
-                    console.print("[yellow]Note: Changes require bot restart to take effect[/yellow]")
-                except ValueError:
-                    console.print("[red]Please enter a valid number[/red]")
-
-            elif choice == 7:
-                new_value = Prompt.ask("Enter new movies channel ID", default=str(os.getenv('MOVIES_CHANNEL_ID', '370237203462488064')))
-                try:
-                    val = int(new_value)
-                    console.print(f"[green]Would update MOVIES_CHANNEL_ID to {val}[/green]")
-                    console.print("[yellow]Note: Changes require bot restart to take effect[/yellow]")
-                except ValueError:
-                    console.print("[red]Please enter a valid number[/red]")
-
-            elif choice == 8:
+            choice = int(Prompt.ask(f"\nSelect setting to edit (1-{back})", default=str(back)))
+            if choice == back:
                 console.print("[blue]Returning to main menu...[/blue]")
                 return
-            else:
-                console.print("[red]Invalid choice. Please select 1-8.[/red]")
+            if not 1 <= choice <= len(editable):
+                console.print(f"[red]Invalid choice. Please select 1-{back}.[/red]")
+                return
+
+            name, label = editable[choice - 1]
+            if name == "SELECTION_ORDER":
+                console.print("Options: " + ", ".join(f"'{name}'" for name in selection.STRATEGIES))
+            new_value = Prompt.ask(f"Enter new {label.lower()}", default=str(getattr(settings, name)))
+            try:
+                settings.validate({name: new_value})
+            except ValueError as e:
+                console.print(f"[red]{e}[/red]")
+                return
+
+            changed = run_job(lambda: control.update_config(**{name: new_value}))
+            if changed:
+                console.print(f"[green]{name} updated to {changed[name]} (live, no restart needed)[/green]")
 
         except ValueError:
             console.print("[red]Please enter a valid number.[/red]")
@@ -486,31 +446,22 @@ def simple_tui_main(bot_instance=None):
         stats['videos_uploaded'] = video_count
 
         # Calculate storage used
-        total_size = 0
-        for filename in uploaded_files:
-            archive_path = ARCHIVE_FOLDER / filename
-            if archive_path.exists():
-                total_size += archive_path.stat().st_size
+        total_size = media_functions.get_archive_index().total_bytes
 
         stats['storage_used_mb'] = round(total_size / (1024 * 1024), 2)
 
-        # Recent uploads (last 7 days)
-        seven_days_ago = (datetime.now() - timedelta(days=7)).isoformat()
-        recent_uploads = []
-        for filename, data in metadata.items():
-            upload_date = data.get("upload_date", "")
-            if upload_date >= seven_days_ago:
-                recent_uploads.append((filename, upload_date))
-
-        stats['recent_uploads_count'] = len(recent_uploads)
-        stats['recent_uploads'] = recent_uploads[:10]  # Top 10 recent uploads
+        # Recent uploads (last 7 days), newest first from the upload index
+        seven_days_ago = datetime.now() - timedelta(days=7)
+        index = media_functions.get_media_index()
+        stats['recent_uploads_count'] = index.count_since(seven_days_ago)
+        stats['recent_uploads'] = [
+            (filename, datetime.fromtimestamp(ts).isoformat())
+            for filename, ts in index.recent(limit=10, since=seven_days_ago)
+        ]
 
         # Get rating stats if available
-        ratings_file = Path("media_ratings.json")
-        if ratings_file.exists():
-            with open(ratings_file, "r") as f:
-                ratings = json.load(f)
-
+        ratings = media_functions.load_media_ratings()
+        if ratings:
             stats['rated_files'] = len(ratings)
             total_votes = sum(data.get("votes", 0) for data in ratings.values())
             stats['total_votes'] = total_votes
@@ -518,6 +469,12 @@ def simple_tui_main(bot_instance=None):
             stats['rated_files'] = 0
             stats['total_votes'] = 0
 
+        stats['tmdb'] = tmdb_functions.client.stats()
+        stats['outbound'] = outbound.scheduler.metrics()
+        defer_stats = interaction_deadline.defer_stats.values()
+        stats['commands_handled'] = sum(row['calls'] for row in defer_stats)
+        stats['commands_deferred'] = sum(row['deferred'] for row in defer_stats)
+
         return stats
 
     def view_statistics_dashboard():
@@ -539,9 +496,20 @@ def simple_tui_main(bot_instance=None):
         table.add_row("Files Rated", str(stats['rated_files']))
         table.add_row("Total Votes", str(stats['total_votes']))
         table.add_row("Recent Uploads (7 days)", str(stats['recent_uploads_count']))
+        table.add_row("TMDB Requests Sent", str(stats['tmdb']['upstream_calls']))
+        table.add_row("Auto-deferred Replies", f"{stats['commands_deferred']}/{stats['commands_handled']}")
+        table.add_row("TMDB Requests Saved", str(stats['tmdb']['coalesced_calls'] + stats['tmdb']['cache_hits']))
 
         console.print(table)
 
+        queue_table = Table(title="Outbound Discord Requests", show_header=True, header_style="bold magenta")
+        for column in ("Class", "Queued", "In Flight", "Completed", "Wait p50 (ms)", "Wait p99 (ms)"):
+            queue_table.add_column(column, justify="right")
+        for name, row in stats['outbound'].items():
+            queue_table.add_row(name, str(row['queued']), str(row['in_flight']), str(row['completed']),
+                                str(row['wait_p50_ms']), str(row['wait_p99_ms']))
+        console.print(queue_table)
+
         # Show recent uploads
         if stats['recent_uploads']:
             console.print("\n[bold]Recent Uploads:[/bold]")
@@ -576,16 +544,9 @@ def simple_tui_main(bot_instance=None):
             minute = int(minute_input)
 
             if 0 <= hour <= 23 and 0 <= minute <= 59:
-                config = {
-                    "enabled": True,
-                    "hour": hour,
-                    "minute": minute
-                }
-
-                with open("schedule_config.json", "w") as f:
-                    json.dump(config, f, indent=2)
-
-                console.print(f"[green]Schedule updated to {hour:02d}:{minute:02d}[/green]")
+                config = run_job(lambda: control.reschedule(hour, minute))
+                if config:
+                    console.print(f"[green]Schedule updated to {hour:02d}:{minute:02d}[/green]")
             else:
                 console.print("[red]Invalid time entered![/red]")
         except ValueError:
@@ -672,6 +633,11 @@ def simple_tui_main(bot_instance=None):
         elif choice == '9':
             # Refresh is automatic in the display
             continue
+
+        elif choice == 'd':
+            dry_run_action()
+            console.print("\nPress Enter to continue...")
+            input()
             
         elif choice in ['q', 'quit', 'exit']:
             console.print("[bold red]Exiting TUI...[/bold red]")
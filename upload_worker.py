@@ -0,0 +1,183 @@
+import asyncio
+import json
+import sqlite3
+import time
+
+import discord
+
+from config import DISCORD_TOKEN, UPLOAD_QUEUE_FILE
+
+POLL_SECONDS = 0.5
+HEARTBEAT_SECONDS = 5
+HEARTBEAT_STALE_SECONDS = 60  # a running job with no heartbeat for this long lost its worker
+
+
+class UploadQueue:
+    """Upload jobs in a SQLite file shared by the bot and the worker.
+
+    A job goes queued -> running -> done, or queued -> cancelled if the bot
+    stops waiting before a worker claims it. Claims and cancels are single
+    conditional updates, so a job can never be both sent by the worker and
+    retried in-process by the bot.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._db = sqlite3.connect(path, timeout=10, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " payload TEXT NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'queued',"
+            " result TEXT,"
+            " created REAL NOT NULL,"
+            " heartbeat REAL)"
+        )
+
+    def enqueue(self, payload):
+        cursor = self._db.execute(
+            "INSERT INTO jobs (payload, created) VALUES (?, ?)", (json.dumps(payload), time.time())
+        )
+        return cursor.lastrowid
+
+    def claim(self):
+        """Mark the oldest queued job running and return (job_id, payload), or None."""
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._db.execute(
+                "SELECT id, payload FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+            ).fetchone()
+            if row:
+                self._db.execute(
+                    "UPDATE jobs SET status = 'running', heartbeat = ? WHERE id = ?", (time.time(), row[0])
+                )
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        return (row[0], json.loads(row[1])) if row else None
+
+    def beat(self, job_id):
+        self._db.execute("UPDATE jobs SET heartbeat = ? WHERE id = ?", (time.time(), job_id))
+
+    def complete(self, job_id, result):
+        self._db.execute(
+            "UPDATE jobs SET status = 'done', result = ? WHERE id = ?", (json.dumps(result), job_id)
+        )
+
+    def cancel(self, job_id):
+        """Withdraw a job no worker has claimed yet; returns False if one already has."""
+        cursor = self._db.execute("UPDATE jobs SET status = 'cancelled' WHERE id = ? AND status = 'queued'", (job_id,))
+        return cursor.rowcount == 1
+
+    def get(self, job_id):
+        row = self._db.execute("SELECT status, result, heartbeat FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        return {"status": row[0], "result": json.loads(row[1]) if row[1] else None, "heartbeat": row[2]}
+
+    def delete(self, job_id):
+        self._db.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+
+class WorkerHTTPError(discord.HTTPException):
+    """A worker-side send failure, raised in the bot so callers handle it like an in-process send."""
+
+    def __init__(self, status, text):
+        self.response = None
+        self.status = status
+        self.code = 0
+        self.text = text
+        Exception.__init__(self, f"{status} {text} (upload worker)")
+
+
+# ========== Bot side ==========
+
+async def send_via_worker(jobs, channel_id, content, paths, nonce, claim_timeout):
+    """Hand a batch to the worker and wait for it to post.
+
+    Returns the message ID, or None if no worker claimed the job within
+    `claim_timeout` seconds (the job is withdrawn, so the caller can send
+    it itself). Raises WorkerHTTPError for failed sends; a worker that
+    dies mid-send is reported as a 5xx because the post may have landed.
+    """
+    job_id = jobs.enqueue({"channel_id": channel_id, "content": content, "paths": paths, "nonce": nonce})
+    deadline = time.monotonic() + claim_timeout
+    try:
+        while True:
+            await asyncio.sleep(POLL_SECONDS)
+            job = jobs.get(job_id)
+            if job["status"] == "queued" and time.monotonic() > deadline and jobs.cancel(job_id):
+                return None
+            if job["status"] == "running" and time.time() - job["heartbeat"] > HEARTBEAT_STALE_SECONDS:
+                raise WorkerHTTPError(504, "upload worker stopped responding")
+            if job["status"] == "done":
+                result = job["result"]
+                if "message_id" in result:
+                    return result["message_id"]
+                if "status" in result:
+                    raise WorkerHTTPError(result["status"], result["error"])
+                raise RuntimeError(f"Upload worker failed: {result['error']}")
+    finally:
+        jobs.delete(job_id)
+
+
+# ========== Worker side ==========
+
+async def _heartbeat(jobs, job_id):
+    while True:
+        await asyncio.sleep(HEARTBEAT_SECONDS)
+        jobs.beat(job_id)
+
+
+async def post_job(client, payload, channels):
+    """Send one job's files and return the result dict stored on the job."""
+    try:
+        channel_id = payload["channel_id"]
+        if channel_id not in channels:
+            channels[channel_id] = await client.fetch_channel(channel_id)
+        files = [discord.File(path) for path in payload["paths"]]
+        message = await channels[channel_id].send(payload["content"], files=files, nonce=payload["nonce"])
+        return {"message_id": message.id}
+    except discord.HTTPException as e:
+        return {"status": e.status, "error": e.text or str(e)}
+    except Exception as e:
+        return {"error": str(e)}
+
+
+async def work(client, jobs):
+    channels = {}
+    while True:
+        job = jobs.claim()
+        if job is None:
+            await asyncio.sleep(POLL_SECONDS)
+            continue
+        job_id, payload = job
+        print(f"Job {job_id}: posting {len(payload['paths'])} file(s)")
+        beat = asyncio.create_task(_heartbeat(jobs, job_id))
+        try:
+            result = await post_job(client, payload, channels)
+        finally:
+            beat.cancel()
+        jobs.complete(job_id, result)
+        print(f"Job {job_id}: {result}")
+
+
+async def main():
+    """Worker process: run ``python upload_worker.py`` alongside a bot started with UPLOAD_WORKER=true.
+
+    The bot still picks batches and commits history; the worker opens the
+    files and posts them over the HTTP API, so large multipart sends run on
+    their own core instead of the bot's event loop.
+    """
+    jobs = UploadQueue(UPLOAD_QUEUE_FILE)
+    client = discord.Client(intents=discord.Intents.none())
+    async with client:
+        await client.login(DISCORD_TOKEN)  # HTTP only; the worker never opens a gateway connection
+        print(f"Upload worker logged in as {client.user}, waiting for jobs in {UPLOAD_QUEUE_FILE}")
+        await work(client, jobs)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())